@@ -6,11 +6,86 @@ from typing import Dict, List, Any
 import json
 
 from backend.utils.gitlab_sync_manager import gitlab_sync_manager, SyncStatus
+from backend.utils.sync_worker import sync_worker_pool
 from backend.utils.database import db_manager
+from backend.utils.json_stream import stream_json_response
+from backend.utils.pagination import (encode_cursor, decode_cursor, parse_limit,
+                                      parse_count_mode, estimate_row_count)
 
 # 创建GitLab同步API蓝图
 gitlab_sync_bp = Blueprint('gitlab_sync', __name__)
 
+# 同步历史键集分页的排序键
+SYNC_HISTORY_CURSOR_KEYS = ('sync_timestamp', 'id')
+
+_SYNC_HISTORY_QUERY = """
+    SELECT id, operation_id, project_id, branch, task_name, file_path, 
+           content_hash, sync_status, sync_timestamp, retry_count,
+           error_message, conflict_details, created_at, updated_at{extra_columns}
+    FROM gitlab_sync_history
+    {where_clause}
+    ORDER BY sync_timestamp DESC, id DESC
+    LIMIT %s{offset_clause}
+"""
+
+
+def _format_history_record(record):
+    """将同步历史记录转换为接口返回格式"""
+    return {
+        'operation_id': record['operation_id'],
+        'project_id': record['project_id'],
+        'branch': record['branch'],
+        'task_name': record['task_name'],
+        'file_path': record['file_path'],
+        'content_hash': record['content_hash'],
+        'sync_status': record['sync_status'],
+        'sync_timestamp': record['sync_timestamp'].isoformat(),
+        'retry_count': record['retry_count'],
+        'error_message': record['error_message'],
+        'conflict_details': record['conflict_details'],
+        'created_at': record['created_at'].isoformat(),
+        'updated_at': record['updated_at'].isoformat()
+    }
+
+
+def _wait_for_sync(data):
+    """
+    是否在请求中等待同步完成
+
+    请求体未指定wait时，后台工作线程运行中则写入队列立即返回，否则在请求中直接同步
+    """
+    wait = data.get('wait')
+    if wait is None:
+        return not sync_worker_pool.is_running
+    return bool(wait)
+
+
+def _status_url(operation_id):
+    return f'/api/gitlab_sync/status/{operation_id}'
+
+
+def _page_rows(rows, limit, state):
+    """
+    最多产出limit条记录，并在state中记录分页信息
+
+    state['last']为最后一条产出的记录，state['has_more']表示是否取到了多出的一行，
+    state['total']为窗口函数count(*) OVER()给出的总数
+    """
+    try:
+        for index, row in enumerate(rows):
+            if index == 0 and 'total_count' in row:
+                state['total'] = row['total_count']
+            if index >= limit:
+                state['has_more'] = True
+                break
+            state['last'] = row
+            yield row
+    finally:
+        # 提前结束时关闭底层的服务端游标
+        close = getattr(rows, 'close', None)
+        if close:
+            close()
+
 
 @gitlab_sync_bp.route('/api/gitlab_sync/task_config', methods=['POST'])
 def sync_task_config():
@@ -26,7 +101,10 @@ def sync_task_config():
             "JDKVERSION": "11",
             "CTPORT": "8080"
         },
-        "resolution_strategy": "local_wins"  // 可选: local_wins, remote_wins, merge
+        "resolution_strategy": "local_wins",  // 可选: local_wins, remote_wins, merge
+        "wait": false  // 可选: 为false时写入同步队列立即返回202和operation_id，
+                       //       通过/api/gitlab_sync/status/<operation_id>查询结果；
+                       //       默认在后台工作线程运行时为false
     }
     """
     try:
@@ -46,6 +124,7 @@ def sync_task_config():
         task_name = data['task_name']
         config_updates = data['config_updates']
         resolution_strategy = data.get('resolution_strategy', 'local_wins')
+        wait = _wait_for_sync(data)
         
         # 执行同步
         result = gitlab_sync_manager.sync_task_config(
@@ -53,16 +132,21 @@ def sync_task_config():
             branch=branch,
             task_name=task_name,
             config_updates=config_updates,
-            resolution_strategy=resolution_strategy
+            resolution_strategy=resolution_strategy,
+            wait=wait
         )
         
-        return jsonify({
+        response = {
             'success': result.success,
             'operation_id': result.operation_id,
             'status': result.status.value,
             'message': result.message,
             'details': result.details
-        })
+        }
+        if not wait and result.success:
+            response['status_url'] = _status_url(result.operation_id)
+            return jsonify(response), 202
+        return jsonify(response)
         
     except Exception as e:
         return jsonify({
@@ -91,7 +175,8 @@ def batch_sync_task_configs():
                 "task_name": "234",
                 "config_updates": {"NODEVERSION": "16.18"}
             }
-        ]
+        ],
+        "wait": false  // 可选，含义同/api/gitlab_sync/task_config
     }
     """
     try:
@@ -104,14 +189,36 @@ def batch_sync_task_configs():
                 'message': '同步请求列表不能为空'
             }), 400
         
+        wait = _wait_for_sync(data)
+        
         # 执行批量同步
-        results = gitlab_sync_manager.batch_sync_task_configs(sync_requests)
+        results = gitlab_sync_manager.batch_sync_task_configs(sync_requests, wait=wait)
         
         # 统计结果
         total_count = len(results)
         success_count = sum(1 for r in results if r.success)
         failed_count = total_count - success_count
         
+        if not wait:
+            return jsonify({
+                'success': failed_count == 0,
+                'message': f'已加入同步队列: {success_count}, 失败: {failed_count}',
+                'summary': {
+                    'total': total_count,
+                    'queued': success_count,
+                    'failed': failed_count
+                },
+                'results': [
+                    {
+                        'operation_id': result.operation_id,
+                        'status': result.status.value,
+                        'success': result.success,
+                        'message': result.message,
+                        'status_url': _status_url(result.operation_id) if result.success else None
+                    } for result in results
+                ]
+            }), 202
+        
         return jsonify({
             'success': failed_count == 0,
             'message': f'批量同步完成，成功: {success_count}, 失败: {failed_count}',
@@ -192,9 +299,8 @@ def resolve_sync_conflict():
                 'message': '缺少操作ID'
             }), 400
         
-        # 获取同步操作
-        with gitlab_sync_manager.sync_lock:
-            operation = gitlab_sync_manager.sync_operations.get(operation_id)
+        # 获取同步操作（可能由其他进程创建）
+        operation = gitlab_sync_manager.get_operation(operation_id)
         
         if not operation:
             return jsonify({
@@ -216,6 +322,7 @@ def resolve_sync_conflict():
             result = gitlab_sync_manager.atomic_sync_operation(resolved_operation)
         else:
             # 冲突已解决，无需同步
+            gitlab_sync_manager.save_operation(resolved_operation)
             result = gitlab_sync_manager.get_sync_status(operation_id)
         
         return jsonify({
@@ -243,15 +350,22 @@ def get_sync_history():
         task_name: 任务名称（可选）
         status: 同步状态（可选）
         limit: 限制返回数量（默认50）
-        offset: 偏移量（默认0）
+        offset: 偏移量（默认0，仅偏移分页，兼容旧接口）
+        pagination: 分页方式 offset/cursor（默认offset，传入cursor时自动使用cursor）
+        cursor: 上一页返回的next_cursor，按(sync_timestamp, id)键集翻页
+        count: 键集分页的总数统计方式 exact/estimate/none（默认none）
+        stream: 为true时使用服务端游标流式输出记录（适合较大的limit）
     """
     try:
         # 获取查询参数
         project_id = request.args.get('project_id')
         task_name = request.args.get('task_name')
         status = request.args.get('status')
-        limit = int(request.args.get('limit', 50))
+        limit = parse_limit(request.args.get('limit'), default=50, max_limit=5000)
         offset = int(request.args.get('offset', 0))
+        cursor = request.args.get('cursor')
+        use_cursor = bool(cursor) or request.args.get('pagination') == 'cursor'
+        stream = request.args.get('stream', 'false').lower() == 'true'
         
         # 构建查询条件
         where_conditions = []
@@ -270,50 +384,83 @@ def get_sync_history():
             params.append(status)
         
         where_clause = " WHERE " + " AND ".join(where_conditions) if where_conditions else ""
-        
-        # 查询总数
         count_query = f"SELECT COUNT(*) as total FROM gitlab_sync_history{where_clause}"
-        total_result = db_manager.execute_query(count_query, params=params, fetch_one=True)
-        total_count = total_result['total'] if total_result else 0
-        
-        # 查询数据
-        query = f"""
-            SELECT operation_id, project_id, branch, task_name, file_path, 
-                   content_hash, sync_status, sync_timestamp, retry_count,
-                   error_message, conflict_details, created_at, updated_at
-            FROM gitlab_sync_history
-            {where_clause}
-            ORDER BY sync_timestamp DESC
-            LIMIT %s OFFSET %s
-        """
-        params.extend([limit, offset])
-        
-        history_records = db_manager.execute_query(query, params=params, fetch_all=True)
         
+        page_state = {}
+        if use_cursor:
+            # 键集分页：按(sync_timestamp, id)定位，多取一行判断是否还有下一页
+            count_mode = parse_count_mode(request.args.get('count'), default='none')
+            keyset_conditions = list(where_conditions)
+            query_params = list(params)
+            if cursor:
+                position = decode_cursor(cursor, SYNC_HISTORY_CURSOR_KEYS)
+                keyset_conditions.append("(sync_timestamp, id) < (%s, %s)")
+                query_params.extend([position['sync_timestamp'], position['id']])
+            keyset_where = " WHERE " + " AND ".join(keyset_conditions) if keyset_conditions else ""
+            query = _SYNC_HISTORY_QUERY.format(extra_columns='', where_clause=keyset_where,
+                                               offset_clause='')
+            query_params.append(limit + 1)
+            
+            total = None
+            if count_mode == 'exact':
+                total_result = db_manager.execute_query(count_query, params=params, fetch_one=True)
+                total = total_result['total'] if total_result else 0
+            elif count_mode == 'estimate':
+                total = estimate_row_count(db_manager, 'gitlab_sync_history', where_clause, params)
+            
+            head = {'success': True, 'total': total, 'total_is_estimate': count_mode == 'estimate',
+                    'limit': limit}
+            
+            def tail():
+                has_more = page_state.get('has_more', False)
+                last = page_state.get('last')
+                return {
+                    'has_more': has_more,
+                    'next_cursor': encode_cursor({key: last[key] for key in SYNC_HISTORY_CURSOR_KEYS})
+                    if has_more else None
+                }
+        else:
+            # 偏移分页（兼容旧接口）：总数通过窗口函数与列表在同一条查询中取得
+            query = _SYNC_HISTORY_QUERY.format(extra_columns=', count(*) OVER() AS total_count',
+                                               where_clause=where_clause, offset_clause=' OFFSET %s')
+            query_params = params + [limit, offset]
+            head = {'success': True}
+            
+            def tail():
+                total = page_state.get('total')
+                if total is None:
+                    # 没有结果行时窗口函数无法给出总数，偏移超出范围才需要单独计数
+                    total = 0
+                    if offset > 0:
+                        total_result = db_manager.execute_query(count_query, params=params, fetch_one=True)
+                        total = total_result['total'] if total_result else 0
+                return {'total': total, 'limit': limit, 'offset': offset}
+        
+        if stream:
+            # 流式输出时总数/下一页游标在记录之后写出
+            return stream_json_response(
+                'records',
+                _page_rows(db_manager.stream_query(query, params=query_params), limit, page_state),
+                extra=head,
+                row_mapper=_format_history_record,
+                trailer=tail
+            )
+        
+        history_records = list(_page_rows(
+            db_manager.execute_query(query, params=query_params, fetch_all=True) or [],
+            limit, page_state
+        ))
+        
+        response = dict(head)
+        response.update(tail())
+        response['records'] = [_format_history_record(record) for record in history_records]
+        return jsonify(response)
+    
+    except ValueError as e:
         return jsonify({
-            'success': True,
-            'total': total_count,
-            'limit': limit,
-            'offset': offset,
-            'records': [
-                {
-                    'operation_id': record['operation_id'],
-                    'project_id': record['project_id'],
-                    'branch': record['branch'],
-                    'task_name': record['task_name'],
-                    'file_path': record['file_path'],
-                    'content_hash': record['content_hash'],
-                    'sync_status': record['sync_status'],
-                    'sync_timestamp': record['sync_timestamp'].isoformat(),
-                    'retry_count': record['retry_count'],
-                    'error_message': record['error_message'],
-                    'conflict_details': record['conflict_details'],
-                    'created_at': record['created_at'].isoformat(),
-                    'updated_at': record['updated_at'].isoformat()
-                } for record in history_records
-            ]
-        })
-        
+            'success': False,
+            'message': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -463,7 +610,11 @@ def get_sync_stats():
                     'failed_count': overall_stats['failed_count'],
                     'conflict_count': overall_stats['conflict_count'],
                     'success_rate': round(success_rate, 2)
-                }
+                },
+                # 同步队列中各状态的操作数
+                'queue': gitlab_sync_manager.queue.counts(),
+                # 后台同步工作线程状态
+                'workers': sync_worker_pool.stats()
             }
         })
         
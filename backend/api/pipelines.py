@@ -4,6 +4,9 @@
 from flask import Blueprint, request, jsonify
 from backend.utils.database import db_manager
 from backend.utils.gitlab_client import gitlab_client
+from backend.utils.pipeline_task_reconciler import pipeline_task_reconciler
+from backend.utils.json_stream import stream_json_response
+from backend.utils.pagination import encode_cursor, decode_cursor, parse_limit
 from backend.config.settings import WORKSPACE_PATH, TEMPLATE_PATH
 from pathlib import Path
 import shutil
@@ -13,6 +16,12 @@ import time
 # 创建流水线API蓝图
 pipelines_bp = Blueprint('pipelines', __name__, url_prefix='/api/pipelines')
 
+# 流水线列表接口允许通过fields参数选择的字段
+PIPELINE_LIST_FIELDS = ('id', 'project_id', 'branch', 'task', 'stage',
+                        'created_at', 'updated_at', 'created_by', 'updated_by')
+# 键集分页使用的排序键，与索引idx_pipelines_updated_at_id一致
+PIPELINE_CURSOR_KEYS = ('updated_at', 'id')
+
 def init_dependencies(db_mgr, gitlab_cli, workspace_path, template_path):
     """初始化依赖项"""
     global db_manager, gitlab_client, WORKSPACE_PATH, TEMPLATE_PATH
@@ -21,15 +30,79 @@ def init_dependencies(db_mgr, gitlab_cli, workspace_path, template_path):
     WORKSPACE_PATH = workspace_path
     TEMPLATE_PATH = template_path
 
+def _pipeline_unchanged(pipeline, values):
+    """判断流水线记录的字段是否与待保存的值完全一致"""
+    return all(pipeline.get(column) == value for column, value in values.items())
+
 @pipelines_bp.route('', methods=['GET'])
 def get_pipelines():
-    """获取所有流水线列表"""
+    """
+    获取流水线列表
+    
+    查询参数:
+        fields: 逗号分隔的返回字段（可选），列表页可省略task、stage等大字段
+        limit: 每页数量（可选），指定limit或cursor时按(updated_at, id)键集分页
+        cursor: 上一页返回的next_cursor（可选）
+    
+    未指定limit和cursor时返回全部流水线（服务端游标流式输出，内存占用与流水线数量无关）
+    """
     try:
-        pipelines = db_manager.execute_query(
-            "SELECT * FROM pipelines ORDER BY updated_at DESC",
+        fields = request.args.get('fields')
+        if fields:
+            columns = [field.strip() for field in fields.split(',') if field.strip()]
+            invalid_fields = [field for field in columns if field not in PIPELINE_LIST_FIELDS]
+            if invalid_fields:
+                return jsonify({
+                    'error': f'无效的字段: {", ".join(invalid_fields)}，支持的字段: {", ".join(PIPELINE_LIST_FIELDS)}'
+                }), 400
+        else:
+            columns = list(PIPELINE_LIST_FIELDS)
+        
+        cursor = request.args.get('cursor')
+        limit_arg = request.args.get('limit')
+        
+        if not cursor and not limit_arg:
+            pipelines = db_manager.stream_query(
+                f"SELECT {', '.join(columns)} FROM pipelines ORDER BY updated_at DESC, id DESC"
+            )
+            return stream_json_response('pipelines', pipelines)
+        
+        try:
+            limit = parse_limit(limit_arg)
+            position = decode_cursor(cursor, PIPELINE_CURSOR_KEYS) if cursor else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # 排序键不在返回字段中时也要查询出来，用于生成下一页游标
+        select_columns = columns + [key for key in PIPELINE_CURSOR_KEYS if key not in columns]
+        where_clause = ""
+        params = []
+        if position:
+            where_clause = " WHERE (updated_at, id) < (%s, %s)"
+            params.extend([position['updated_at'], position['id']])
+        params.append(limit + 1)
+        
+        rows = db_manager.execute_query(
+            f"""SELECT {', '.join(select_columns)} FROM pipelines{where_clause}
+                ORDER BY updated_at DESC, id DESC
+                LIMIT %s""",
+            params=params,
             fetch_all=True
         )
-        return jsonify({'pipelines': pipelines})
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more:
+            last_row = rows[-1]
+            next_cursor = encode_cursor({key: last_row[key] for key in PIPELINE_CURSOR_KEYS})
+        
+        return jsonify({
+            'pipelines': [{column: row[column] for column in columns} for row in rows],
+            'limit': limit,
+            'has_more': has_more,
+            'next_cursor': next_cursor
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -75,81 +148,51 @@ def create_pipeline():
             except Exception as e:
                 print(f"处理阶段数据失败: {str(e)}")
             
-        # 检查是否已存在相同的项目ID和分支组合
-        existing_pipeline = db_manager.execute_query(
-            "SELECT id FROM pipelines WHERE project_id = %s AND branch = %s",
-            params=(project_id, branch),
-            fetch_one=True
-        )
-        
-        if existing_pipeline:
-            # 如果已存在，更新现有记录
-            pipeline = db_manager.execute_update(
-                """UPDATE pipelines 
-                   SET task = %s, stage = %s, updated_by = %s, updated_at = CURRENT_TIMESTAMP
-                   WHERE project_id = %s AND branch = %s""",
-                params=(task_data, stage_data, data.get('updated_by', 'system'), project_id, branch),
-                return_updated=True
-            )
-            pipeline_id = pipeline['id']
-            operation = '更新'
-        else:
-            # 如果不存在，创建新记录
-            pipeline = db_manager.execute_insert(
-                """INSERT INTO pipelines (project_id, branch, task, stage, updated_by)
-                   VALUES (%s, %s, %s, %s, %s)""",
-                params=(project_id, branch, task_data, stage_data, data.get('updated_by', 'system')),
-                return_id=True
+        # 流水线记录与任务/阶段数据在同一个事务中写入，只提交一次
+        with db_manager.transaction():
+            # 检查是否已存在相同的项目ID和分支组合
+            existing_pipeline = db_manager.execute_query(
+                "SELECT * FROM pipelines WHERE project_id = %s AND branch = %s",
+                params=(project_id, branch),
+                fetch_one=True
             )
-            pipeline_id = pipeline['id']
-            operation = '创建'
-        
-        # 处理任务数据，保存到新的任务表和阶段表中
-        if task_data:
-            try:
-                # 删除现有的任务和阶段数据（如果是更新操作）
-                if existing_pipeline:
-                    db_manager.execute_query(
-                        "DELETE FROM pipeline_tasks WHERE pipeline_id = %s",
-                        params=(pipeline_id,)
+            
+            updated_by = data.get('updated_by', 'system')
+            if existing_pipeline:
+                # 如果已存在，更新现有记录（内容未变化时不写入）
+                if _pipeline_unchanged(existing_pipeline, {'task': task_data, 'stage': stage_data, 'updated_by': updated_by}):
+                    pipeline = existing_pipeline
+                else:
+                    pipeline = db_manager.execute_update(
+                        """UPDATE pipelines 
+                           SET task = %s, stage = %s, updated_by = %s, updated_at = CURRENT_TIMESTAMP
+                           WHERE project_id = %s AND branch = %s""",
+                        params=(task_data, stage_data, updated_by, project_id, branch),
+                        return_updated=True
                     )
-                
-                # 尝试解析JSON字符串
-                tasks = json.loads(task_data) if isinstance(task_data, str) else task_data
-                
-                # 处理每个任务
-                for index, task in enumerate(tasks):
-                    task_name = task.get('name')
-                    task_type = task.get('type', 'maven')
-                    
-                    if task_name:
-                        # 插入任务记录
-                        task_record = db_manager.execute_insert(
-                            """INSERT INTO pipeline_tasks (pipeline_id, name, type, order_index)
-                               VALUES (%s, %s, %s, %s)""",
-                            params=(pipeline_id, task_name, task_type, index),
-                            return_id=True
-                        )
-                        
-                        task_id = task_record['id']
-                        
-                        # 处理任务的阶段
-                        stages = task.get('stages', [])
-                        for stage_index, stage in enumerate(stages):
-                            stage_type = stage.get('type')
-                            stage_name = stage.get('name')
-                            stage_config = stage.get('config', {})
-                            
-                            # 过滤无效的阶段类型
-                            if stage_type and stage_type != 'undefined' and stage_type != 'unknown' and stage_name:
-                                print(f"保存阶段配置 - 任务: {task_name}, 阶段: {stage_type}, 配置: {stage_config}")
-                                db_manager.execute_insert(
-                                    """INSERT INTO pipeline_task_stages (task_id, type, name, order_index, config)
-                                       VALUES (%s, %s, %s, %s, %s)""",
-                                    params=(task_id, stage_type, stage_name, stage_index, json.dumps(stage_config))
-                                )
-            except Exception as e:
-                print(f"保存任务和阶段数据失败: {str(e)}")
+                pipeline_id = pipeline['id']
+                operation = '更新'
+            else:
+                # 如果不存在，创建新记录
+                pipeline = db_manager.execute_insert(
+                    """INSERT INTO pipelines (project_id, branch, task, stage, updated_by)
+                       VALUES (%s, %s, %s, %s, %s)""",
+                    params=(project_id, branch, task_data, stage_data, updated_by),
+                    return_id=True
+                )
+                pipeline_id = pipeline['id']
+                operation = '创建'
+            
+            # 处理任务数据，按差异同步到任务表和阶段表中
+            task_changes = None
+            if task_data:
+                try:
+                    # 任务数据写入失败只回滚到保存点，不影响流水线记录
+                    with db_manager.transaction():
+                        task_changes = pipeline_task_reconciler.reconcile(pipeline_id, task_data)
+                    print(f"保存任务和阶段数据完成: {task_changes}")
+                except Exception as e:
+                    print(f"保存任务和阶段数据失败: {str(e)}")
         
         # 创建GitLab项目并上传文件
         try:
@@ -187,36 +230,34 @@ def create_pipeline():
                 except Exception as e:
                     print(f"处理任务数据失败: {str(e)}")
             
-            # 将工作区中的分支文件夹上传到GitLab
-            gitlab_client.upload_directory(
-                project_id=project_id,
-                local_path=str(branch_path),
-                gitlab_path=branch,
-                branch='main'
-            )
-            
-            # 上传cicd.yml文件
+            # 读取cicd.yml文件
             with open('cicd.yml', 'r', encoding='utf-8') as file:
                 cicd_content = file.read()
             
-            gitlab_client.upload_file(
+            # 将工作区中的分支文件夹和cicd.yml合并为一次提交上传到GitLab
+            sync_result = gitlab_client.upload_directory(
                 project_id=project_id,
-                file_path='cicd.yml',
-                content=cicd_content,
+                local_path=str(branch_path),
+                gitlab_path=branch,
                 branch='main',
-                commit_message="添加cicd.yml文件"
+                extra_files={'cicd.yml': cicd_content},
+                commit_message=f"{operation}流水线: {branch}",
+                ensure_project=False
             )
             
             return jsonify({
                 'message': f'流水线{operation}成功，GitLab项目已同步',
                 'pipeline': pipeline,
-                'gitlab_project': gitlab_project
+                'task_changes': task_changes,
+                'gitlab_project': gitlab_project,
+                'gitlab_sync': sync_result
             })
         except Exception as e:
             # GitLab操作失败，但数据库操作已成功
             return jsonify({
                 'message': f'流水线{operation}成功，但GitLab同步失败',
                 'pipeline': pipeline,
+                'task_changes': task_changes,
                 'error': str(e)
             })
         
@@ -286,53 +327,29 @@ def update_pipeline(pipeline_id):
         new_task_names = [task.get('name') for task in new_tasks if task.get('name')]
         deleted_task_names = [name for name in old_task_names if name not in new_task_names]
         
-        # 更新流水线信息
-        updated_pipeline = db_manager.execute_update(
-            """UPDATE pipelines 
-               SET project_id = %s, branch = %s, task = %s, stage = %s, updated_by = %s, updated_at = CURRENT_TIMESTAMP
-               WHERE id = %s""",
-            params=(project_id, branch, task_data, stage_data, data.get('updated_by', 'system'), pipeline_id),
-            return_updated=True
-        )
-        
-        # 更新任务和阶段表
-        db_manager.execute_query(
-            "DELETE FROM pipeline_tasks WHERE pipeline_id = %s",
-            params=(pipeline_id,)
-        )
-        
-        # 如果任务数据存在，保存到新的任务表和阶段表中
-        if task_data:
+        # 流水线记录与任务/阶段数据在同一个事务中写入，只提交一次
+        with db_manager.transaction():
+            # 更新流水线信息（内容未变化时不写入）
+            updated_by = data.get('updated_by', 'system')
+            if _pipeline_unchanged(old_pipeline, {'project_id': project_id, 'branch': branch, 'task': task_data,
+                                                  'stage': stage_data, 'updated_by': updated_by}):
+                updated_pipeline = old_pipeline
+            else:
+                updated_pipeline = db_manager.execute_update(
+                    """UPDATE pipelines 
+                       SET project_id = %s, branch = %s, task = %s, stage = %s, updated_by = %s, updated_at = CURRENT_TIMESTAMP
+                       WHERE id = %s""",
+                    params=(project_id, branch, task_data, stage_data, updated_by, pipeline_id),
+                    return_updated=True
+                )
+            
+            # 按差异同步任务和阶段表，没有任务数据时删除所有任务
+            task_changes = None
             try:
-                tasks = json.loads(task_data) if isinstance(task_data, str) else task_data
-                
-                for index, task in enumerate(tasks):
-                    task_name = task.get('name')
-                    task_type = task.get('type', 'maven')
-                    
-                    if task_name:
-                        task_record = db_manager.execute_insert(
-                            """INSERT INTO pipeline_tasks (pipeline_id, name, type, order_index)
-                               VALUES (%s, %s, %s, %s)""",
-                            params=(pipeline_id, task_name, task_type, index),
-                            return_id=True
-                        )
-                        
-                        task_id = task_record['id']
-                        
-                        stages = task.get('stages', [])
-                        for stage_index, stage in enumerate(stages):
-                            stage_type = stage.get('type')
-                            stage_name = stage.get('name')
-                            stage_config = stage.get('config', {})
-                            
-                            if stage_type and stage_type != 'undefined' and stage_type != 'unknown' and stage_name:
-                                print(f"更新阶段配置 - 任务: {task_name}, 阶段: {stage_type}, 配置: {stage_config}")
-                                db_manager.execute_insert(
-                                    """INSERT INTO pipeline_task_stages (task_id, type, name, order_index, config)
-                                       VALUES (%s, %s, %s, %s, %s)""",
-                                    params=(task_id, stage_type, stage_name, stage_index, json.dumps(stage_config))
-                                )
+                # 任务数据写入失败只回滚到保存点，不影响流水线记录
+                with db_manager.transaction():
+                    task_changes = pipeline_task_reconciler.reconcile(pipeline_id, task_data)
+                print(f"更新任务和阶段数据完成: {task_changes}")
             except Exception as e:
                 print(f"保存任务和阶段数据失败: {str(e)}")
         
@@ -343,19 +360,12 @@ def update_pipeline(pipeline_id):
             branch_path = WORKSPACE_PATH / str(project_id) / branch
             branch_path.mkdir(parents=True, exist_ok=True)
             
-            # 删除不再需要的任务文件夹
+            # 删除不再需要的本地任务文件夹，GitLab中的对应文件夹在下面的提交中一并删除
             for deleted_task_name in deleted_task_names:
                 task_path = branch_path / deleted_task_name
                 if task_path.exists():
                     shutil.rmtree(str(task_path))
                     print(f"已删除不再需要的本地任务文件夹: {task_path}")
-                
-                try:
-                    gitlab_task_path = f"{branch}/{deleted_task_name}"
-                    gitlab_client.delete_directory(project_id, gitlab_task_path)
-                    print(f"已删除GitLab仓库中的任务文件夹: {gitlab_task_path}")
-                except Exception as e:
-                    print(f"删除GitLab仓库中的任务文件夹失败: {str(e)}")
             
             # 处理任务数据，为每个任务创建文件和目录
             if task_data:
@@ -377,35 +387,36 @@ def update_pipeline(pipeline_id):
                 except Exception as e:
                     print(f"处理任务数据失败: {str(e)}")
             
-            gitlab_client.upload_directory(
+            extra_files = {}
+            try:
+                with open('cicd.yml', 'r', encoding='utf-8') as file:
+                    extra_files['cicd.yml'] = file.read()
+            except Exception as e:
+                print(f"读取cicd.yml文件失败: {str(e)}")
+            
+            # 分支文件夹、cicd.yml和已删除任务的文件夹合并为一次提交
+            sync_result = gitlab_client.upload_directory(
                 project_id=project_id,
                 local_path=str(branch_path),
                 gitlab_path=branch,
-                branch='main'
+                branch='main',
+                extra_files=extra_files,
+                delete_paths=[f"{branch}/{name}" for name in deleted_task_names],
+                commit_message=f"更新流水线: {branch}",
+                ensure_project=False
             )
             
-            try:
-                with open('cicd.yml', 'r', encoding='utf-8') as file:
-                    cicd_content = file.read()
-                
-                gitlab_client.upload_file(
-                    project_id=project_id,
-                    file_path='cicd.yml',
-                    content=cicd_content,
-                    branch='main',
-                    commit_message="更新cicd.yml文件"
-                )
-            except Exception as e:
-                print(f"更新cicd.yml文件失败: {str(e)}")
-            
             return jsonify({
                 'message': '流水线更新成功，GitLab项目已同步',
-                'pipeline': updated_pipeline
+                'pipeline': updated_pipeline,
+                'task_changes': task_changes,
+                'gitlab_sync': sync_result
             })
         except Exception as e:
             return jsonify({
                 'message': '流水线更新成功，但GitLab同步失败',
                 'pipeline': updated_pipeline,
+                'task_changes': task_changes,
                 'error': str(e)
             })
         
@@ -678,7 +689,8 @@ deploy:
                 project_id=project_id,
                 local_path=str(task_path),
                 gitlab_path=f"{branch_name}/{task_name}",
-                branch="main"
+                branch="main",
+                ensure_project=False
             )
             print(f"已将任务文件夹上传到GitLab: {project_id}/{branch_name}/{task_name}")
             
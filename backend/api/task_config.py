@@ -12,6 +12,8 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from utils.config_validator import ConfigValidator
+from utils.task_stage_resolver import TaskStageResolver
+from backend.utils.gitlab_circuit_breaker import CircuitOpenError
 
 # 创建任务配置API蓝图
 task_config_bp = Blueprint('task_config', __name__, url_prefix='/api/task_config')
@@ -20,15 +22,79 @@ task_config_bp = Blueprint('task_config', __name__, url_prefix='/api/task_config
 yaml_parser = None
 gitlab_client = None
 db_manager = None
+task_stage_resolver = None
+sync_manager = None
+sync_workers = None
 WORKSPACE_PATH = None
 
-def init_dependencies(yaml_parser_instance, gitlab_cli, db_mgr, workspace_path):
+def init_dependencies(yaml_parser_instance, gitlab_cli, db_mgr, workspace_path,
+                      gitlab_sync_manager=None, sync_worker_pool=None):
     """初始化依赖项"""
-    global yaml_parser, gitlab_client, db_manager, WORKSPACE_PATH
+    global yaml_parser, gitlab_client, db_manager, task_stage_resolver, sync_manager, sync_workers, WORKSPACE_PATH
     yaml_parser = yaml_parser_instance
     gitlab_client = gitlab_cli
     db_manager = db_mgr
+    sync_manager = gitlab_sync_manager
+    sync_workers = sync_worker_pool
     WORKSPACE_PATH = workspace_path
+    
+    # 同时注册接口中使用的查找语句（PREPARED_LOOKUPS）
+    task_stage_resolver = TaskStageResolver(db_manager)
+
+def _sync_yaml_to_gitlab(project_id, branch, task_name, yaml_file, commit_message, wait=False):
+    """
+    将任务的gitlab-ci.yml同步到GitLab
+    
+    后台同步工作线程运行且不要求等待时，写入同步队列后立即返回操作ID，
+    由工作线程上传（远程内容不同时以本地为准）；否则在请求中直接上传。
+    直接上传时GitLab处于熔断状态（请求未发送）则改为写入同步队列，熔断恢复后由工作线程上传
+    
+    Returns:
+        dict: {'queued': True, 'operation_id', 'status', 'status_url', 'folded_operation_ids'} 或 {'queued': False}，
+              folded_operation_ids为合并到本次操作中、不再单独上传的操作ID；
+              因熔断改为排队时另有deferred（熔断原因）
+    """
+    with open(yaml_file, 'r', encoding='utf-8') as f:
+        content = f.read()
+    
+    gitlab_file_path = f"{branch}/{task_name}/gitlab-ci.yml"
+    if not wait and sync_manager is not None and sync_workers is not None and sync_workers.is_running:
+        return _queue_yaml_sync(project_id, task_name, gitlab_file_path, content, commit_message)
+    
+    try:
+        gitlab_client.upload_file(
+            project_id=project_id,
+            file_path=gitlab_file_path,
+            content=content,
+            branch="main",
+            commit_message=commit_message
+        )
+    except CircuitOpenError as e:
+        if sync_manager is None:
+            raise
+        return dict(_queue_yaml_sync(project_id, task_name, gitlab_file_path, content, commit_message),
+                    deferred=str(e))
+    return {'queued': False}
+
+def _queue_yaml_sync(project_id, task_name, gitlab_file_path, content, commit_message):
+    """将gitlab-ci.yml写入同步队列，由后台工作线程上传"""
+    operation = sync_manager.create_sync_operation(
+        project_id=str(project_id),
+        branch="main",
+        task_name=task_name,
+        file_path=gitlab_file_path,
+        content=content,
+        enqueue=True,
+        commit_message=commit_message,
+        resolution_strategy="local_wins"
+    )
+    return {
+        'queued': True,
+        'operation_id': operation.operation_id,
+        'status': operation.status.value,
+        'status_url': f'/api/gitlab_sync/status/{operation.operation_id}',
+        'folded_operation_ids': operation.folded_operation_ids or []
+    }
 
 @task_config_bp.route('/stage_toggle', methods=['POST'])
 def stage_toggle():
@@ -44,6 +110,7 @@ def stage_toggle():
     - stage_name: 阶段名称（compile/build/deploy）
     - enabled: 是否启用（true/false）
     - sync_to_gitlab: 是否同步到GitLab（默认true）
+    - wait_for_sync: 是否等待GitLab同步完成（默认false，写入同步队列后立即返回gitlab_sync.operation_id）
     
     返回参数：
     - message: 操作结果消息
@@ -103,84 +170,28 @@ def stage_toggle():
             'deploy': variables.get('deploy', 'off')
         }
         
-        # 更新数据库中的阶段配置
+        # 更新数据库中的阶段配置：一次查询解析任务，一条语句插入或合并阶段配置
         try:
-            # 查找对应的pipeline和task
-            pipeline = db_manager.execute_query(
-                "SELECT id FROM pipelines WHERE project_id = %s AND branch = %s",
-                params=(project_id, branch),
-                fetch_one=True
-            )
+            resolved = task_stage_resolver.resolve(project_id, branch, task_name)
             
-            if pipeline:
-                task = db_manager.execute_query(
-                    "SELECT id FROM pipeline_tasks WHERE pipeline_id = %s AND name = %s",
-                    params=(pipeline['id'], task_name),
-                    fetch_one=True
+            if resolved and resolved['task_id']:
+                task_stage_resolver.upsert_stage_configs(
+                    resolved['task_id'],
+                    {stage_name: {'enabled': enabled, 'status': stage_value, 'type': stage_name}},
+                    merge=True
                 )
-                
-                if task:
-                    # 更新或插入阶段配置
-                    existing_stage = db_manager.execute_query(
-                        "SELECT id, config FROM pipeline_task_stages WHERE task_id = %s AND type = %s",
-                        params=(task['id'], stage_name),
-                        fetch_one=True
-                    )
-                    
-                    if existing_stage:
-                        # 更新现有阶段配置
-                        try:
-                            # 安全地解析现有配置
-                            if existing_stage['config']:
-                                if isinstance(existing_stage['config'], str):
-                                    current_config = json.loads(existing_stage['config'])
-                                else:
-                                    current_config = existing_stage['config']
-                            else:
-                                current_config = {}
-                        except (json.JSONDecodeError, TypeError):
-                            print(f"解析现有配置失败，使用空配置: {existing_stage['config']}")
-                            current_config = {}
-                        
-                        current_config['enabled'] = enabled
-                        current_config['status'] = stage_value
-                        
-                        db_manager.execute_update(
-                            "UPDATE pipeline_task_stages SET config = %s WHERE id = %s",
-                            params=(json.dumps(current_config), existing_stage['id'])
-                        )
-                    else:
-                        # 创建新的阶段配置
-                        stage_config = {
-                            'enabled': enabled,
-                            'status': stage_value,
-                            'type': stage_name
-                        }
-                        
-                        db_manager.execute_insert(
-                            """INSERT INTO pipeline_task_stages (task_id, type, name, order_index, config)
-                               VALUES (%s, %s, %s, %s, %s)""",
-                            params=(task['id'], stage_name, stage_name, 
-                                   0 if stage_name == 'compile' else 1 if stage_name == 'build' else 2,
-                                   json.dumps(stage_config))
-                        )
         except Exception as db_error:
             print(f"数据库更新失败: {db_error}")
             # 数据库更新失败不影响主要功能
         
         # 同步到GitLab
+        gitlab_sync = None
         if sync_to_gitlab:
             try:
-                with open(yaml_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                gitlab_file_path = f"{branch}/{task_name}/gitlab-ci.yml"
-                gitlab_client.upload_file(
-                    project_id=project_id,
-                    file_path=gitlab_file_path,
-                    content=content,
-                    branch="main",
-                    commit_message=f"更新{task_name}的{stage_name}阶段开关状态为{stage_value}"
+                gitlab_sync = _sync_yaml_to_gitlab(
+                    project_id, branch, task_name, yaml_file,
+                    commit_message=f"更新{task_name}的{stage_name}阶段开关状态为{stage_value}",
+                    wait=data.get('wait_for_sync', False)
                 )
             except Exception as e:
                 return jsonify({
@@ -198,7 +209,8 @@ def stage_toggle():
                 'name': stage_name,
                 'enabled': enabled,
                 'value': stage_value
-            }
+            },
+            'gitlab_sync': gitlab_sync
         })
     
     except Exception as e:
@@ -289,6 +301,7 @@ def batch_stage_toggle():
     - task_name: 任务名称
     - stages: 阶段配置对象 {compile: true/false, build: true/false, deploy: true/false}
     - sync_to_gitlab: 是否同步到GitLab（默认true）
+    - wait_for_sync: 是否等待GitLab同步完成（默认false，写入同步队列后立即返回gitlab_sync.operation_id）
     
     返回参数：
     - message: 操作结果消息
@@ -348,18 +361,13 @@ def batch_stage_toggle():
         }
         
         # 同步到GitLab
+        gitlab_sync = None
         if sync_to_gitlab:
             try:
-                with open(yaml_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                gitlab_file_path = f"{branch}/{task_name}/gitlab-ci.yml"
-                gitlab_client.upload_file(
-                    project_id=project_id,
-                    file_path=gitlab_file_path,
-                    content=content,
-                    branch="main",
-                    commit_message=f"批量更新{task_name}的阶段开关状态"
+                gitlab_sync = _sync_yaml_to_gitlab(
+                    project_id, branch, task_name, yaml_file,
+                    commit_message=f"批量更新{task_name}的阶段开关状态",
+                    wait=data.get('wait_for_sync', False)
                 )
             except Exception as e:
                 return jsonify({
@@ -374,7 +382,8 @@ def batch_stage_toggle():
             'success': True,
             'message': '批量阶段开关更新成功',
             'stage_status': stage_status,
-            'updated_stages': updated_stages
+            'updated_stages': updated_stages,
+            'gitlab_sync': gitlab_sync
         })
     
     except Exception as e:
@@ -415,6 +424,7 @@ def maven_config():
         - LIMITSCPU: CPU资源限制（默认1000m）
         - LIMITSMEM: 内存资源限制（默认1024Mi）
     - sync_to_gitlab: 是否同步到GitLab（默认true）
+    - wait_for_sync: 是否等待GitLab同步完成（默认false，写入同步队列后立即返回gitlab_sync.operation_id）
     
     返回参数：
     - message: 操作结果消息
@@ -613,15 +623,15 @@ def maven_config():
         # 更新数据库中的阶段配置
         try:
             # 查找对应的pipeline和task
-            pipeline = db_manager.execute_query(
-                "SELECT id FROM pipelines WHERE project_id = %s AND branch = %s",
+            pipeline = db_manager.execute_prepared(
+                'pipeline_by_project_branch',
                 params=(project_id, branch),
                 fetch_one=True
             )
             
             if pipeline:
-                task = db_manager.execute_query(
-                    "SELECT id FROM pipeline_tasks WHERE pipeline_id = %s AND name = %s",
+                task = db_manager.execute_prepared(
+                    'task_by_pipeline_name',
                     params=(pipeline['id'], task_name),
                     fetch_one=True
                 )
@@ -629,8 +639,8 @@ def maven_config():
                 if task:
                     for stage_name, config in updated_configs.items():
                         # 更新或插入阶段配置
-                        existing_stage = db_manager.execute_query(
-                            "SELECT id, config FROM pipeline_task_stages WHERE task_id = %s AND type = %s",
+                        existing_stage = db_manager.execute_prepared(
+                            'stage_by_task_type',
                             params=(task['id'], stage_name),
                             fetch_one=True
                         )
@@ -672,19 +682,14 @@ def maven_config():
             # 数据库更新失败不影响主要功能
         
         # 同步到GitLab
+        gitlab_sync = None
         if sync_to_gitlab:
             try:
-                with open(yaml_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                gitlab_file_path = f"{branch}/{task_name}/gitlab-ci.yml"
                 updated_params = [f"{r['parameter']}={r['value']}" for r in update_results]
-                gitlab_client.upload_file(
-                    project_id=project_id,
-                    file_path=gitlab_file_path,
-                    content=content,
-                    branch="main",
-                    commit_message=f"更新{task_name}的Maven配置参数: {', '.join(updated_params)}"
+                gitlab_sync = _sync_yaml_to_gitlab(
+                    project_id, branch, task_name, yaml_file,
+                    commit_message=f"更新{task_name}的Maven配置参数: {', '.join(updated_params)}",
+                    wait=data.get('wait_for_sync', False)
                 )
             except Exception as e:
                 return jsonify({
@@ -701,7 +706,8 @@ def maven_config():
             'validation_result': validation_result,
             'project_id': project_id,
             'branch': branch,
-            'task_name': task_name
+            'task_name': task_name,
+            'gitlab_sync': gitlab_sync
         })
     
     except Exception as e:
@@ -828,6 +834,7 @@ def npm_config():
         - LIMITSCPU: CPU资源限制（默认500m）
         - LIMITSMEM: 内存资源限制（默认256Mi）
     - sync_to_gitlab: 是否同步到GitLab（默认true）
+    - wait_for_sync: 是否等待GitLab同步完成（默认false，写入同步队列后立即返回gitlab_sync.operation_id）
     
     返回参数：
     - message: 操作结果消息
@@ -982,15 +989,15 @@ def npm_config():
         # 更新数据库中的阶段配置
         try:
             # 查找对应的pipeline和task
-            pipeline = db_manager.execute_query(
-                "SELECT id FROM pipelines WHERE project_id = %s AND branch = %s",
+            pipeline = db_manager.execute_prepared(
+                'pipeline_by_project_branch',
                 params=(project_id, branch),
                 fetch_one=True
             )
             
             if pipeline:
-                task = db_manager.execute_query(
-                    "SELECT id FROM pipeline_tasks WHERE pipeline_id = %s AND name = %s",
+                task = db_manager.execute_prepared(
+                    'task_by_pipeline_name',
                     params=(pipeline['id'], task_name),
                     fetch_one=True
                 )
@@ -998,8 +1005,8 @@ def npm_config():
                 if task:
                     for stage_name, config in updated_configs.items():
                         # 更新或插入阶段配置
-                        existing_stage = db_manager.execute_query(
-                            "SELECT id, config FROM pipeline_task_stages WHERE task_id = %s AND type = %s",
+                        existing_stage = db_manager.execute_prepared(
+                            'stage_by_task_type',
                             params=(task['id'], stage_name),
                             fetch_one=True
                         )
@@ -1041,19 +1048,14 @@ def npm_config():
             # 数据库更新失败不影响主要功能
         
         # 同步到GitLab
+        gitlab_sync = None
         if sync_to_gitlab:
             try:
-                with open(yaml_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                gitlab_file_path = f"{branch}/{task_name}/gitlab-ci.yml"
                 updated_params = [f"{r['parameter']}={r['value']}" for r in update_results]
-                gitlab_client.upload_file(
-                    project_id=project_id,
-                    file_path=gitlab_file_path,
-                    content=content,
-                    branch="main",
-                    commit_message=f"更新{task_name}的NPM配置参数: {', '.join(updated_params)}"
+                gitlab_sync = _sync_yaml_to_gitlab(
+                    project_id, branch, task_name, yaml_file,
+                    commit_message=f"更新{task_name}的NPM配置参数: {', '.join(updated_params)}",
+                    wait=data.get('wait_for_sync', False)
                 )
             except Exception as e:
                 return jsonify({
@@ -1069,7 +1071,8 @@ def npm_config():
             'updated_configs': update_results,
             'project_id': project_id,
             'branch': branch,
-            'task_name': task_name
+            'task_name': task_name,
+            'gitlab_sync': gitlab_sync
         })
     
     except Exception as e:
@@ -1187,6 +1190,7 @@ def deploy_config():
       * REQUESTSMEM: 内存请求资源（默认128Mi，仅NPM项目）
     - resource_conversion: 是否启用资源单位自动转换（默认true）
     - sync_to_gitlab: 是否同步到GitLab（默认true）
+    - wait_for_sync: 是否等待GitLab同步完成（默认false，写入同步队列后立即返回gitlab_sync.operation_id）
     
     返回参数：
     - message: 操作结果消息
@@ -1372,23 +1376,23 @@ def deploy_config():
         # 更新数据库中的阶段配置
         try:
             # 查找对应的pipeline和task
-            pipeline = db_manager.execute_query(
-                "SELECT id FROM pipelines WHERE project_id = %s AND branch = %s",
+            pipeline = db_manager.execute_prepared(
+                'pipeline_by_project_branch',
                 params=(project_id, branch),
                 fetch_one=True
             )
             
             if pipeline:
-                task = db_manager.execute_query(
-                    "SELECT id FROM pipeline_tasks WHERE pipeline_id = %s AND name = %s",
+                task = db_manager.execute_prepared(
+                    'task_by_pipeline_name',
                     params=(pipeline['id'], task_name),
                     fetch_one=True
                 )
                 
                 if task:
                     # 更新或插入部署阶段配置
-                    existing_stage = db_manager.execute_query(
-                        "SELECT id, config FROM pipeline_task_stages WHERE task_id = %s AND type = %s",
+                    existing_stage = db_manager.execute_prepared(
+                        'stage_by_task_type',
                         params=(task['id'], 'deploy'),
                         fetch_one=True
                     )
@@ -1432,19 +1436,14 @@ def deploy_config():
             # 数据库更新失败不影响主要功能
         
         # 同步到GitLab
+        gitlab_sync = None
         if sync_to_gitlab:
             try:
-                with open(yaml_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                gitlab_file_path = f"{branch}/{task_name}/gitlab-ci.yml"
                 updated_params = [f"{r['parameter']}={r['value']}" for r in update_results]
-                gitlab_client.upload_file(
-                    project_id=project_id,
-                    file_path=gitlab_file_path,
-                    content=content,
-                    branch="main",
-                    commit_message=f"更新{task_name}的部署配置参数({template_type}): {', '.join(updated_params)}"
+                gitlab_sync = _sync_yaml_to_gitlab(
+                    project_id, branch, task_name, yaml_file,
+                    commit_message=f"更新{task_name}的部署配置参数({template_type}): {', '.join(updated_params)}",
+                    wait=data.get('wait_for_sync', False)
                 )
             except Exception as e:
                 return jsonify({
@@ -1463,7 +1462,8 @@ def deploy_config():
             'template_type': template_type,
             'project_id': project_id,
             'branch': branch,
-            'task_name': task_name
+            'task_name': task_name,
+            'gitlab_sync': gitlab_sync
         })
     
     except Exception as e:
@@ -2525,6 +2525,7 @@ def batch_update_config():
             }
         },
         "sync_to_gitlab": true,
+        "wait_for_sync": false,
         "validation_level": "normal"
     }
     
@@ -2534,6 +2535,7 @@ def batch_update_config():
     - updated_stages: 更新的阶段列表
     - validation_results: 参数验证结果
     - sync_status: GitLab同步状态
+    - gitlab_sync: 写入同步队列时为{'queued': true, 'operation_id', 'status', 'status_url'}
     """
     try:
         data = request.json
@@ -2673,63 +2675,34 @@ def batch_update_config():
                 'error': f'YAML文件更新异常: {str(yaml_error)}'
             }), 500
         
-        # 更新数据库配置
+        # 更新数据库配置：一次查询解析任务，所有阶段配置一条语句写入
         db_update_status = []
         try:
-            # 查找对应的pipeline和task
-            pipeline = db_manager.execute_query(
-                "SELECT id FROM pipelines WHERE project_id = %s AND branch = %s",
-                params=(project_id, branch),
-                fetch_one=True
-            )
+            resolved = task_stage_resolver.resolve(project_id, branch, task_name)
             
-            if pipeline:
-                task = db_manager.execute_query(
-                    "SELECT id FROM pipeline_tasks WHERE pipeline_id = %s AND name = %s",
-                    params=(pipeline['id'], task_name),
-                    fetch_one=True
-                )
+            if resolved and resolved['task_id']:
+                last_updated = datetime.now().isoformat()
+                stage_configs = {}
+                for stage_name in ['compile', 'build', 'deploy']:
+                    if stage_name not in stage_config:
+                        continue
+                    
+                    stage_data = stage_config[stage_name]
+                    stage_configs[stage_name] = {
+                        'enabled': stage_data.get('enabled', False),
+                        'status': "on" if stage_data.get('enabled', False) else "off",
+                        'type': stage_name,
+                        'template_type': template_type,
+                        'parameters': stage_data.get('config', {}),
+                        'last_updated': last_updated
+                    }
                 
-                if task:
-                    for stage_name in ['compile', 'build', 'deploy']:
-                        if stage_name not in stage_config:
-                            continue
-                        
-                        stage_data = stage_config[stage_name]
-                        
-                        # 查找现有阶段配置
-                        existing_stage = db_manager.execute_query(
-                            "SELECT id, config FROM pipeline_task_stages WHERE task_id = %s AND type = %s",
-                            params=(task['id'], stage_name),
-                            fetch_one=True
-                        )
-                        
-                        # 构建配置数据
-                        config_data = {
-                            'enabled': stage_data.get('enabled', False),
-                            'status': "on" if stage_data.get('enabled', False) else "off",
-                            'type': stage_name,
-                            'template_type': template_type,
-                            'parameters': stage_data.get('config', {}),
-                            'last_updated': datetime.now().isoformat()
-                        }
-                        
-                        if existing_stage:
-                            # 更新现有配置
-                            db_manager.execute_update(
-                                "UPDATE pipeline_task_stages SET config = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
-                                params=(json.dumps(config_data), existing_stage['id'])
-                            )
-                            db_update_status.append(f"{stage_name}: 更新成功")
-                        else:
-                            # 创建新配置
-                            order_index = 0 if stage_name == 'compile' else 1 if stage_name == 'build' else 2
-                            db_manager.execute_insert(
-                                """INSERT INTO pipeline_task_stages (task_id, type, name, order_index, config)
-                                   VALUES (%s, %s, %s, %s, %s)""",
-                                params=(task['id'], stage_name, stage_name, order_index, json.dumps(config_data))
-                            )
-                            db_update_status.append(f"{stage_name}: 创建成功")
+                if stage_configs:
+                    upserted = task_stage_resolver.upsert_stage_configs(resolved['task_id'], stage_configs)
+                    upserted_types = {record['type']: record['inserted'] for record in upserted}
+                    for stage_name in stage_configs:
+                        action = "创建成功" if upserted_types.get(stage_name) else "更新成功"
+                        db_update_status.append(f"{stage_name}: {action}")
                             
         except Exception as db_error:
             print(f"数据库批量更新失败: {db_error}")
@@ -2737,27 +2710,21 @@ def batch_update_config():
         
         # GitLab同步
         sync_status = "跳过"
+        gitlab_sync = None
         if sync_to_gitlab:
             try:
-                with open(yaml_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                gitlab_file_path = f"{branch}/{task_name}/gitlab-ci.yml"
-                
                 # 生成详细的提交消息
                 commit_message_parts = [f"批量更新{task_name}配置"]
                 for stage_info in updated_stages:
                     stage_status = "启用" if stage_info['enabled'] else "禁用"
                     commit_message_parts.append(f"{stage_info['stage']}阶段{stage_status}")
                 
-                gitlab_client.upload_file(
-                    project_id=project_id,
-                    file_path=gitlab_file_path,
-                    content=content,
-                    branch="main",
-                    commit_message=" | ".join(commit_message_parts)
+                gitlab_sync = _sync_yaml_to_gitlab(
+                    project_id, branch, task_name, yaml_file,
+                    commit_message=" | ".join(commit_message_parts),
+                    wait=data.get('wait_for_sync', False)
                 )
-                sync_status = "成功"
+                sync_status = "已加入同步队列" if gitlab_sync['queued'] else "成功"
                 
             except Exception as sync_error:
                 sync_status = f"失败: {str(sync_error)}"
@@ -2770,7 +2737,8 @@ def batch_update_config():
             'validation_results': validation_results,
             'sync_status': sync_status,
             'database_update': db_update_status,
-            'updated_variables_count': len(updated_variables)
+            'updated_variables_count': len(updated_variables),
+            'gitlab_sync': gitlab_sync
         }
         
         # 如果有警告，添加到响应中
@@ -2852,50 +2820,28 @@ def get_batch_update_status():
         stage_summary = {}
         
         try:
-            # 查找对应的pipeline和task
-            pipeline = db_manager.execute_query(
-                "SELECT id FROM pipelines WHERE project_id = %s AND branch = %s",
-                params=(project_id, branch),
-                fetch_one=True
-            )
+            # 一次查询取得任务的全部阶段（已按order_index、updated_at排序）
+            resolved = task_stage_resolver.resolve(project_id, branch, task_name)
             
-            if pipeline:
-                task = db_manager.execute_query(
-                    "SELECT id FROM pipeline_tasks WHERE pipeline_id = %s AND name = %s",
-                    params=(pipeline['id'], task_name),
-                    fetch_one=True
-                )
-                
-                if task:
-                    # 获取所有阶段配置
-                    stages = db_manager.execute_query(
-                        """SELECT type, name, config, created_at, updated_at 
-                           FROM pipeline_task_stages 
-                           WHERE task_id = %s 
-                           ORDER BY order_index, updated_at DESC
-                           LIMIT %s""",
-                        params=(task['id'], limit),
-                        fetch_all=True
-                    )
+            if resolved and resolved['task_id']:
+                for stage in list(resolved['stages'].values())[:limit]:
+                    stage_config = stage['config']
+                    stage_info = {
+                        'stage_type': stage['type'],
+                        'stage_name': stage['name'],
+                        'enabled': stage_config.get('enabled', False),
+                        'template_type': stage_config.get('template_type', 'unknown'),
+                        'parameter_count': len(stage_config.get('parameters', {})),
+                        'last_updated': stage['updated_at'].isoformat() if stage['updated_at'] else None,
+                        'created_at': stage['created_at'].isoformat() if stage['created_at'] else None
+                    }
                     
-                    for stage in stages:
-                        stage_config = json.loads(stage['config']) if stage['config'] else {}
-                        stage_info = {
-                            'stage_type': stage['type'],
-                            'stage_name': stage['name'],
-                            'enabled': stage_config.get('enabled', False),
-                            'template_type': stage_config.get('template_type', 'unknown'),
-                            'parameter_count': len(stage_config.get('parameters', {})),
-                            'last_updated': stage['updated_at'].isoformat() if stage['updated_at'] else None,
-                            'created_at': stage['created_at'].isoformat() if stage['created_at'] else None
-                        }
-                        
-                        update_history.append(stage_info)
-                        stage_summary[stage['type']] = {
-                            'enabled': stage_config.get('enabled', False),
-                            'parameter_count': len(stage_config.get('parameters', {})),
-                            'last_updated': stage['updated_at'].isoformat() if stage['updated_at'] else None
-                        }
+                    update_history.append(stage_info)
+                    stage_summary[stage['type']] = {
+                        'enabled': stage_config.get('enabled', False),
+                        'parameter_count': len(stage_config.get('parameters', {})),
+                        'last_updated': stage['updated_at'].isoformat() if stage['updated_at'] else None
+                    }
                         
         except Exception as db_error:
             print(f"数据库查询失败: {db_error}")
@@ -11,12 +11,18 @@ import os
 # 添加后端路径到系统路径
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
+from utils.pagination import (encode_cursor, decode_cursor, parse_limit,
+                              parse_count_mode, estimate_row_count)
+
 # 创建模板配置API蓝图
 template_config_bp = Blueprint('template_config', __name__, url_prefix='/api/template_config')
 
 # 稍后在main.py中初始化依赖项
 db_manager = None
 
+# 模板列表键集分页的排序键
+TEMPLATE_CURSOR_KEYS = ('created_at', 'id')
+
 def init_dependencies(db_mgr):
     """初始化依赖项"""
     global db_manager
@@ -34,15 +40,18 @@ def list_templates():
     - stage_type: 阶段类型过滤 (compile/build/deploy)
     - is_system: 是否系统模板 (true/false)
     - is_active: 是否激活 (true/false, 默认true)
-    - page: 页码 (默认1)
+    - page: 页码 (默认1，仅偏移分页)
     - limit: 每页数量 (默认20)
     - keyword: 关键词搜索 (名称或描述)
+    - pagination: 分页方式 (offset/cursor, 默认offset；传入cursor时自动使用cursor)
+    - cursor: 上一页返回的next_cursor，按(created_at, id)键集翻页
+    - count: 键集分页的总数统计方式 (exact/estimate/none, 默认none)
     
     返回参数：
     - success: 操作是否成功
     - templates: 模板列表
-    - pagination: 分页信息
-    - total: 总数量
+    - pagination: 分页信息（键集分页时包含next_cursor）
+    - total: 总数量（键集分页且count=none时为null）
     """
     try:
         # 获取查询参数
@@ -51,8 +60,10 @@ def list_templates():
         is_system = request.args.get('is_system')
         is_active = request.args.get('is_active', 'true')
         page = int(request.args.get('page', 1))
-        limit = int(request.args.get('limit', 20))
+        limit = parse_limit(request.args.get('limit'), default=20)
         keyword = request.args.get('keyword', '').strip()
+        cursor = request.args.get('cursor')
+        pagination_mode = request.args.get('pagination', 'offset')
         
         # 构建查询条件
         where_conditions = []
@@ -83,26 +94,80 @@ def list_templates():
         if where_conditions:
             where_clause = " WHERE " + " AND ".join(where_conditions)
         
-        # 计算总数
-        count_query = f"SELECT COUNT(*) as total FROM stage_config_templates{where_clause}"
-        total_result = db_manager.execute_query(count_query, params=params, fetch_one=True)
-        total = total_result['total'] if total_result else 0
-        
-        # 计算偏移量
-        offset = (page - 1) * limit
-        
-        # 查询模板列表
-        list_query = f"""
+        base_query = """
             SELECT id, name, description, template_type, stage_type, 
                    default_config, config_schema, version, is_system, 
-                   is_active, created_by, created_at, updated_at
+                   is_active, created_by, created_at, updated_at{extra_columns}
             FROM stage_config_templates{where_clause}
-            ORDER BY created_at DESC
-            LIMIT %s OFFSET %s
+            ORDER BY created_at DESC, id DESC
+            LIMIT %s{offset_clause}
         """
-        params.extend([limit, offset])
         
-        templates_raw = db_manager.execute_query(list_query, params=params, fetch_all=True)
+        if cursor or pagination_mode == 'cursor':
+            # 键集分页：按(created_at, id)定位，与翻页深度无关
+            count_mode = parse_count_mode(request.args.get('count'), default='none')
+            keyset_conditions = list(where_conditions)
+            keyset_params = list(params)
+            if cursor:
+                position = decode_cursor(cursor, TEMPLATE_CURSOR_KEYS)
+                keyset_conditions.append("(created_at, id) < (%s, %s)")
+                keyset_params.extend([position['created_at'], position['id']])
+            keyset_where = " WHERE " + " AND ".join(keyset_conditions) if keyset_conditions else ""
+            
+            # 多取一行用于判断是否还有下一页
+            list_query = base_query.format(extra_columns='', where_clause=keyset_where, offset_clause='')
+            templates_raw = db_manager.execute_query(list_query, params=keyset_params + [limit + 1],
+                                                     fetch_all=True) or []
+            has_next = len(templates_raw) > limit
+            templates_raw = templates_raw[:limit]
+            next_cursor = None
+            if has_next:
+                last = templates_raw[-1]
+                next_cursor = encode_cursor({key: last[key] for key in TEMPLATE_CURSOR_KEYS})
+            
+            total = None
+            if count_mode == 'exact':
+                count_query = f"SELECT COUNT(*) as total FROM stage_config_templates{where_clause}"
+                total_result = db_manager.execute_query(count_query, params=params, fetch_one=True)
+                total = total_result['total'] if total_result else 0
+            elif count_mode == 'estimate':
+                total = estimate_row_count(db_manager, 'stage_config_templates', where_clause, params)
+            
+            pagination = {
+                'mode': 'cursor',
+                'limit': limit,
+                'has_next': has_next,
+                'next_cursor': next_cursor,
+                'total': total,
+                'total_is_estimate': count_mode == 'estimate'
+            }
+        else:
+            # 偏移分页（兼容旧接口）：总数通过窗口函数与列表在同一条查询中取得
+            offset = (page - 1) * limit
+            list_query = base_query.format(extra_columns=', count(*) OVER() AS total_count',
+                                           where_clause=where_clause, offset_clause=' OFFSET %s')
+            templates_raw = db_manager.execute_query(list_query, params=params + [limit, offset],
+                                                     fetch_all=True) or []
+            
+            if templates_raw:
+                total = templates_raw[0]['total_count']
+            elif offset > 0:
+                # 页码超出范围时窗口函数没有结果行，单独计数
+                count_query = f"SELECT COUNT(*) as total FROM stage_config_templates{where_clause}"
+                total_result = db_manager.execute_query(count_query, params=params, fetch_one=True)
+                total = total_result['total'] if total_result else 0
+            else:
+                total = 0
+            
+            total_pages = (total + limit - 1) // limit
+            pagination = {
+                'page': page,
+                'limit': limit,
+                'total': total,
+                'total_pages': total_pages,
+                'has_next': page < total_pages,
+                'has_prev': page > 1
+            }
         
         # 格式化模板数据
         templates = []
@@ -124,17 +189,6 @@ def list_templates():
             }
             templates.append(template_data)
         
-        # 分页信息
-        total_pages = (total + limit - 1) // limit
-        pagination = {
-            'page': page,
-            'limit': limit,
-            'total': total,
-            'total_pages': total_pages,
-            'has_next': page < total_pages,
-            'has_prev': page > 1
-        }
-        
         return jsonify({
             'success': True,
             'templates': templates,
@@ -142,6 +196,11 @@ def list_templates():
             'total': total
         })
     
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
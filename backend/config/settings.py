@@ -10,7 +10,31 @@ DB_CONFIG = {
     'user': '',
     'password': '',
     'host': '',
-    'port': ''
+    'port': '',
+    # 连接池配置（非psycopg2连接参数，由DatabaseManager单独解析）
+    'pool': {
+        'enabled': True,           # 是否启用连接池
+        'min_size': 1,             # 最小保持连接数
+        'max_size': 10,            # 最大连接数
+        'idle_timeout': 300,       # 空闲连接回收时间（秒）
+        'checkout_timeout': 30,    # 获取连接的最长等待时间（秒）
+        'health_check': True,      # 取出连接时是否进行健康检查
+        'health_check_interval': 30  # 空闲超过该时间（秒）的连接取出时执行SELECT 1探测
+    },
+    # 服务端游标流式查询每次从数据库取回的行数
+    'stream_itersize': 1000,
+    # SQL执行统计配置（非psycopg2连接参数）
+    'instrumentation': {
+        'enabled': True,           # 是否记录每条语句的耗时、行数和获取连接耗时
+        'slow_query_ms': 500,      # 执行耗时超过该值（毫秒）的语句打印慢查询日志，None表示关闭
+        'log_params': False,       # 慢查询日志中是否打印语句参数（可能包含敏感数据）
+        'max_fingerprints': 500,   # 最多统计的语句指纹数，超出后归入<other>
+        'buckets_ms': [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]  # 耗时直方图桶（毫秒）
+    },
+    # 命名预处理语句（非psycopg2连接参数），只在启用连接池时生效；关闭后execute_prepared退化为普通查询
+    'prepared_statements': {
+        'enabled': True
+    }
 }
 
 # GitLab API配置
@@ -18,6 +42,93 @@ GITLAB_API_URL = ''
 GITLAB_NAMESPACE = 'cicd'  # GitLab命名空间/组
 GITLAB_TOKEN = ''  # 替换为你的GitLab访问令牌
 
+# GitLab HTTP连接配置（GitLabClient内部的requests.Session连接池）
+GITLAB_HTTP_CONFIG = {
+    'pool_connections': 4,     # 缓存连接池的主机数
+    'pool_maxsize': 16,        # 每个主机保持的最大连接数，应不小于并发同步线程数
+    'pool_block': False,       # 连接数达到上限时是否阻塞等待（False时临时创建连接，用完即关闭）
+    'connect_timeout': 5,      # 建立连接超时（秒）
+    'read_timeout': 30,        # 读取响应超时（秒）
+    'max_retries': 2,          # 连接失败及GET请求遇到502/503/504时的重试次数
+    'backoff_factor': 0.5,     # 重试退避系数（秒）
+    'verify_ssl': False,       # 是否校验GitLab证书
+    # 按接口类型设置 (连接超时, 读取超时)，未列出的接口使用connect_timeout/read_timeout
+    'endpoint_timeouts': {
+        'groups': (3, 5),
+        'projects': (3, 10),
+        'files': (3, 15),
+        'tree': (3, 15),
+        'commits': (3, 60)     # 批量提交可能包含大量文件，允许更长的处理时间
+    }
+}
+
+# GitLab熔断配置：连续失败达到阈值后，在恢复时间内直接拒绝请求，不再等待超时
+GITLAB_CIRCUIT_BREAKER_CONFIG = {
+    'enabled': True,
+    'failure_threshold': 5,      # 连续失败（连接错误、超时、5xx）多少次后熔断
+    'recovery_timeout': 30,      # 熔断持续时间（秒），之后放行探测请求
+    'half_open_max_calls': 1     # 半开状态下同时放行的探测请求数
+}
+
+# GitLab目录上传配置
+GITLAB_UPLOAD_CONFIG = {
+    'batch_commit': True,                   # 使用Commits API将整个目录合并为一次提交
+    'max_payload_bytes': 8 * 1024 * 1024,   # 单次提交请求体的最大字节数，超出时拆分为多次提交
+    'max_actions_per_commit': 500,          # 单次提交包含的最大文件操作数
+    'tree_page_size': 100,                  # 获取仓库文件列表时每页的条数
+    'manifest_ttl': 60                      # 仓库文件清单（路径 -> blob SHA）缓存时间（秒），0表示不缓存
+}
+
+# GitLab请求限速配置（每个GitLab主机一个令牌桶，并遵循RateLimit-*/Retry-After响应头）
+GITLAB_RATE_LIMIT_CONFIG = {
+    'enabled': True,
+    'requests_per_second': 10,   # 令牌补充速率
+    'burst': 20,                 # 令牌桶容量（允许的突发请求数）
+    'max_wait': 60,              # 单个请求等待配额的最长时间（秒），超出时抛出GitLabRateLimitError
+    'max_429_retries': 3,        # 收到429后按Retry-After等待并重发的最大次数
+    'default_retry_after': 5     # 429响应未给出等待时间时的默认等待秒数
+}
+
+# 异步GitLab客户端配置（backend/utils/async_gitlab_client.py）
+GITLAB_ASYNC_CONFIG = {
+    'max_concurrency': 8,    # 同时进行的GitLab请求数上限，应不大于GITLAB_HTTP_CONFIG['pool_maxsize']
+    'call_timeout': 300      # 同步封装等待单次调用结果的超时时间（秒）
+}
+
+# GitLab元数据缓存配置（首次使用时才向GitLab查询，导入模块时不发送请求）
+GITLAB_CACHE_CONFIG = {
+    'namespace_ttl': 3600,   # 组(namespace) ID缓存时间（秒）
+    'project_ttl': 300,      # 项目信息（数字ID、默认分支、路径）缓存时间（秒），0表示不缓存
+    'negative_ttl': 30       # 查询失败或不存在时的缓存时间（秒），期间不重复请求
+}
+
+# GitLab同步操作队列配置（gitlab_sync_operations表）
+SYNC_QUEUE_CONFIG = {
+    'lease_seconds': 120,     # 领取操作后持有租约的时间（秒），执行期间每1/3租期续租一次；持有者崩溃后租约过期即可被重新领取
+    'retention_days': 7,      # 已完成操作的保留天数
+    'coalesce_window': 2.0,   # 入队后等待多少秒再执行，期间同一文件的新操作合并为一次上传（0为不合并）
+    'coalesce_max_delay': 10  # 连续合并时从第一个操作入队起最多延迟的秒数
+}
+
+# 进程内同步操作记录配置（状态以gitlab_sync_operations表为准，这里只保存最近使用的操作）
+SYNC_REGISTRY_CONFIG = {
+    'max_entries': 1000,      # 最多保存的操作数，超过时淘汰最久未使用的
+    'ttl': 3600,              # 超过多少秒未使用的操作被清理
+    'sweep_interval': 60      # 后台清理间隔（秒）
+}
+
+# 后台同步工作线程配置
+# 多进程部署时每个进程各自启动threads个线程，通过队列表的租约互不重复地领取操作；
+# 由start_backend.py、gunicorn.conf.py的post_fork钩子启动，导入backend.main时不会启动；
+# 也可以用 python -m backend.utils.sync_worker 单独启动工作进程
+SYNC_WORKER_CONFIG = {
+    'enabled': True,          # 是否随Backend API服务启动后台工作线程
+    'threads': 2,             # 工作线程数
+    'poll_interval': 1.0,     # 队列为空时的轮询间隔（秒），有新操作入队时立即唤醒
+    'claim_batch_size': 5,    # 每次领取的操作数
+    'shutdown_timeout': 30    # 停止时等待正在执行的操作完成的最长时间（秒）
+}
+
 # 路径配置
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 BASE_PATH = BASE_DIR / "pipelines"
@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response
 from flask_cors import CORS
 import sys
 import os
+import atexit
 from pathlib import Path
 
 # 添加项目根目录到Python路径
@@ -13,9 +14,13 @@ project_root = current_dir.parent
 sys.path.insert(0, str(project_root))
 
 # 导入配置和工具类
-from backend.config.settings import FLASK_CONFIG, ensure_directories
+from backend.config.settings import FLASK_CONFIG, SYNC_WORKER_CONFIG, ensure_directories
 from backend.utils.database import db_manager
 from backend.utils.gitlab_client import gitlab_client
+from backend.utils.gitlab_rate_limiter import rate_limit_scheduler
+from backend.utils.gitlab_circuit_breaker import gitlab_circuit_breakers
+from backend.utils.gitlab_sync_manager import gitlab_sync_manager
+from backend.utils.sync_worker import sync_worker_pool
 from backend.utils.yaml_config_parser import YamlConfigParser
 from backend.config.settings import WORKSPACE_PATH, TEMPLATE_PATH
 
@@ -43,7 +48,8 @@ ensure_directories()
 yaml_parser = YamlConfigParser()
 init_pipelines_deps(db_manager, gitlab_client, WORKSPACE_PATH, TEMPLATE_PATH)
 init_yaml_deps(YamlConfigParser, gitlab_client, WORKSPACE_PATH)
-init_task_config_deps(yaml_parser, gitlab_client, db_manager, WORKSPACE_PATH)
+init_task_config_deps(yaml_parser, gitlab_client, db_manager, WORKSPACE_PATH,
+                      gitlab_sync_manager, sync_worker_pool)
 init_template_config_deps(db_manager)
 
 # 注册API蓝图
@@ -62,6 +68,33 @@ except ImportError as e:
     print(f"⚠️ GitLab同步模块导入失败: {e}")
     print("GitLab同步功能将不可用")
 
+def start_background_workers(debug=False):
+    """
+    启动后台同步工作线程，进程退出时等待正在执行的同步操作完成
+
+    只由服务启动入口调用（start_backend.py、直接运行本模块、gunicorn的post_fork钩子），
+    导入应用时不启动，避免脚本、测试等导入app的进程也去领取队列中的操作。
+
+    Args:
+        debug: 是否以debug模式运行；debug模式下werkzeug重载器的父进程只负责监视文件变化，
+               只在其启动的子进程（WERKZEUG_RUN_MAIN=true）中启动工作线程
+
+    Returns:
+        bool: 是否启动了工作线程
+    """
+    if not SYNC_WORKER_CONFIG.get('enabled', True):
+        return False
+    if debug and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return False
+    if sync_worker_pool.start():
+        atexit.register(stop_background_workers)
+        return True
+    return False
+
+def stop_background_workers():
+    """停止后台同步工作线程"""
+    sync_worker_pool.stop()
+
 # 健康检查接口
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -101,6 +134,65 @@ def get_system_info():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# 数据库连接池统计接口
+@app.route('/api/system/db_pool', methods=['GET'])
+def get_db_pool_stats():
+    """获取数据库连接池统计信息（用于压测时评估连接池大小）"""
+    return jsonify({'pool': db_manager.get_pool_stats()})
+
+# SQL执行统计接口
+@app.route('/api/system/db_metrics', methods=['GET'])
+def get_db_query_metrics():
+    """
+    获取按语句指纹聚合的SQL执行统计
+
+    查询参数:
+        top: 只返回前N条语句（默认50）
+        sort: 排序字段 total_ms/calls/mean_ms/max_ms/p95_ms/errors/rows（默认total_ms）
+        format: 为prometheus时以Prometheus文本格式输出，供监控系统抓取
+    """
+    try:
+        if request.args.get('format') == 'prometheus':
+            return Response(db_manager.metrics.to_prometheus(),
+                            mimetype='text/plain; version=0.0.4')
+        top = int(request.args.get('top', 50))
+        sort_by = request.args.get('sort', 'total_ms')
+        return jsonify(db_manager.metrics.snapshot(top=top, sort_by=sort_by))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/system/db_metrics', methods=['DELETE'])
+def reset_db_query_metrics():
+    """清空SQL执行统计"""
+    db_manager.metrics.reset()
+    return jsonify({'success': True})
+
+# GitLab请求配额接口
+@app.route('/api/system/gitlab_rate_limit', methods=['GET'])
+def get_gitlab_rate_limit():
+    """获取各GitLab主机当前的请求配额（令牌数、服务端剩余配额、限速等待统计）"""
+    return jsonify(rate_limit_scheduler.snapshot())
+
+# GitLab熔断状态接口
+@app.route('/api/system/gitlab_circuit', methods=['GET'])
+def get_gitlab_circuit():
+    """获取各GitLab主机的熔断器状态（closed/open/half_open、连续失败次数、拒绝请求数）"""
+    return jsonify(gitlab_circuit_breakers.snapshot())
+
+# 后台同步工作线程状态接口
+@app.route('/api/system/sync_workers', methods=['GET'])
+def get_sync_workers():
+    """获取后台同步工作线程状态（线程数、已处理操作数）、同步队列中各状态的操作数及进程内操作记录数"""
+    try:
+        queue = gitlab_sync_manager.queue.counts()
+    except Exception as e:
+        queue = {'error': str(e)}
+    return jsonify({
+        'workers': sync_worker_pool.stats(),
+        'queue': queue,
+        'registry': gitlab_sync_manager.sync_operations.stats()
+    })
+
 # 处理CORS预检请求
 @app.before_request
 def handle_preflight():
@@ -228,6 +320,7 @@ if __name__ == '__main__':
     print(f"工作区路径: {WORKSPACE_PATH}")
     print(f"模板路径: {TEMPLATE_PATH}")
     
+    start_background_workers(debug=FLASK_CONFIG['DEBUG'])
     app.run(
         host=FLASK_CONFIG['HOST'],
         port=FLASK_CONFIG['PORT'],
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+基于asyncio的GitLab客户端
+
+AsyncGitLabClient提供与GitLabClient相同的方法（upload_file、write_file、upload_directory、
+delete_directory、get_project、get_remote_file_info等），每个调用在线程池中执行GitLabClient的同步方法，
+复用其连接池、文件清单缓存和项目缓存，并通过信号量限制同时进行的GitLab请求数。
+对同一(项目, 分支)的写操作按顺序执行，避免并发提交互相冲突。
+
+SyncGitLabFacade在后台线程中运行事件循环，供Flask接口等同步代码直接调用批量方法。
+"""
+
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+from backend.config.settings import GITLAB_ASYNC_CONFIG
+from backend.utils.gitlab_client import GitLabClient, gitlab_client
+
+
+class AsyncGitLabClient:
+    """异步GitLab API客户端"""
+
+    def __init__(self, client: Optional[GitLabClient] = None, max_concurrency: Optional[int] = None):
+        self.client = client or gitlab_client
+        self.max_concurrency = max_concurrency or GITLAB_ASYNC_CONFIG.get('max_concurrency', 8)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        # 信号量和分支锁都绑定到创建它们的事件循环，按循环分别保存
+        self._loop_state = weakref.WeakKeyDictionary()
+        self._state_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                    thread_name_prefix='gitlab-async')
+            return self._executor
+
+    def _state(self) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        with self._state_lock:
+            state = self._loop_state.get(loop)
+            if state is None:
+                state = {'semaphore': asyncio.Semaphore(self.max_concurrency), 'ref_locks': {}}
+                self._loop_state[loop] = state
+            return state
+
+    def _acquire_ref_lock(self, project_id, branch):
+        """同一(项目, 分支)共用一把锁，返回(键, [锁, 使用数])"""
+        ref_locks = self._state()['ref_locks']
+        key = (str(project_id), branch)
+        entry = ref_locks.get(key)
+        if entry is None:
+            entry = ref_locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        return key, entry
+
+    def _release_ref_lock(self, key, entry):
+        """没有协程持有或等待时移除该分支的锁，避免锁表随分支数无限增长"""
+        entry[1] -= 1
+        if entry[1] == 0:
+            self._state()['ref_locks'].pop(key, None)
+
+    async def _run(self, func, *args, **kwargs):
+        """在线程池中执行同步方法，同时执行的调用数不超过max_concurrency"""
+        async with self._state()['semaphore']:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), partial(func, *args, **kwargs))
+
+    async def _run_on_ref(self, project_id, branch, func, *args, **kwargs):
+        """对同一分支的写操作依次执行"""
+        key, entry = self._acquire_ref_lock(project_id, branch)
+        try:
+            async with entry[0]:
+                return await self._run(func, *args, **kwargs)
+        finally:
+            self._release_ref_lock(key, entry)
+
+    async def get_project(self, project_id, refresh=False):
+        return await self._run(self.client.get_project, project_id, refresh=refresh)
+
+    async def create_project(self, project_id):
+        return await self._run(self.client.create_project, project_id)
+
+    async def get_remote_file_info(self, project_id, file_path, branch="main"):
+        return await self._run(self.client.get_remote_file_info, project_id, file_path, branch)
+
+    async def get_manifest(self, project_id, branch="main", refresh=False):
+        return await self._run(self.client.get_manifest, project_id, branch, refresh=refresh)
+
+    async def list_tree(self, project_id, path="", branch="main", recursive=True):
+        return await self._run(self.client.list_tree, project_id, path, branch, recursive)
+
+    async def upload_file(self, project_id, file_path, content, branch="main", commit_message="添加文件"):
+        return await self._run_on_ref(project_id, branch, self.client.upload_file,
+                                      project_id, file_path, content, branch, commit_message)
+
+    async def upload_directory(self, project_id, local_path, gitlab_path, branch="main", **kwargs):
+        return await self._run_on_ref(project_id, branch, self.client.upload_directory,
+                                      project_id, local_path, gitlab_path, branch, **kwargs)
+
+    async def commit_actions(self, project_id, actions, branch="main", commit_message="更新文件"):
+        return await self._run_on_ref(project_id, branch, self.client.commit_actions,
+                                      project_id, actions, branch, commit_message)
+
+    async def write_file(self, project_id, file_path, content, branch="main", commit_message="更新文件",
+                         action="update", last_commit_id=None):
+        return await self._run_on_ref(project_id, branch, self.client.write_file,
+                                      project_id, file_path, content, branch, commit_message,
+                                      action, last_commit_id)
+
+    async def delete_file(self, project_id, file_path, branch="main"):
+        return await self._run_on_ref(project_id, branch, self.client.delete_file,
+                                      project_id, file_path, branch)
+
+    async def delete_directory(self, project_id, directory_path, branch="main", commit_message=None):
+        return await self._run_on_ref(project_id, branch, self.client.delete_directory,
+                                      project_id, directory_path, branch, commit_message)
+
+    async def delete_project(self, project_id):
+        return await self._run(self.client.delete_project, project_id)
+
+    async def upload_files(self, uploads: List[Dict[str, Any]]) -> List[Any]:
+        """
+        并发上传多个文件
+
+        Args:
+            uploads: [{'project_id', 'file_path', 'content', 'branch', 'commit_message'}, ...]
+
+        Returns:
+            list: 与uploads顺序一致的上传结果，失败的项为对应的异常
+        """
+        return await asyncio.gather(*(self.upload_file(**upload) for upload in uploads),
+                                    return_exceptions=True)
+
+    async def upload_directories(self, uploads: List[Dict[str, Any]]) -> List[Any]:
+        """
+        并发上传多个目录（如多个项目或分支）
+
+        Args:
+            uploads: [{'project_id', 'local_path', 'gitlab_path', 'branch', ...upload_directory的其他参数}, ...]
+
+        Returns:
+            list: 与uploads顺序一致的上传结果，失败的项为对应的异常
+        """
+        return await asyncio.gather(*(self.upload_directory(**upload) for upload in uploads),
+                                    return_exceptions=True)
+
+    async def get_remote_file_infos(self, files: List[Dict[str, Any]]) -> List[Any]:
+        """
+        并发获取多个远程文件
+
+        Args:
+            files: [{'project_id', 'file_path', 'branch'}, ...]
+        """
+        return await asyncio.gather(*(self.get_remote_file_info(**item) for item in files),
+                                    return_exceptions=True)
+
+    async def map_concurrent(self, func, items: List[Any]) -> List[Any]:
+        """
+        以items中的每一项并发调用func
+
+        用于包含多次GitLab请求的同步函数（如同步管理器中冲突检测加写入的单个同步操作），
+        与本客户端的其他调用共用max_concurrency并发上限
+
+        Returns:
+            list: 与items顺序一致的结果，失败的项为对应的异常
+        """
+        return await asyncio.gather(*(self._run(func, item) for item in items), return_exceptions=True)
+
+    def close(self):
+        """关闭线程池"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+class SyncGitLabFacade:
+    """
+    AsyncGitLabClient的同步封装
+
+    首次调用时启动一个运行事件循环的后台线程，同步代码调用的方法在该循环中执行并等待结果，
+    多个线程可同时调用。
+    """
+
+    def __init__(self, async_client: Optional[AsyncGitLabClient] = None, timeout: Optional[float] = None):
+        self.async_client = async_client or AsyncGitLabClient()
+        self.timeout = timeout or GITLAB_ASYNC_CONFIG.get('call_timeout', 300)
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                started = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(started.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run, name='gitlab-async-loop', daemon=True)
+                self._thread.start()
+                started.wait()
+                self._loop = loop
+            return self._loop
+
+    def call(self, coroutine_function, *args, **kwargs):
+        """在后台事件循环中执行协程函数并返回结果"""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(coroutine_function(*args, **kwargs), loop)
+        return future.result(timeout=self.timeout)
+
+    def __getattr__(self, name):
+        # 将AsyncGitLabClient的协程方法包装为同步方法，如facade.upload_files([...])
+        attribute = getattr(self.async_client, name)
+        if asyncio.iscoroutinefunction(attribute):
+            return partial(self.call, attribute)
+        return attribute
+
+    def close(self):
+        """停止后台事件循环并关闭线程池"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = None
+            self._thread = None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+        self.async_client.close()
+
+
+# 全局实例（线程池和事件循环在首次使用时创建）
+async_gitlab_client = AsyncGitLabClient()
+gitlab_sync_facade = SyncGitLabFacade(async_gitlab_client)
@@ -24,8 +24,8 @@ class CompleteDatabaseSetup:
                 branch VARCHAR(100) NOT NULL DEFAULT 'develop',
                 task TEXT,
                 stage TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
                 created_by VARCHAR(100) DEFAULT 'system',
                 updated_by VARCHAR(100) DEFAULT 'system',
                 UNIQUE(project_id, branch)
@@ -64,7 +64,8 @@ class CompleteDatabaseSetup:
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 created_by VARCHAR(100) DEFAULT 'system',
                 updated_by VARCHAR(100) DEFAULT 'system',
-                FOREIGN KEY (task_id) REFERENCES pipeline_tasks(id) ON DELETE CASCADE
+                FOREIGN KEY (task_id) REFERENCES pipeline_tasks(id) ON DELETE CASCADE,
+                CONSTRAINT uq_pipeline_task_stages_task_type UNIQUE (task_id, type)
             )
         """)
         
@@ -82,7 +83,7 @@ class CompleteDatabaseSetup:
                 is_system BOOLEAN DEFAULT false,
                 is_active BOOLEAN DEFAULT true,
                 version INTEGER DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 created_by VARCHAR(100) DEFAULT 'system',
                 updated_by VARCHAR(100) DEFAULT 'system',
@@ -115,7 +116,80 @@ class CompleteDatabaseSetup:
                 description TEXT
             )
         """)
-        
+
+        # 7. 创建gitlab_sync_history表
+        print("创建gitlab_sync_history表...")
+        db_manager.execute_query("""
+            CREATE TABLE IF NOT EXISTS gitlab_sync_history (
+                id SERIAL PRIMARY KEY,
+                operation_id VARCHAR(32) UNIQUE NOT NULL,
+                project_id VARCHAR(100) NOT NULL,
+                branch VARCHAR(100) NOT NULL DEFAULT 'main',
+                task_name VARCHAR(100) NOT NULL,
+                file_path VARCHAR(500) NOT NULL,
+                content_hash VARCHAR(64) NOT NULL,
+                sync_status VARCHAR(20) NOT NULL,
+                sync_timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                retry_count INTEGER NOT NULL DEFAULT 0,
+                error_message TEXT,
+                conflict_details JSONB,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # 8. 创建gitlab_sync_operations表（同步操作队列）
+        print("创建gitlab_sync_operations表...")
+        db_manager.execute_query("""
+            CREATE TABLE IF NOT EXISTS gitlab_sync_operations (
+                id BIGSERIAL PRIMARY KEY,
+                operation_id VARCHAR(32) UNIQUE NOT NULL,
+                project_id VARCHAR(100) NOT NULL,
+                branch VARCHAR(100) NOT NULL DEFAULT 'main',
+                task_name VARCHAR(100) NOT NULL,
+                file_path VARCHAR(500) NOT NULL,
+                content TEXT,
+                content_hash VARCHAR(64) NOT NULL,
+                status VARCHAR(20) NOT NULL DEFAULT 'pending',
+                retry_count INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error_message TEXT,
+                conflict_details JSONB,
+                result JSONB,
+                available_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                lease_owner VARCHAR(200),
+                lease_expires_at TIMESTAMP,
+                commit_message TEXT,
+                resolution_strategy VARCHAR(20),
+                coalesced_into VARCHAR(32),
+                folded_operation_ids JSONB,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                completed_at TIMESTAMP
+            )
+        """)
+
+        # 同步表的updated_at由触发器维护（队列更新状态时不写updated_at）
+        db_manager.execute_query("""
+            CREATE OR REPLACE FUNCTION update_gitlab_sync_history_updated_at()
+            RETURNS TRIGGER AS $$
+            BEGIN
+                NEW.updated_at = CURRENT_TIMESTAMP;
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql;
+        """)
+        for table in ('gitlab_sync_history', 'gitlab_sync_operations'):
+            db_manager.execute_query(f"""
+                DROP TRIGGER IF EXISTS trigger_update_{table}_updated_at ON {table}
+            """)
+            db_manager.execute_query(f"""
+                CREATE TRIGGER trigger_update_{table}_updated_at
+                    BEFORE UPDATE ON {table}
+                    FOR EACH ROW
+                    EXECUTE FUNCTION update_gitlab_sync_history_updated_at()
+            """)
+
         print("基础表结构创建完成！")
     
     def create_indexes(self):
@@ -127,6 +201,7 @@ class CompleteDatabaseSetup:
             "CREATE INDEX IF NOT EXISTS idx_pipelines_project_id ON pipelines(project_id)",
             "CREATE INDEX IF NOT EXISTS idx_pipelines_branch ON pipelines(branch)",
             "CREATE INDEX IF NOT EXISTS idx_pipelines_project_branch ON pipelines(project_id, branch)",
+            "CREATE INDEX IF NOT EXISTS idx_pipelines_updated_at_id ON pipelines(updated_at DESC, id DESC)",
             
             # pipeline_tasks表索引
             "CREATE INDEX IF NOT EXISTS idx_pipeline_tasks_pipeline_id ON pipeline_tasks(pipeline_id)",
@@ -144,16 +219,31 @@ class CompleteDatabaseSetup:
             "CREATE INDEX IF NOT EXISTS idx_stage_config_templates_template_type ON stage_config_templates(template_type)",
             "CREATE INDEX IF NOT EXISTS idx_stage_config_templates_is_active ON stage_config_templates(is_active)",
             "CREATE INDEX IF NOT EXISTS idx_stage_config_templates_is_system ON stage_config_templates(is_system)",
+            "CREATE INDEX IF NOT EXISTS idx_stage_config_templates_created_at_id ON stage_config_templates(created_at DESC, id DESC)",
             
             # stage_config_history表索引
             "CREATE INDEX IF NOT EXISTS idx_stage_config_history_stage_id ON stage_config_history(stage_id)",
             "CREATE INDEX IF NOT EXISTS idx_stage_config_history_changed_at ON stage_config_history(changed_at)",
+
+            # gitlab_sync_history表索引
+            "CREATE INDEX IF NOT EXISTS idx_gitlab_sync_history_operation_id ON gitlab_sync_history(operation_id)",
+            "CREATE INDEX IF NOT EXISTS idx_gitlab_sync_history_project_task ON gitlab_sync_history(project_id, task_name)",
+            "CREATE INDEX IF NOT EXISTS idx_gitlab_sync_history_status ON gitlab_sync_history(sync_status)",
+            "CREATE INDEX IF NOT EXISTS idx_gitlab_sync_history_timestamp_id ON gitlab_sync_history(sync_timestamp DESC, id DESC)",
+
+            # gitlab_sync_operations表索引（部分索引，只覆盖各查询涉及的状态）
+            "CREATE INDEX IF NOT EXISTS idx_gitlab_sync_operations_claimable ON gitlab_sync_operations(available_at, id) WHERE status IN ('pending', 'retry')",
+            "CREATE INDEX IF NOT EXISTS idx_gitlab_sync_operations_lease ON gitlab_sync_operations(lease_expires_at) WHERE status = 'in_progress'",
+            "CREATE INDEX IF NOT EXISTS idx_gitlab_sync_operations_completed_at ON gitlab_sync_operations(completed_at) WHERE completed_at IS NOT NULL",
+            "CREATE INDEX IF NOT EXISTS idx_gitlab_sync_operations_active_file ON gitlab_sync_operations(project_id, branch, file_path) WHERE status IN ('pending', 'retry', 'in_progress')",
+            "CREATE INDEX IF NOT EXISTS idx_gitlab_sync_operations_coalesced_into ON gitlab_sync_operations(coalesced_into) WHERE coalesced_into IS NOT NULL",
+            "CREATE INDEX IF NOT EXISTS idx_gitlab_sync_operations_last_success ON gitlab_sync_operations(project_id, branch, file_path, completed_at DESC) WHERE status = 'success'",
         ]
         
         for sql in indexes:
             try:
                 db_manager.execute_query(sql)
-                print(f"创建索引成功: {sql.split()[-1]}")
+                print(f"创建索引成功: {sql.split()[5]}")
             except Exception as e:
                 print(f"创建索引失败: {e}")
         
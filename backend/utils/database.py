@@ -1,163 +1,761 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import re
+import time
+import uuid
+import threading
+from collections import deque
+from contextlib import contextmanager
+
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2 import extensions, errors
+from psycopg2.extras import RealDictCursor, execute_values
 from backend.config.settings import DB_CONFIG
+from backend.utils.query_metrics import QueryMetrics
+
+# DB_CONFIG中不属于psycopg2连接参数的配置项
+MANAGER_OPTION_KEYS = ('pool', 'stream_itersize', 'instrumentation', 'prepared_statements')
+
+_PREPARED_NAME_RE = re.compile(r'^[a-z_][a-z0-9_]*$')
+_PLACEHOLDER_RE = re.compile(r'%%|%s|%\(')
+
+
+def to_positional_placeholders(query):
+    """
+    将psycopg2的%s占位符转换为PREPARE使用的$1、$2...
+
+    Returns:
+        tuple: (转换后的语句, 参数个数)
+    """
+    count = 0
+
+    def replace(match):
+        nonlocal count
+        token = match.group(0)
+        if token == '%%':
+            return '%'
+        if token == '%(':
+            raise ValueError("预处理语句不支持%(name)s形式的命名参数")
+        count += 1
+        return f'${count}'
+
+    return _PLACEHOLDER_RE.sub(replace, query), count
+
+
+class PreparedStatementConnection(extensions.connection):
+    """记录当前会话中已PREPARE的语句名称的连接，随连接池中的连接一起复用"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+
+
+class PoolTimeoutError(Exception):
+    """在checkout_timeout内未能从连接池获取到连接"""
+
+
+class ConnectionPool:
+    """
+    线程安全的PostgreSQL连接池
+
+    - 连接按需创建，最多max_size个，空闲超过idle_timeout的连接会被回收（保留min_size个）
+    - 取出空闲时间超过health_check_interval的连接时执行SELECT 1探测，失效连接直接丢弃重建
+    - 归还时若连接仍处于事务中则回滚，保证下一个使用者拿到干净的连接
+    """
+
+    def __init__(self, connect_params, min_size=1, max_size=10, idle_timeout=300,
+                 checkout_timeout=30, health_check=True, health_check_interval=30):
+        self.connect_params = connect_params
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check = health_check
+        self.health_check_interval = health_check_interval
+
+        self._idle = deque()  # (conn, last_used)，右端为最近归还的连接
+        self._size = 0        # 已创建且未销毁的连接数（含借出中的）
+        self._waiting = 0
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+
+        # 统计信息
+        self._checkouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._timeouts = 0
+        self._total_checkout_time = 0.0
+        self._max_checkout_time = 0.0
+
+    def _connect(self):
+        return psycopg2.connect(**self.connect_params)
+
+    def _is_healthy(self, conn, last_used):
+        """检查空闲连接是否可用"""
+        if conn.closed:
+            return False
+        if not self.health_check or time.monotonic() - last_used < self.health_check_interval:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _prune_idle(self):
+        """回收超过idle_timeout的空闲连接（需持有锁）"""
+        if not self.idle_timeout:
+            return
+        now = time.monotonic()
+        while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.idle_timeout:
+            conn, _ = self._idle.popleft()
+            self._size -= 1
+            self._discarded += 1
+            self._close_quietly(conn)
+
+    def getconn(self):
+        """从连接池借出一个连接"""
+        start = time.monotonic()
+        deadline = start + self.checkout_timeout
+
+        while True:
+            conn = None
+            last_used = None
+            with self._cond:
+                self._waiting += 1
+                try:
+                    while True:
+                        if self._closed:
+                            raise psycopg2.InterfaceError("连接池已关闭")
+                        self._prune_idle()
+                        if self._idle:
+                            conn, last_used = self._idle.pop()
+                            break
+                        if self._size < self.max_size:
+                            # 先占位，在锁外建立连接
+                            self._size += 1
+                            break
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._timeouts += 1
+                            raise PoolTimeoutError(
+                                f"获取数据库连接超时（{self.checkout_timeout}秒），连接池已满: {self.max_size}"
+                            )
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._created += 1
+            elif not self._is_healthy(conn, last_used):
+                print("连接池检测到失效连接，已丢弃并重新获取")
+                self._discard(conn)
+                continue
+
+            elapsed = time.monotonic() - start
+            with self._cond:
+                self._checkouts += 1
+                self._total_checkout_time += elapsed
+                self._max_checkout_time = max(self._max_checkout_time, elapsed)
+            return conn
+
+    def _discard(self, conn):
+        self._close_quietly(conn)
+        with self._cond:
+            self._size -= 1
+            self._discarded += 1
+            self._cond.notify()
+
+    def putconn(self, conn, discard=False):
+        """归还连接，discard为True时直接关闭该连接"""
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                discard = True
+
+        if discard or conn.closed or self._closed:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        """关闭连接池中的所有空闲连接，借出中的连接在归还时关闭"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                self._size -= 1
+                self._close_quietly(conn)
+            self._cond.notify_all()
+
+    def get_stats(self):
+        """获取连接池统计信息"""
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                'enabled': True,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': idle,
+                'in_use': self._size - idle,
+                'waiting': self._waiting,
+                'checkouts': self._checkouts,
+                'created': self._created,
+                'discarded': self._discarded,
+                'timeouts': self._timeouts,
+                'avg_checkout_ms': round(self._total_checkout_time / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                'max_checkout_ms': round(self._max_checkout_time * 1000, 3)
+            }
+
 
 class DatabaseManager:
     """数据库管理类"""
-    
+
     def __init__(self):
         self.db_config = DB_CONFIG
-    
+        self.connect_params = {k: v for k, v in DB_CONFIG.items() if k not in MANAGER_OPTION_KEYS}
+        self.pool_config = DB_CONFIG.get('pool') or {}
+        self.stream_itersize = DB_CONFIG.get('stream_itersize') or 1000
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        # SQL执行统计（耗时、行数、获取连接耗时、慢查询日志）
+        self.metrics = QueryMetrics(DB_CONFIG.get('instrumentation'))
+        # 命名预处理语句注册表 {名称: {'query', 'prepare', 'execute'}}
+        self.prepared_enabled = (DB_CONFIG.get('prepared_statements') or {}).get('enabled', True)
+        self._prepared = {}
+        # 当前线程正在进行的事务 {'conn': 连接, 'depth': 嵌套层数}
+        self._local = threading.local()
+
     def get_connection(self):
         """创建数据库连接"""
-        return psycopg2.connect(**self.db_config)
-    
+        return psycopg2.connect(**self.connect_params)
+
+    def _get_pool(self):
+        """按需创建连接池，未启用连接池时返回None"""
+        if not self.pool_config.get('enabled', False):
+            return None
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    # 池中的连接会被反复使用，记录各连接上已PREPARE的语句
+                    pool_params = dict(self.connect_params)
+                    pool_params.setdefault('connection_factory', PreparedStatementConnection)
+                    self._pool = ConnectionPool(
+                        pool_params,
+                        min_size=self.pool_config.get('min_size', 1),
+                        max_size=self.pool_config.get('max_size', 10),
+                        idle_timeout=self.pool_config.get('idle_timeout', 300),
+                        checkout_timeout=self.pool_config.get('checkout_timeout', 30),
+                        health_check=self.pool_config.get('health_check', True),
+                        health_check_interval=self.pool_config.get('health_check_interval', 30)
+                    )
+        return self._pool
+
+    @contextmanager
+    def connection(self):
+        """
+        获取数据库连接
+
+        启用连接池时从池中借出，使用完毕后归还；否则创建新连接并在使用后关闭。
+        当前线程处于transaction()中时，直接返回事务所用的连接
+        """
+        tx = self._current_transaction()
+        if tx is not None:
+            yield tx['conn']
+            return
+
+        pool = self._get_pool()
+        if pool is None:
+            conn = self.get_connection()
+            try:
+                yield conn
+            finally:
+                conn.close()
+            return
+
+        conn = pool.getconn()
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            pool.putconn(conn, discard=broken)
+
+    def _current_transaction(self):
+        return getattr(self._local, 'transaction', None)
+
+    def in_transaction(self):
+        """当前线程是否处于transaction()中"""
+        return self._current_transaction() is not None
+
+    @contextmanager
+    def transaction(self):
+        """
+        事务上下文管理器（Unit of Work）
+
+        块内同一线程的所有execute_*调用共用一个连接，退出时只提交一次，出现异常则整体回滚。
+        嵌套使用时内层以SAVEPOINT实现，内层异常只回滚到对应的保存点。
+
+        用法:
+            with db_manager.transaction():
+                db_manager.execute_update(...)
+                db_manager.execute_insert(...)
+        """
+        tx = self._current_transaction()
+        if tx is not None:
+            tx['depth'] += 1
+            savepoint = f"sp_{tx['depth']}"
+            cur = tx['conn'].cursor()
+            try:
+                cur.execute(f"SAVEPOINT {savepoint}")
+                yield tx['conn']
+                cur.execute(f"RELEASE SAVEPOINT {savepoint}")
+            except Exception:
+                try:
+                    cur.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
+                except Exception as rollback_error:
+                    print(f"回滚到保存点 {savepoint} 失败: {rollback_error}")
+                raise
+            finally:
+                cur.close()
+                tx['depth'] -= 1
+            return
+
+        with self.connection() as conn:
+            self._local.transaction = {'conn': conn, 'depth': 0}
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                if not conn.closed:
+                    conn.rollback()
+                raise
+            finally:
+                self._local.transaction = None
+
+    def get_pool_stats(self):
+        """获取连接池统计信息"""
+        pool = self._get_pool()
+        if pool is None:
+            return {'enabled': False}
+        return pool.get_stats()
+
+    def close_pool(self):
+        """关闭连接池"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+
+    def _execute(self, query, params, fetch):
+        """
+        执行SQL并提交（处于transaction()中时由事务统一提交）
+
+        Args:
+            fetch: 'one'返回单条记录，'all'返回所有记录，'rowcount'返回影响行数，None不返回
+        """
+        in_transaction = self.in_transaction()
+        start = time.perf_counter()
+        with self.connection() as conn:
+            acquired = time.perf_counter()
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            error = None
+            try:
+                cur.execute(query, params)
+
+                if fetch == 'one':
+                    result = cur.fetchone()
+                elif fetch == 'all':
+                    result = cur.fetchall()
+                elif fetch == 'rowcount':
+                    result = cur.rowcount
+                else:
+                    result = None
+
+                if not in_transaction:
+                    conn.commit()
+                return result
+            except Exception as e:
+                error = e
+                if not in_transaction and not conn.closed:
+                    conn.rollback()
+                raise
+            finally:
+                rows = cur.rowcount
+                cur.close()
+                self.metrics.record(query, (time.perf_counter() - acquired) * 1000,
+                                    (acquired - start) * 1000, rows, error, params)
+
     def execute_query(self, query, params=None, fetch_one=False, fetch_all=False):
         """
         执行查询
-        
+
         Args:
             query: SQL查询语句
             params: 查询参数
             fetch_one: 是否返回单条记录
             fetch_all: 是否返回所有记录
-            
+
         Returns:
             查询结果
         """
         try:
-            conn = self.get_connection()
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-            
-            cur.execute(query, params)
-            
             if fetch_one:
-                result = cur.fetchone()
+                fetch = 'one'
             elif fetch_all:
-                result = cur.fetchall()
+                fetch = 'all'
             else:
-                result = None
-            
-            conn.commit()
-            cur.close()
-            conn.close()
-            
-            return result
-            
+                fetch = None
+
+            return self._execute(query, params, fetch)
+
+        except Exception as e:
+            print(f"数据库操作失败: {e}")
+            raise e
+
+    def stream_query(self, query, params=None, itersize=None):
+        """
+        使用服务端命名游标流式读取查询结果
+
+        结果按itersize分批从数据库取回并逐行产出，内存占用与结果集大小无关。
+        生成器迭代期间会一直占用一个连接，迭代结束或生成器被关闭时释放。
+
+        Args:
+            query: SQL查询语句
+            params: 查询参数
+            itersize: 每批取回的行数，默认使用DB_CONFIG['stream_itersize']
+
+        Yields:
+            RealDictRow: 查询结果的每一行
+        """
+        in_transaction = self.in_transaction()
+        start = time.perf_counter()
+        with self.connection() as conn:
+            acquired = time.perf_counter()
+            cur = conn.cursor(name=f"stream_{uuid.uuid4().hex}", cursor_factory=RealDictCursor)
+            cur.itersize = itersize or self.stream_itersize
+            # 只统计花在数据库上的时间，不含调用方处理每一行的时间
+            db_time = 0.0
+            rows = 0
+            error = None
+            try:
+                step = time.perf_counter()
+                cur.execute(query, params)
+                iterator = iter(cur)
+                while True:
+                    try:
+                        row = next(iterator)
+                    except StopIteration:
+                        break
+                    finally:
+                        db_time += time.perf_counter() - step
+                    rows += 1
+                    yield row
+                    step = time.perf_counter()
+                step = time.perf_counter()
+                cur.close()
+                if not in_transaction:
+                    conn.commit()
+                db_time += time.perf_counter() - step
+            except GeneratorExit:
+                # 调用方提前结束迭代，连接归还时会回滚未结束的事务
+                raise
+            except Exception as e:
+                error = e
+                print(f"数据库流式查询失败: {e}")
+                if not in_transaction and not conn.closed:
+                    conn.rollback()
+                raise
+            finally:
+                if not cur.closed:
+                    try:
+                        cur.close()
+                    except Exception:
+                        pass
+                self.metrics.record(query, db_time * 1000, (acquired - start) * 1000,
+                                    rows, error, params)
+
+    def register_prepared(self, name, query):
+        """
+        注册命名预处理语句
+
+        语句在连接池的每个连接上第一次执行时PREPARE，之后同一连接上的执行只需EXECUTE，
+        省去每次的解析和规划；未启用连接池时按普通语句执行。重复注册同名同语句时直接返回。
+
+        Args:
+            name: 语句名称（小写字母、数字、下划线）
+            query: 使用%s占位符的SQL语句
+        """
+        if not _PREPARED_NAME_RE.match(name):
+            raise ValueError(f"无效的预处理语句名称: {name}")
+        existing = self._prepared.get(name)
+        if existing is not None:
+            if existing['query'] != query:
+                raise ValueError(f"预处理语句名称已被其他语句使用: {name}")
+            return
+
+        statement, param_count = to_positional_placeholders(query)
+        placeholders = ', '.join(['%s'] * param_count)
+        self._prepared[name] = {
+            'query': query,
+            'prepare': f"PREPARE {name} AS {statement}",
+            'execute': f"EXECUTE {name} ({placeholders})" if param_count else f"EXECUTE {name}"
+        }
+
+    def execute_prepared(self, name, params=None, fetch_one=False, fetch_all=False):
+        """
+        执行已注册的命名预处理语句
+
+        Args:
+            name: register_prepared注册的语句名称
+            params: 查询参数
+            fetch_one: 是否返回单条记录
+            fetch_all: 是否返回所有记录
+
+        Returns:
+            查询结果
+        """
+        statement = self._prepared.get(name)
+        if statement is None:
+            raise ValueError(f"未注册的预处理语句: {name}")
+
+        if fetch_one:
+            fetch = 'one'
+        elif fetch_all:
+            fetch = 'all'
+        else:
+            fetch = 'rowcount'
+
+        if not self.prepared_enabled or self._get_pool() is None:
+            # 未启用连接池时每次都是新连接，PREPARE后只执行一次反而多一次往返
+            return self.execute_query(statement['query'], params=params,
+                                      fetch_one=fetch_one, fetch_all=fetch_all)
+
+        try:
+            return self._execute_prepared(name, statement, params, fetch)
         except Exception as e:
             print(f"数据库操作失败: {e}")
             raise e
-    
+
+    def _execute_prepared(self, name, statement, params, fetch):
+        in_transaction = self.in_transaction()
+        start = time.perf_counter()
+        with self.connection() as conn:
+            acquired = time.perf_counter()
+            prepared = getattr(conn, 'prepared_statements', None)
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            error = None
+            try:
+                if prepared is None:
+                    # 非PreparedStatementConnection创建的连接，退化为普通执行
+                    cur.execute(statement['query'], params)
+                else:
+                    if name not in prepared:
+                        cur.execute(statement['prepare'])
+                        prepared.add(name)
+                    try:
+                        cur.execute(statement['execute'], params)
+                    except errors.InvalidSqlStatementName:
+                        # 会话中的预处理语句已失效（如执行过DISCARD ALL）
+                        prepared.discard(name)
+                        raise
+
+                if fetch == 'one':
+                    result = cur.fetchone()
+                elif fetch == 'all':
+                    result = cur.fetchall()
+                else:
+                    result = cur.rowcount
+
+                if not in_transaction:
+                    conn.commit()
+                return result
+            except Exception as e:
+                error = e
+                if not in_transaction and not conn.closed:
+                    conn.rollback()
+                raise
+            finally:
+                rows = cur.rowcount
+                cur.close()
+                self.metrics.record(statement['query'], (time.perf_counter() - acquired) * 1000,
+                                    (acquired - start) * 1000, rows, error, params)
+
     def execute_insert(self, query, params=None, return_id=False):
         """
         执行插入操作
-        
+
         Args:
             query: INSERT SQL语句
             params: 插入参数
             return_id: 是否返回插入的ID
-            
+
         Returns:
             插入结果
         """
         try:
-            conn = self.get_connection()
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-            
             if return_id and "RETURNING" not in query.upper():
                 query += " RETURNING *"
-            
-            cur.execute(query, params)
-            
-            if return_id or "RETURNING" in query.upper():
-                result = cur.fetchone()
-            else:
-                result = None
-            
-            conn.commit()
-            cur.close()
-            conn.close()
-            
-            return result
-            
+
+            fetch = 'one' if return_id or "RETURNING" in query.upper() else None
+            return self._execute(query, params, fetch)
+
         except Exception as e:
             print(f"数据库插入失败: {e}")
             raise e
-    
+
     def execute_update(self, query, params=None, return_updated=False):
         """
         执行更新操作
-        
+
         Args:
             query: UPDATE SQL语句
             params: 更新参数
             return_updated: 是否返回更新后的记录
-            
+
         Returns:
             更新结果
         """
         try:
-            conn = self.get_connection()
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-            
             if return_updated and "RETURNING" not in query.upper():
                 query += " RETURNING *"
-            
-            cur.execute(query, params)
-            
-            if return_updated or "RETURNING" in query.upper():
-                result = cur.fetchone()
-            else:
-                result = cur.rowcount
-            
-            conn.commit()
-            cur.close()
-            conn.close()
-            
-            return result
-            
+
+            fetch = 'one' if return_updated or "RETURNING" in query.upper() else 'rowcount'
+            return self._execute(query, params, fetch)
+
         except Exception as e:
             print(f"数据库更新失败: {e}")
             raise e
-    
+
     def execute_delete(self, query, params=None, return_deleted=False):
         """
         执行删除操作
-        
+
         Args:
             query: DELETE SQL语句
             params: 删除参数
             return_deleted: 是否返回删除的记录
-            
+
         Returns:
             删除结果
         """
         try:
-            conn = self.get_connection()
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-            
             if return_deleted and "RETURNING" not in query.upper():
                 query += " RETURNING *"
-            
-            cur.execute(query, params)
-            
-            if return_deleted or "RETURNING" in query.upper():
-                result = cur.fetchone()
-            else:
-                result = cur.rowcount
-            
-            conn.commit()
-            cur.close()
-            conn.close()
-            
-            return result
-            
+
+            fetch = 'one' if return_deleted or "RETURNING" in query.upper() else 'rowcount'
+            return self._execute(query, params, fetch)
+
         except Exception as e:
             print(f"数据库删除失败: {e}")
             raise e
 
+    def _execute_values(self, query, rows, template, page_size, returning):
+        """通过execute_values执行多行VALUES语句并提交（处于transaction()中时由事务统一提交）"""
+        in_transaction = self.in_transaction()
+        start = time.perf_counter()
+        with self.connection() as conn:
+            acquired = time.perf_counter()
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            error = None
+            try:
+                result = execute_values(
+                    cur, query, rows,
+                    template=template,
+                    page_size=page_size or len(rows),
+                    fetch=returning
+                )
+                if not returning:
+                    result = len(rows)
+                if not in_transaction:
+                    conn.commit()
+                return result
+            except Exception as e:
+                error = e
+                if not in_transaction and not conn.closed:
+                    conn.rollback()
+                raise
+            finally:
+                cur.close()
+                # 多行VALUES语句按模板语句统计，行数为提交的行数
+                self.metrics.record(query, (time.perf_counter() - acquired) * 1000,
+                                    (acquired - start) * 1000, len(rows), error)
+
+    def execute_bulk_insert(self, query, rows, template=None, page_size=None, returning=False):
+        """
+        批量插入（多行VALUES）
+
+        Args:
+            query: 包含单个VALUES %s占位符的INSERT语句，如
+                   "INSERT INTO t (a, b) VALUES %s RETURNING id"
+            rows: 参数元组列表，每个元组对应一行
+            template: 单行模板，默认为(%s, %s, ...)
+            page_size: 每条语句包含的最大行数，默认所有行合并为一条语句
+            returning: 是否返回RETURNING的记录
+
+        Returns:
+            returning为True时返回记录列表，否则返回处理的行数
+        """
+        rows = list(rows)
+        if not rows:
+            return [] if returning else 0
+
+        try:
+            return self._execute_values(query, rows, template, page_size, returning)
+        except Exception as e:
+            print(f"数据库批量插入失败: {e}")
+            raise e
+
+    def execute_bulk_update(self, query, rows, template=None, page_size=None, returning=False):
+        """
+        批量更新（UPDATE ... FROM (VALUES %s)）
+
+        Args:
+            query: 包含单个VALUES %s占位符的UPDATE语句，如
+                   "UPDATE t SET a = v.a FROM (VALUES %s) AS v(id, a) WHERE t.id = v.id"
+            rows: 参数元组列表，每个元组对应一行
+            template: 单行模板，默认为(%s, %s, ...)
+            page_size: 每条语句包含的最大行数，默认所有行合并为一条语句
+            returning: 是否返回RETURNING的记录
+
+        Returns:
+            returning为True时返回记录列表，否则返回处理的行数
+        """
+        rows = list(rows)
+        if not rows:
+            return [] if returning else 0
+
+        try:
+            return self._execute_values(query, rows, template, page_size, returning)
+        except Exception as e:
+            print(f"数据库批量更新失败: {e}")
+            raise e
+
 # 全局数据库管理器实例
-db_manager = DatabaseManager() 
\ No newline at end of file
+db_manager = DatabaseManager()
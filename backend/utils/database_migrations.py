@@ -496,6 +496,217 @@ class TaskConfigMigrations:
             "添加GitLab同步历史表，用于记录GitLab文件同步的历史和状态"
         )
     
+    def migrate_007_add_pipelines_keyset_index(self):
+        """迁移007: 为流水线列表的键集分页添加(updated_at, id)复合索引"""
+        def migration():
+            # 键集分页按(updated_at, id)比较，updated_at不能为空
+            db_manager.execute_query("""
+                UPDATE pipelines
+                SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)
+                WHERE updated_at IS NULL
+            """)
+            db_manager.execute_query(
+                "ALTER TABLE pipelines ALTER COLUMN updated_at SET NOT NULL"
+            )
+            db_manager.execute_query("""
+                CREATE INDEX IF NOT EXISTS idx_pipelines_updated_at_id
+                ON pipelines(updated_at DESC, id DESC)
+            """)
+        
+        return self.migration_manager.run_migration(
+            "007_add_pipelines_keyset_index",
+            migration,
+            "为流水线列表键集分页添加(updated_at, id)复合索引"
+        )
+    
+    def migrate_008_add_listing_keyset_indexes(self):
+        """迁移008: 为模板列表和同步历史的键集分页添加复合索引"""
+        def migration():
+            # 模板列表按(created_at, id)分页，created_at不能为空
+            db_manager.execute_query("""
+                UPDATE stage_config_templates
+                SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP)
+                WHERE created_at IS NULL
+            """)
+            db_manager.execute_query(
+                "ALTER TABLE stage_config_templates ALTER COLUMN created_at SET NOT NULL"
+            )
+            db_manager.execute_query("""
+                CREATE INDEX IF NOT EXISTS idx_stage_config_templates_created_at_id
+                ON stage_config_templates(created_at DESC, id DESC)
+            """)
+            
+            # 同步历史按(sync_timestamp, id)分页，复合索引覆盖原有的单列时间索引
+            db_manager.execute_query("""
+                CREATE INDEX IF NOT EXISTS idx_gitlab_sync_history_timestamp_id
+                ON gitlab_sync_history(sync_timestamp DESC, id DESC)
+            """)
+            db_manager.execute_query(
+                "DROP INDEX IF EXISTS idx_gitlab_sync_history_timestamp"
+            )
+        
+        return self.migration_manager.run_migration(
+            "008_add_listing_keyset_indexes",
+            migration,
+            "为模板列表(created_at, id)和同步历史(sync_timestamp, id)键集分页添加复合索引"
+        )
+    
+    def migrate_009_add_stage_task_type_unique_key(self):
+        """迁移009: 为pipeline_task_stages添加(task_id, type)唯一约束，支持ON CONFLICT写入阶段配置"""
+        def migration():
+            # 同一任务下重复的阶段类型只保留最早的一条（与流水线保存时的处理一致）
+            db_manager.execute_query("""
+                DELETE FROM pipeline_task_stages s
+                USING pipeline_task_stages keep
+                WHERE s.task_id = keep.task_id
+                  AND s.type = keep.type
+                  AND s.id > keep.id
+            """)
+            db_manager.execute_query("""
+                DO $$
+                BEGIN
+                    IF NOT EXISTS (
+                        SELECT 1 FROM pg_constraint
+                        WHERE conname = 'uq_pipeline_task_stages_task_type'
+                    ) THEN
+                        ALTER TABLE pipeline_task_stages
+                        ADD CONSTRAINT uq_pipeline_task_stages_task_type UNIQUE (task_id, type);
+                    END IF;
+                END $$;
+            """)
+        
+        return self.migration_manager.run_migration(
+            "009_add_stage_task_type_unique_key",
+            migration,
+            "为pipeline_task_stages添加(task_id, type)唯一约束，阶段配置改为INSERT ... ON CONFLICT写入"
+        )
+    
+    def migrate_010_create_gitlab_sync_operations(self):
+        """迁移010: 创建GitLab同步操作队列表，同步操作状态持久化并支持多进程领取"""
+        def migration():
+            db_manager.execute_query("""
+                CREATE TABLE IF NOT EXISTS gitlab_sync_operations (
+                    id BIGSERIAL PRIMARY KEY,
+                    operation_id VARCHAR(32) UNIQUE NOT NULL,
+                    project_id VARCHAR(100) NOT NULL,
+                    branch VARCHAR(100) NOT NULL DEFAULT 'main',
+                    task_name VARCHAR(100) NOT NULL,
+                    file_path VARCHAR(500) NOT NULL,
+                    content TEXT,
+                    content_hash VARCHAR(64) NOT NULL,
+                    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+                    retry_count INTEGER NOT NULL DEFAULT 0,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error_message TEXT,
+                    conflict_details JSONB,
+                    result JSONB,
+                    available_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    lease_owner VARCHAR(200),
+                    lease_expires_at TIMESTAMP,
+                    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    completed_at TIMESTAMP
+                )
+            """)
+            
+            # 领取待处理操作：只索引可领取的行
+            db_manager.execute_query("""
+                CREATE INDEX IF NOT EXISTS idx_gitlab_sync_operations_claimable
+                ON gitlab_sync_operations(available_at, id)
+                WHERE status IN ('pending', 'retry')
+            """)
+            
+            # 回收租约过期的操作
+            db_manager.execute_query("""
+                CREATE INDEX IF NOT EXISTS idx_gitlab_sync_operations_lease
+                ON gitlab_sync_operations(lease_expires_at)
+                WHERE status = 'in_progress'
+            """)
+            
+            # 清理已完成的操作
+            db_manager.execute_query("""
+                CREATE INDEX IF NOT EXISTS idx_gitlab_sync_operations_completed_at
+                ON gitlab_sync_operations(completed_at)
+                WHERE completed_at IS NOT NULL
+            """)
+            
+            db_manager.execute_query("""
+                DROP TRIGGER IF EXISTS trigger_update_gitlab_sync_operations_updated_at
+                ON gitlab_sync_operations
+            """)
+            
+            # 复用006中创建的更新时间戳函数
+            db_manager.execute_query("""
+                CREATE TRIGGER trigger_update_gitlab_sync_operations_updated_at
+                    BEFORE UPDATE ON gitlab_sync_operations
+                    FOR EACH ROW
+                    EXECUTE FUNCTION update_gitlab_sync_history_updated_at()
+            """)
+        
+        return self.migration_manager.run_migration(
+            "010_create_gitlab_sync_operations",
+            migration,
+            "创建GitLab同步操作队列表gitlab_sync_operations，通过FOR UPDATE SKIP LOCKED领取并持有租约"
+        )
+    
+    def migrate_011_add_sync_operation_commit_options(self):
+        """迁移011: 为gitlab_sync_operations添加提交信息和冲突解决策略，供后台工作线程执行时使用"""
+        def migration():
+            db_manager.execute_query("""
+                ALTER TABLE gitlab_sync_operations
+                ADD COLUMN IF NOT EXISTS commit_message TEXT,
+                ADD COLUMN IF NOT EXISTS resolution_strategy VARCHAR(20)
+            """)
+        
+        return self.migration_manager.run_migration(
+            "011_add_sync_operation_commit_options",
+            migration,
+            "gitlab_sync_operations添加commit_message和resolution_strategy字段"
+        )
+    
+    def migrate_012_add_sync_operation_coalescing(self):
+        """迁移012: 支持合并同一文件的待处理同步操作"""
+        def migration():
+            db_manager.execute_query("""
+                ALTER TABLE gitlab_sync_operations
+                ADD COLUMN IF NOT EXISTS coalesced_into VARCHAR(32),
+                ADD COLUMN IF NOT EXISTS folded_operation_ids JSONB
+            """)
+            
+            # 按文件查找未完成的操作（入队合并、领取时跳过正在同步的文件）
+            db_manager.execute_query("""
+                CREATE INDEX IF NOT EXISTS idx_gitlab_sync_operations_active_file
+                ON gitlab_sync_operations(project_id, branch, file_path)
+                WHERE status IN ('pending', 'retry', 'in_progress')
+            """)
+            
+            db_manager.execute_query("""
+                CREATE INDEX IF NOT EXISTS idx_gitlab_sync_operations_coalesced_into
+                ON gitlab_sync_operations(coalesced_into)
+                WHERE coalesced_into IS NOT NULL
+            """)
+        
+        return self.migration_manager.run_migration(
+            "012_add_sync_operation_coalescing",
+            migration,
+            "gitlab_sync_operations添加coalesced_into和folded_operation_ids字段，同一文件的待处理操作合并为一次上传"
+        )
+    
+    def migrate_013_add_sync_operation_version_index(self):
+        """迁移013: 按文件查询最近一次同步成功的版本（提交ID和blob SHA），用于条件写入"""
+        def migration():
+            db_manager.execute_query("""
+                CREATE INDEX IF NOT EXISTS idx_gitlab_sync_operations_last_success
+                ON gitlab_sync_operations(project_id, branch, file_path, completed_at DESC)
+                WHERE status = 'success'
+            """)
+        
+        return self.migration_manager.run_migration(
+            "013_add_sync_operation_version_index",
+            migration,
+            "为gitlab_sync_operations添加按文件查询最近一次同步成功记录的部分索引"
+        )
+    
     def run_all_migrations(self):
         """运行所有迁移"""
         print("开始执行TASK006数据模型优化迁移...")
@@ -506,7 +717,14 @@ class TaskConfigMigrations:
             self.migrate_003_create_stage_config_history,
             self.migrate_004_insert_default_templates,
             self.migrate_005_add_updated_at_triggers,
-            self.migrate_006_add_gitlab_sync_history_table
+            self.migrate_006_add_gitlab_sync_history_table,
+            self.migrate_007_add_pipelines_keyset_index,
+            self.migrate_008_add_listing_keyset_indexes,
+            self.migrate_009_add_stage_task_type_unique_key,
+            self.migrate_010_create_gitlab_sync_operations,
+            self.migrate_011_add_sync_operation_commit_options,
+            self.migrate_012_add_sync_operation_coalescing,
+            self.migrate_013_add_sync_operation_version_index
         ]
         
         success_count = 0
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from backend.config.settings import GITLAB_CIRCUIT_BREAKER_CONFIG
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，请求未发送直接失败"""
+
+    def __init__(self, name, retry_in):
+        self.name = name
+        self.retry_in = retry_in
+        super().__init__(f"GitLab {name} 暂时不可用（熔断中），{retry_in:.1f}秒后重试")
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    - closed: 正常放行，连续失败failure_threshold次后转为open
+    - open: 直接抛出CircuitOpenError，经过recovery_timeout秒后转为half_open
+    - half_open: 最多放行half_open_max_calls个探测请求，成功则恢复closed，失败则重新open
+    """
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=30, half_open_max_calls=1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._lock = threading.Lock()
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._rejected = 0
+        self._last_error = None
+
+    def _current_state(self, now):
+        if self._state == STATE_OPEN and now - self._opened_at >= self.recovery_timeout:
+            self._state = STATE_HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def before_call(self):
+        """
+        请求发送前调用，不允许发送时抛出CircuitOpenError
+
+        Raises:
+            CircuitOpenError: 熔断器打开，或半开状态下探测请求已达上限
+        """
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == STATE_CLOSED:
+                return
+            if state == STATE_HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return
+            self._rejected += 1
+            retry_in = max(0.0, self.recovery_timeout - (now - self._opened_at))
+        raise CircuitOpenError(self.name, retry_in)
+
+    def release_call(self):
+        """
+        before_call()放行后请求未得到结果（未发送或被中断）时调用，
+        归还半开状态下占用的探测名额，不改变熔断器状态
+        """
+        with self._lock:
+            if self._state == STATE_HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def record_success(self):
+        with self._lock:
+            if self._state != STATE_CLOSED:
+                print(f"GitLab {self.name} 已恢复，熔断器关闭")
+            self._state = STATE_CLOSED
+            self._failures = 0
+            self._half_open_calls = 0
+
+    def record_failure(self, error=None):
+        with self._lock:
+            now = time.monotonic()
+            self._failures += 1
+            self._last_error = str(error) if error is not None else None
+            state = self._current_state(now)
+            if state == STATE_HALF_OPEN or (state == STATE_CLOSED and self._failures >= self.failure_threshold):
+                self._state = STATE_OPEN
+                self._opened_at = now
+                self._half_open_calls = 0
+                print(f"GitLab {self.name} 连续失败{self._failures}次，熔断{self.recovery_timeout}秒: {error}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            return {
+                'state': state,
+                'consecutive_failures': self._failures,
+                'retry_in': round(max(0.0, self.recovery_timeout - (now - self._opened_at)), 3)
+                            if state == STATE_OPEN else 0.0,
+                'rejected': self._rejected,
+                'last_error': self._last_error
+            }
+
+
+class CircuitBreakerRegistry:
+    """按名称（GitLab主机）管理熔断器"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.enabled = config.get('enabled', True)
+        self.failure_threshold = config.get('failure_threshold', 5)
+        self.recovery_timeout = config.get('recovery_timeout', 30)
+        self.half_open_max_calls = config.get('half_open_max_calls', 1)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(
+                    name, self.failure_threshold, self.recovery_timeout, self.half_open_max_calls)
+            return breaker
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {
+            'enabled': self.enabled,
+            'failure_threshold': self.failure_threshold,
+            'recovery_timeout': self.recovery_timeout,
+            'hosts': {name: breaker.snapshot() for name, breaker in breakers.items()}
+        }
+
+
+# 全局熔断器，所有GitLabClient实例共享各主机的状态
+gitlab_circuit_breakers = CircuitBreakerRegistry(GITLAB_CIRCUIT_BREAKER_CONFIG)
@@ -3,8 +3,149 @@
 
 import requests
 import base64
+import hashlib
+import json
+import re
+import threading
+import time
 from pathlib import Path
-from backend.config.settings import GITLAB_API_URL, GITLAB_NAMESPACE, GITLAB_TOKEN
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from backend.config.settings import (GITLAB_API_URL, GITLAB_NAMESPACE, GITLAB_TOKEN,
+                                     GITLAB_HTTP_CONFIG, GITLAB_UPLOAD_CONFIG, GITLAB_CACHE_CONFIG,
+                                     GITLAB_RATE_LIMIT_CONFIG)
+from backend.utils.gitlab_rate_limiter import rate_limit_scheduler
+from backend.utils.gitlab_circuit_breaker import CircuitOpenError, gitlab_circuit_breakers
+
+
+def git_blob_sha(content):
+    """计算内容的git blob SHA-1，与GitLab文件列表中的id一致"""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+class RemoteFileChangedError(Exception):
+    """GitLab拒绝条件写入：文件在last_commit_id之后已被修改，或已存在/已被删除"""
+    
+    def __init__(self, file_path, message):
+        self.file_path = file_path
+        super().__init__(f"GitLab拒绝写入 {file_path}: {message}")
+
+
+class RepositoryManifestCache:
+    """
+    仓库文件清单缓存
+    
+    按(项目, 分支)缓存 路径 -> blob SHA，超过ttl后重新获取。
+    本客户端写入成功后直接更新清单中对应的条目，写入因清单过期而失败时使整个清单失效。
+    """
+    
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._entries = {}  # (project_id, branch) -> {'paths': {path: sha}, 'fetched_at': 时间}
+        self._lock = threading.Lock()
+    
+    def get(self, project_id, branch):
+        """获取未过期的清单，没有或已过期时返回None"""
+        with self._lock:
+            entry = self._entries.get((str(project_id), branch))
+            if entry is None or time.monotonic() - entry['fetched_at'] > self.ttl:
+                return None
+            return entry['paths']
+    
+    def put(self, project_id, branch, paths):
+        if not self.ttl:
+            return
+        with self._lock:
+            self._entries[(str(project_id), branch)] = {'paths': dict(paths), 'fetched_at': time.monotonic()}
+    
+    def set_path(self, project_id, branch, path, sha):
+        """写入成功后更新单个文件，sha为None表示文件已删除"""
+        with self._lock:
+            entry = self._entries.get((str(project_id), branch))
+            if entry is None:
+                return
+            if sha is None:
+                entry['paths'].pop(path, None)
+            else:
+                entry['paths'][path] = sha
+    
+    def remove_prefix(self, project_id, branch, directory):
+        """删除目录后移除清单中该目录下的所有文件"""
+        prefix = directory.rstrip('/') + '/'
+        with self._lock:
+            entry = self._entries.get((str(project_id), branch))
+            if entry is None:
+                return
+            for path in [path for path in entry['paths'] if path.startswith(prefix)]:
+                del entry['paths'][path]
+    
+    def invalidate(self, project_id, branch=None):
+        """使清单失效，branch为None时清除项目的所有分支"""
+        with self._lock:
+            if branch is not None:
+                self._entries.pop((str(project_id), branch), None)
+                return
+            for key in [key for key in self._entries if key[0] == str(project_id)]:
+                del self._entries[key]
+
+
+class ProjectCache:
+    """
+    项目信息缓存
+    
+    按project_id缓存GitLab项目的数字ID、默认分支和路径，超过ttl后重新获取。
+    删除项目时使缓存失效；项目在GitLab上被直接删除重建时，最迟ttl秒后恢复。
+    """
+    
+    FIELDS = ('id', 'name', 'path', 'path_with_namespace', 'default_branch', 'web_url')
+    
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._entries = {}  # project_id -> (项目信息, 获取时间)
+        self._lock = threading.Lock()
+    
+    def get(self, project_id):
+        """获取未过期的项目信息，没有或已过期时返回None"""
+        with self._lock:
+            entry = self._entries.get(str(project_id))
+            if entry is None or time.monotonic() - entry[1] > self.ttl:
+                return None
+            return dict(entry[0])
+    
+    def put(self, project_id, project_info):
+        """缓存项目信息，只保留FIELDS中的字段，返回保留后的项目信息"""
+        info = {field: project_info.get(field) for field in self.FIELDS}
+        if self.ttl and info['id'] is not None:
+            with self._lock:
+                self._entries[str(project_id)] = (info, time.monotonic())
+        return dict(info)
+    
+    def invalidate(self, project_id):
+        with self._lock:
+            self._entries.pop(str(project_id), None)
+
+
+# 根据API路径判断接口类型，用于选择超时时间
+_ENDPOINT_PATTERNS = (
+    ('commits', re.compile(r'/repository/commits')),
+    ('tree', re.compile(r'/repository/tree')),
+    ('files', re.compile(r'/repository/files/')),
+    ('groups', re.compile(r'/groups(/|$)')),
+    ('projects', re.compile(r'/projects(/|$)')),
+)
+
+
+def endpoint_type(url):
+    """API地址对应的接口类型（commits/tree/files/groups/projects），无法识别时返回None"""
+    path = urlsplit(url).path
+    for name, pattern in _ENDPOINT_PATTERNS:
+        if pattern.search(path):
+            return name
+    return None
+
 
 class GitLabClient:
     """GitLab API客户端"""
@@ -17,14 +158,157 @@ class GitLabClient:
             "PRIVATE-TOKEN": self.token,
             "Content-Type": "application/json"
         }
-        # 获取cicd组的ID
-        self.namespace_id = self._get_namespace_id()
+        self.http_config = GITLAB_HTTP_CONFIG
+        self.timeout = (self.http_config.get('connect_timeout', 5), self.http_config.get('read_timeout', 30))
+        self.verify = self.http_config.get('verify_ssl', False)
+        self.upload_config = GITLAB_UPLOAD_CONFIG
+        self.manifest_cache = RepositoryManifestCache(ttl=self.upload_config.get('manifest_ttl', 60))
+        # 所有请求共用一个带连接池的会话，保持长连接，避免每次请求重新进行TCP/TLS握手
+        self.session = self._create_session()
+        # 按GitLab主机限速，收到429时按Retry-After等待后重发
+        self.rate_limiter = rate_limit_scheduler
+        self.max_429_retries = GITLAB_RATE_LIMIT_CONFIG.get('max_429_retries', 3)
+        # GitLab不可用时快速失败，不让每个请求都等到超时
+        self.circuit_breakers = gitlab_circuit_breakers
+        self.endpoint_timeouts = {name: tuple(timeout) for name, timeout
+                                  in self.http_config.get('endpoint_timeouts', {}).items()}
+        # cicd组的ID在首次使用时查询并缓存，创建客户端（导入模块）时不访问GitLab
+        self.cache_config = GITLAB_CACHE_CONFIG
+        self.project_cache = ProjectCache(ttl=self.cache_config.get('project_ttl', 300))
+        self._namespace_lock = threading.Lock()
+        self._namespace_entry = None  # (组ID或None, 过期时间)
+    
+    def _create_session(self):
+        """创建带连接池和重试策略的HTTP会话"""
+        session = requests.Session()
+        session.headers.update(self.headers)
+        
+        # 只对连接失败和幂等的GET/HEAD请求重试，写操作由调用方决定是否重试
+        retry = Retry(
+            total=self.http_config.get('max_retries', 2),
+            read=0,
+            backoff_factor=self.http_config.get('backoff_factor', 0.5),
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            raise_on_status=False,
+            # 429及Retry-After由限速调度器统一处理
+            respect_retry_after_header=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.http_config.get('pool_connections', 4),
+            pool_maxsize=self.http_config.get('pool_maxsize', 16),
+            pool_block=self.http_config.get('pool_block', False),
+            max_retries=retry
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+    
+    def request(self, method, url, **kwargs):
+        """
+        通过共享会话发送请求，未指定时使用默认的超时和证书校验配置
+        
+        发送前从限速调度器取得该主机的请求配额；收到429时按Retry-After等待后重发，
+        最多max_429_retries次（429表示请求未被处理，写操作重发也是安全的）。
+        
+        Args:
+            method: HTTP方法
+            url: 请求地址
+            **kwargs: 传给requests的其他参数（params、json、headers等）
+            
+        Returns:
+            requests.Response: 响应
+            
+        Raises:
+            GitLabRateLimitError: 等待配额的时间超过上限
+            CircuitOpenError: 该GitLab主机处于熔断状态，请求未发送
+            requests.RequestException: 连接失败、超时等请求异常
+        """
+        kwargs.setdefault('timeout', self.timeout_for(url))
+        kwargs.setdefault('verify', self.verify)
+        host = urlsplit(url).netloc
+        breaker = self.circuit_breakers.get(host) if self.circuit_breakers.enabled else None
+        attempt = 0
+        while True:
+            # 先取得限速配额再占用熔断器的探测名额，等待配额超时不会占住半开状态的名额
+            self.rate_limiter.acquire(host)
+            if breaker is not None:
+                breaker.before_call()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                if breaker is not None:
+                    breaker.record_failure(e)
+                raise
+            except BaseException:
+                # 其他异常（如线程被中断）无法判断GitLab是否可用，只归还探测名额
+                if breaker is not None:
+                    breaker.release_call()
+                raise
+            if breaker is not None:
+                if response.status_code >= 500:
+                    breaker.record_failure(f"HTTP {response.status_code}")
+                else:
+                    breaker.record_success()
+            retry_after = self.rate_limiter.update(host, response)
+            if retry_after is None or attempt >= self.max_429_retries:
+                return response
+            attempt += 1
+            print(f"GitLab请求被限速(429)，{retry_after:.1f}秒后第{attempt}次重试: {method} {url}")
+    
+    def timeout_for(self, url):
+        """按接口类型返回 (连接超时, 读取超时)"""
+        return self.endpoint_timeouts.get(endpoint_type(url), self.timeout)
+    
+    def close(self):
+        """关闭会话，释放连接池中的连接"""
+        self.session.close()
+    
+    def project_path(self, project_id):
+        """
+        API地址中的项目标识
+        
+        项目信息已缓存时使用数字ID，否则使用URL编码后的项目路径: cicd%2Fproject_id
+        """
+        project_info = self.project_cache.get(project_id)
+        if project_info is not None:
+            return str(project_info['id'])
+        return f"{self.namespace}%2F{project_id}"
+    
+    @property
+    def namespace_id(self):
+        """
+        cicd组的ID（延迟获取）
+        
+        查询成功后缓存namespace_ttl秒；查询失败或组不存在时缓存None negative_ttl秒，
+        避免GitLab不可用时每次调用都等待超时。多个线程同时首次访问时只发送一次请求。
+        """
+        entry = self._namespace_entry
+        if entry is not None and time.monotonic() < entry[1]:
+            return entry[0]
+        
+        with self._namespace_lock:
+            entry = self._namespace_entry
+            if entry is not None and time.monotonic() < entry[1]:
+                return entry[0]
+            namespace_id = self._get_namespace_id()
+            if namespace_id:
+                ttl = self.cache_config.get('namespace_ttl', 3600)
+            else:
+                ttl = self.cache_config.get('negative_ttl', 30)
+            self._namespace_entry = (namespace_id, time.monotonic() + ttl)
+            return namespace_id
+    
+    def invalidate_namespace(self):
+        """清除缓存的组ID，下次使用时重新查询"""
+        with self._namespace_lock:
+            self._namespace_entry = None
     
     def _get_namespace_id(self):
         """获取cicd组的namespace_id"""
         try:
             url = f"{self.api_url}/groups/{self.namespace}"
-            response = requests.get(url, headers=self.headers, verify=False)
+            response = self.request('GET', url)
             if response.status_code == 200:
                 group = response.json()
                 return group.get('id')
@@ -73,10 +357,10 @@ class GitLabClient:
             print(f"创建项目请求数据: {data}")
             
             # 在调用API时忽略SSL验证
-            response = requests.post(url, json=data, headers=self.headers, verify=False)
+            response = self.request('POST', url, json=data)
             
             if response.status_code == 201:
-                project_info = response.json()
+                project_info = self.project_cache.put(project_id, response.json())
                 print(f"成功创建GitLab项目: cicd/{project_id}")
                 return project_info
             else:
@@ -92,24 +376,30 @@ class GitLabClient:
                 
                 raise Exception(error_msg)
     
-    def get_project(self, project_id):
+    def get_project(self, project_id, refresh=False):
         """
         获取GitLab项目信息
         
         Args:
             project_id: 项目ID
+            refresh: 是否忽略缓存重新获取
             
         Returns:
-            dict: 项目信息
+            dict: 项目信息（id、name、path、path_with_namespace、default_branch、web_url）
         """
+        if not refresh:
+            project_info = self.project_cache.get(project_id)
+            if project_info is not None:
+                return project_info
+        
         # 构建项目路径: cicd/project_id
         project_path = f"{self.namespace}%2F{project_id}"
         url = f"{self.api_url}/projects/{project_path}"
         
-        response = requests.get(url, headers=self.headers, verify=False)
+        response = self.request('GET', url)
         
         if response.status_code == 200:
-            return response.json()
+            return self.project_cache.put(project_id, response.json())
         else:
             raise Exception(f"获取GitLab项目失败: {response.text}")
     
@@ -126,10 +416,11 @@ class GitLabClient:
             
         Returns:
             dict: 上传结果
+            
+        Raises:
+            CircuitOpenError: 该GitLab主机处于熔断状态，请求未发送
         """
-        # 构建项目路径: cicd/project_id
-        project_path = f"{self.namespace}%2F{project_id}"
-        url = f"{self.api_url}/projects/{project_path}/repository/files/{requests.utils.quote(file_path, safe='')}"
+        url = f"{self.api_url}/projects/{self.project_path(project_id)}/repository/files/{requests.utils.quote(file_path, safe='')}"
         
         data = {
             "branch": branch,
@@ -138,41 +429,321 @@ class GitLabClient:
         }
         
         try:
-            # 检查文件是否已存在
-            check_response = requests.get(url, headers=self.headers, params={"ref": branch}, verify=False)
-            
-            if check_response.status_code == 200:
-                # 文件已存在，更新文件
-                response = requests.put(url, json=data, headers=self.headers, verify=False)
+            content_sha = git_blob_sha(content)
+            if self.manifest_cache.ttl:
+                # 根据文件清单判断新建、更新或跳过，不再逐个文件发送存在性检查请求
+                manifest, cached = self.get_manifest(project_id, branch)
+                remote_sha = manifest.get(file_path)
             else:
-                # 文件不存在，创建文件
-                response = requests.post(url, json=data, headers=self.headers, verify=False)
+                # 未启用清单缓存时只查询该文件的blob id，避免每次上传都获取完整文件列表
+                cached = False
+                remote_sha = self.get_file_blob_id(project_id, file_path, branch)
+            if remote_sha == content_sha and cached:
+                # 缓存的清单只随本进程的写入更新，可能已被其他进程改变：跳过前确认远程文件当前的blob SHA
+                remote_sha = self.get_file_blob_id(project_id, file_path, branch)
+                self.manifest_cache.set_path(project_id, branch, file_path, remote_sha)
+                cached = False
+            if remote_sha == content_sha:
+                # 远程内容与本地一致，跳过上传，避免产生空提交
+                print(f"文件内容未变化，跳过上传: {file_path}")
+                return {"file_path": file_path, "branch": branch, "skipped": True}
+            
+            method = 'PUT' if remote_sha is not None else 'POST'
+            response = self.request(method, url, json=data)
+            
+            if response.status_code == 400 and cached:
+                # 清单已过期（文件被其他途径新建或删除），刷新后按实际状态重试一次
+                self.manifest_cache.invalidate(project_id, branch)
+                manifest, _ = self.get_manifest(project_id, branch)
+                if (file_path in manifest) != (method == 'PUT'):
+                    if manifest.get(file_path) == content_sha:
+                        return {"file_path": file_path, "branch": branch, "skipped": True}
+                    method = 'PUT' if file_path in manifest else 'POST'
+                    response = self.request(method, url, json=data)
             
             if response.status_code in [200, 201]:
+                self.manifest_cache.set_path(project_id, branch, file_path, content_sha)
                 return response.json()
             else:
                 raise Exception(f"上传文件到GitLab失败: {response.text}")
                 
+        except CircuitOpenError:
+            # 请求未发送，保留异常类型，调用方可改为排队稍后上传
+            raise
         except Exception as e:
             raise Exception(f"上传文件到GitLab项目 cicd/{project_id} 失败: {str(e)}")
     
-    def upload_directory(self, project_id, local_path, gitlab_path, branch="main"):
+    def get_remote_file_info(self, project_id, file_path, branch="main"):
         """
-        上传目录到GitLab项目
+        获取远程文件内容及元数据
         
         Args:
             project_id: 项目ID
-            local_path: 本地路径
-            gitlab_path: GitLab路径
+            file_path: 文件路径
             branch: 分支名
+            
+        Returns:
+            dict: content（UTF-8文本为str，否则为bytes）、blob_id、last_commit_id、file_name、
+                  file_path、size、encoding；文件不存在时返回None
         """
-        local_dir = Path(local_path)
+        url = f"{self.api_url}/projects/{self.project_path(project_id)}/repository/files/{requests.utils.quote(file_path, safe='')}"
+        response = self.request('GET', url, params={"ref": branch})
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise Exception(f"获取远程文件信息失败: {response.text}")
         
-        # 如果本地目录不存在，创建一个空目录
-        if not local_dir.exists():
-            local_dir.mkdir(parents=True, exist_ok=True)
+        file_info = response.json()
+        content = base64.b64decode(file_info.get('content', ''))
+        try:
+            content = content.decode('utf-8')
+        except UnicodeDecodeError:
+            pass
+        return {
+            'content': content,
+            'blob_id': file_info.get('blob_id'),
+            'last_commit_id': file_info.get('last_commit_id'),
+            'file_name': file_info.get('file_name'),
+            'file_path': file_info.get('file_path'),
+            'size': file_info.get('size'),
+            'encoding': file_info.get('encoding')
+        }
+    
+    def get_file_blob_id(self, project_id, file_path, branch="main"):
+        """
+        获取单个文件的blob SHA
         
-        # 首先确保项目存在
+        使用HEAD请求只读取响应头中的X-Gitlab-Blob-Id，不下载文件内容
+        
+        Returns:
+            str: blob SHA，文件不存在时返回None
+        """
+        url = f"{self.api_url}/projects/{self.project_path(project_id)}/repository/files/{requests.utils.quote(file_path, safe='')}"
+        response = self.request('HEAD', url, params={"ref": branch})
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise Exception(f"获取文件信息失败: HTTP {response.status_code}")
+        return response.headers.get('X-Gitlab-Blob-Id')
+    
+    def get_manifest(self, project_id, branch="main", refresh=False):
+        """
+        获取仓库文件清单（路径 -> blob SHA）
+        
+        同一(项目, 分支)在manifest_ttl内只获取一次完整的文件列表
+        
+        Args:
+            project_id: 项目ID
+            branch: 分支名
+            refresh: 是否忽略缓存重新获取
+            
+        Returns:
+            tuple: (清单, 是否来自缓存)
+        """
+        if not refresh:
+            manifest = self.manifest_cache.get(project_id, branch)
+            if manifest is not None:
+                return manifest, True
+        
+        manifest = {entry['path']: entry['id'] for entry in self.list_tree(project_id, "", branch)
+                    if entry.get('type') == 'blob'}
+        self.manifest_cache.put(project_id, branch, manifest)
+        return manifest, False
+    
+    def list_tree(self, project_id, path="", branch="main", recursive=True):
+        """
+        获取仓库目录下的文件列表（自动翻页）
+        
+        Args:
+            project_id: 项目ID
+            path: 目录路径，为空时表示仓库根目录
+            branch: 分支名
+            recursive: 是否递归获取子目录
+            
+        Returns:
+            list: 文件条目列表，每项包含id(blob SHA)、path、type等；分支或目录不存在时返回空列表
+        """
+        url = f"{self.api_url}/projects/{self.project_path(project_id)}/repository/tree"
+        params = {
+            "ref": branch,
+            "recursive": recursive,
+            "per_page": self.upload_config.get('tree_page_size', 100),
+            "page": 1
+        }
+        if path:
+            params["path"] = path
+        
+        entries = []
+        while True:
+            response = self.request('GET', url, params=params)
+            if response.status_code == 404:
+                # 空仓库、分支或目录不存在
+                return entries
+            if response.status_code != 200:
+                raise Exception(f"获取GitLab文件列表失败: {response.text}")
+            
+            entries.extend(response.json())
+            next_page = response.headers.get('X-Next-Page')
+            if not next_page:
+                return entries
+            params["page"] = int(next_page)
+    
+    def build_file_action(self, action, file_path, content=None, last_commit_id=None):
+        """
+        构建Commits API的单个文件操作
+        
+        Args:
+            action: create/update/delete
+            file_path: 仓库中的文件路径
+            content: 文件内容，str按文本提交，bytes为UTF-8文本时按文本提交，否则按base64提交
+            last_commit_id: 已知的该文件最后一次提交ID，update/delete时文件在此之后被修改则拒绝提交
+            
+        Returns:
+            dict: 文件操作
+        """
+        file_action = {"action": action, "file_path": file_path}
+        if last_commit_id and action != "create":
+            file_action["last_commit_id"] = last_commit_id
+        if action == "delete":
+            return file_action
+        
+        if isinstance(content, bytes):
+            try:
+                content = content.decode('utf-8')
+            except UnicodeDecodeError:
+                file_action["content"] = base64.b64encode(content).decode('ascii')
+                file_action["encoding"] = "base64"
+                return file_action
+        
+        file_action["content"] = content if content is not None else ""
+        file_action["encoding"] = "text"
+        return file_action
+    
+    def _chunk_actions(self, actions):
+        """按请求体大小和操作数拆分文件操作"""
+        max_bytes = self.upload_config.get('max_payload_bytes', 8 * 1024 * 1024)
+        max_actions = self.upload_config.get('max_actions_per_commit', 500)
+        
+        chunks = []
+        current = []
+        current_size = 0
+        for file_action in actions:
+            size = len(json.dumps(file_action, ensure_ascii=False).encode('utf-8'))
+            if current and (current_size + size > max_bytes or len(current) >= max_actions):
+                chunks.append(current)
+                current = []
+                current_size = 0
+            current.append(file_action)
+            current_size += size
+        if current:
+            chunks.append(current)
+        return chunks
+    
+    def commit_actions(self, project_id, actions, branch="main", commit_message="更新文件"):
+        """
+        通过Commits API提交多个文件操作，每批操作生成一次提交
+        
+        操作过多或请求体超过max_payload_bytes时拆分为多次提交，提交信息附加批次序号。
+        
+        Args:
+            project_id: 项目ID
+            actions: build_file_action构建的文件操作列表
+            branch: 分支名
+            commit_message: 提交信息
+            
+        Returns:
+            list: 每次提交的返回信息
+        """
+        url = f"{self.api_url}/projects/{self.project_path(project_id)}/repository/commits"
+        chunks = self._chunk_actions(actions)
+        
+        commits = []
+        for index, chunk in enumerate(chunks, start=1):
+            message = commit_message if len(chunks) == 1 else f"{commit_message} ({index}/{len(chunks)})"
+            response = self.request('POST', url, json={
+                "branch": branch,
+                "commit_message": message,
+                "actions": chunk
+            })
+            if response.status_code != 201:
+                raise Exception(f"提交到GitLab失败: {response.text}")
+            commits.append(response.json())
+            
+            # 提交成功后同步更新文件清单缓存
+            for file_action in chunk:
+                self.manifest_cache.set_path(project_id, branch, file_action['file_path'],
+                                             self._action_sha(file_action))
+        return commits
+    
+    def write_file(self, project_id, file_path, content, branch="main", commit_message="更新文件",
+                   action="update", last_commit_id=None):
+        """
+        通过Commits API写入单个文件
+        
+        一次请求完成写入，不预先查询文件是否存在；提交成功即表示GitLab中的文件内容为content，
+        其blob SHA可由本地计算，无需再下载校验。
+        
+        Args:
+            project_id: 项目ID
+            file_path: 文件路径
+            content: 文件内容
+            branch: 分支名
+            commit_message: 提交信息
+            action: create/update
+            last_commit_id: 调用方已知的该文件最后一次提交ID（类似If-Match），
+                            文件在此之后被其他途径修改时GitLab拒绝提交
+            
+        Returns:
+            dict: commit_id（本次提交ID）、blob_id（写入内容的blob SHA）、file_path、branch
+            
+        Raises:
+            RemoteFileChangedError: 文件已被修改、新建时已存在或更新时不存在
+        """
+        url = f"{self.api_url}/projects/{self.project_path(project_id)}/repository/commits"
+        file_action = self.build_file_action(action, file_path, content, last_commit_id=last_commit_id)
+        response = self.request('POST', url, json={
+            "branch": branch,
+            "commit_message": commit_message,
+            "actions": [file_action]
+        })
+        if response.status_code == 400:
+            self.manifest_cache.invalidate(project_id, branch)
+            try:
+                message = response.json().get('message', response.text)
+            except ValueError:
+                message = response.text
+            raise RemoteFileChangedError(file_path, message)
+        if response.status_code != 201:
+            raise Exception(f"提交到GitLab失败: {response.text}")
+        
+        blob_id = self._action_sha(file_action)
+        self.manifest_cache.set_path(project_id, branch, file_path, blob_id)
+        return {
+            'commit_id': response.json().get('id'),
+            'blob_id': blob_id,
+            'file_path': file_path,
+            'branch': branch
+        }
+    
+    def _action_sha(self, file_action):
+        """文件操作提交后对应的blob SHA，删除操作返回None"""
+        if file_action['action'] == 'delete':
+            return None
+        if file_action.get('encoding') == 'base64':
+            return git_blob_sha(base64.b64decode(file_action['content']))
+        return git_blob_sha(file_action.get('content', ''))
+    
+    def _read_local_file(self, file_path):
+        """读取本地文件，UTF-8文本返回str，其他返回bytes"""
+        with open(file_path, 'rb') as file:
+            data = file.read()
+        try:
+            return data.decode('utf-8')
+        except UnicodeDecodeError:
+            return data
+    
+    def _ensure_project(self, project_id):
+        """确保项目存在，不存在时创建；创建失败只记录错误"""
         try:
             project_info = self.get_project(project_id)
             print(f"找到GitLab项目: {project_info.get('name', project_id)}")
@@ -184,46 +755,178 @@ class GitLabClient:
             except Exception as create_error:
                 print(f"创建项目失败: {create_error}")
                 # 即使创建失败，也不中断文件上传，只是记录错误
+    
+    def upload_directory(self, project_id, local_path, gitlab_path, branch="main",
+                         batch_commit=None, extra_files=None, delete_paths=None, commit_message=None,
+                         ensure_project=True):
+        """
+        上传目录到GitLab项目
+        
+        批量模式下先获取一次远程文件列表确定每个文件是新建还是更新，
+        再通过Commits API将所有文件合并为一次提交（请求体过大时拆分）。
+        
+        Args:
+            project_id: 项目ID
+            local_path: 本地路径
+            gitlab_path: GitLab路径
+            branch: 分支名
+            batch_commit: 是否合并为一次提交，默认使用GITLAB_UPLOAD_CONFIG['batch_commit']
+            extra_files: 一并提交的其他文件 {仓库路径: 内容}，如仓库根目录的cicd.yml
+            delete_paths: 一并删除的仓库目录或文件路径列表（仅批量模式）
+            commit_message: 提交信息
+            ensure_project: 是否先检查项目是否存在（调用方已创建项目时可跳过）
+            
+        Returns:
+            dict: 上传结果统计
+        """
+        local_dir = Path(local_path)
+        
+        # 如果本地目录不存在，创建一个空目录
+        if not local_dir.exists():
+            local_dir.mkdir(parents=True, exist_ok=True)
+        
+        # 首先确保项目存在
+        if ensure_project:
+            self._ensure_project(project_id)
         
-        # 递归遍历目录中的所有文件
+        files = {}
+        for file_path in sorted(local_dir.glob('**/*')):
+            if file_path.is_file():
+                # 构建GitLab中的相对路径
+                relative_path = file_path.relative_to(local_dir)
+                gitlab_file_path = f"{gitlab_path}/{relative_path}".replace('\\', '/')
+                files[gitlab_file_path] = file_path
+        
+        if batch_commit is None:
+            batch_commit = self.upload_config.get('batch_commit', True)
+        
+        if batch_commit:
+            return self._upload_directory_batch(project_id, gitlab_path, files, branch,
+                                                extra_files or {}, delete_paths or [],
+                                                commit_message or f"同步目录: {gitlab_path}")
+        
+        # 逐个文件上传，每个文件一次提交，内容未变化的文件跳过
         upload_success_count = 0
+        upload_skipped_count = 0
         upload_error_count = 0
         
-        for file_path in local_dir.glob('**/*'):
-            if file_path.is_file():
-                try:
-                    # 构建GitLab中的相对路径
-                    relative_path = file_path.relative_to(local_dir)
-                    gitlab_file_path = f"{gitlab_path}/{relative_path}".replace('\\', '/')
-                    
-                    # 读取文件内容
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as file:
-                            content = file.read()
-                    except UnicodeDecodeError:
-                        # 如果UTF-8解码失败，尝试以二进制方式读取并进行base64编码
-                        with open(file_path, 'rb') as file:
-                            binary_content = file.read()
-                            content = base64.b64encode(binary_content).decode('ascii')
-                            print(f"文件 {file_path} 以二进制方式读取并进行base64编码")
-                    
-                    # 上传文件到GitLab
-                    self.upload_file(
-                        project_id=project_id,
-                        file_path=gitlab_file_path,
-                        content=content,
-                        branch=branch,
-                        commit_message=f"添加文件: {gitlab_file_path}"
-                    )
-                    upload_success_count += 1
-                    print(f"成功上传文件: {gitlab_file_path}")
-                    
-                except Exception as e:
-                    upload_error_count += 1
-                    print(f"上传文件 {file_path} 失败: {str(e)}")
-                    # 继续处理其他文件，不中断整个上传过程
-        
-        print(f"目录上传完成: 成功{upload_success_count}个文件，失败{upload_error_count}个文件")
+        uploads = [(path, local_file) for path, local_file in files.items()]
+        uploads.extend((path, None) for path in (extra_files or {}))
+        for gitlab_file_path, local_file in uploads:
+            try:
+                if local_file is None:
+                    content = extra_files[gitlab_file_path]
+                else:
+                    content = self._read_local_file(local_file)
+                if isinstance(content, bytes):
+                    content = base64.b64encode(content).decode('ascii')
+                    print(f"文件 {local_file} 以二进制方式读取并进行base64编码")
+                
+                # 上传文件到GitLab
+                result = self.upload_file(
+                    project_id=project_id,
+                    file_path=gitlab_file_path,
+                    content=content,
+                    branch=branch,
+                    commit_message=f"添加文件: {gitlab_file_path}"
+                )
+                if result.get('skipped'):
+                    upload_skipped_count += 1
+                    continue
+                upload_success_count += 1
+                print(f"成功上传文件: {gitlab_file_path}")
+                
+            except Exception as e:
+                upload_error_count += 1
+                print(f"上传文件 {local_file or gitlab_file_path} 失败: {str(e)}")
+                # 继续处理其他文件，不中断整个上传过程
+        
+        print(f"目录上传完成: 成功{upload_success_count}个文件，跳过{upload_skipped_count}个未变化文件，"
+              f"失败{upload_error_count}个文件")
+        return {
+            'mode': 'per_file',
+            'uploaded': upload_success_count,
+            'skipped': upload_skipped_count,
+            'failed': upload_error_count,
+            'commits': upload_success_count
+        }
+    
+    def _build_batch_actions(self, manifest, contents, delete_paths):
+        """
+        根据文件清单为每个文件生成create/update操作，并为delete_paths下的远程文件生成delete操作
+        
+        本地内容的blob SHA与清单中一致的文件不生成操作
+        
+        Returns:
+            tuple: (操作列表, 删除文件数, 跳过文件数)
+        """
+        actions = []
+        skipped = 0
+        for gitlab_file_path, content in contents.items():
+            remote_sha = manifest.get(gitlab_file_path)
+            if remote_sha is not None and remote_sha == git_blob_sha(content):
+                skipped += 1
+                continue
+            action = "update" if remote_sha is not None else "create"
+            actions.append(self.build_file_action(action, gitlab_file_path, content))
+        
+        deleted = 0
+        for delete_path in delete_paths:
+            prefix = delete_path.rstrip('/') + '/'
+            for remote_path in sorted(manifest):
+                if (remote_path == delete_path or remote_path.startswith(prefix)) and remote_path not in contents:
+                    actions.append(self.build_file_action("delete", remote_path))
+                    deleted += 1
+        return actions, deleted, skipped
+    
+    def _upload_directory_batch(self, project_id, gitlab_path, files, branch, extra_files,
+                                delete_paths, commit_message):
+        """批量模式上传目录，见upload_directory"""
+        contents = {gitlab_file_path: self._read_local_file(local_file)
+                    for gitlab_file_path, local_file in files.items()}
+        contents.update(extra_files)
+        
+        # 根据文件清单确定每个文件应新建还是更新；有要删除的目录时重新获取清单，
+        # 缓存的清单可能缺少其他进程在这些目录中新建的文件
+        manifest, cached = self.get_manifest(project_id, branch, refresh=bool(delete_paths))
+        actions, deleted, skipped = self._build_batch_actions(manifest, contents, delete_paths)
+        if cached and skipped:
+            # 缓存的清单只随本进程的写入更新，其他进程可能已修改这些文件：重新获取清单确认后再跳过
+            manifest, cached = self.get_manifest(project_id, branch, refresh=True)
+            actions, deleted, skipped = self._build_batch_actions(manifest, contents, delete_paths)
+        
+        if not actions:
+            print(f"目录上传完成: 没有需要提交的文件，跳过{skipped}个未变化文件")
+            return {'mode': 'batch', 'uploaded': 0, 'skipped': skipped, 'deleted': 0, 'failed': 0,
+                    'commits': 0, 'commit_ids': []}
+        
+        try:
+            try:
+                commits = self.commit_actions(project_id, actions, branch, commit_message)
+            except Exception as e:
+                if not cached:
+                    raise
+                # 缓存的清单可能已过期，刷新后重新生成操作再提交一次
+                print(f"批量提交失败，刷新文件清单后重试: {str(e)}")
+                manifest, _ = self.get_manifest(project_id, branch, refresh=True)
+                actions, deleted, skipped = self._build_batch_actions(manifest, contents, delete_paths)
+                commits = self.commit_actions(project_id, actions, branch, commit_message) if actions else []
+        except Exception as e:
+            print(f"批量提交目录 {gitlab_path} 失败: {str(e)}")
+            raise Exception(f"上传目录到GitLab项目 cicd/{project_id} 失败: {str(e)}")
+        
+        uploaded = len(actions) - deleted
+        print(f"目录上传完成: 上传{uploaded}个文件，跳过{skipped}个未变化文件，删除{deleted}个文件，"
+              f"共{len(commits)}次提交")
+        return {
+            'mode': 'batch',
+            'uploaded': uploaded,
+            'skipped': skipped,
+            'deleted': deleted,
+            'failed': 0,
+            'commits': len(commits),
+            'commit_ids': [commit.get('id') for commit in commits]
+        }
     
     def delete_project(self, project_id):
         """
@@ -235,13 +938,14 @@ class GitLabClient:
         Returns:
             bool: 删除是否成功
         """
-        project_path = f"{self.namespace}%2F{project_id}"
-        url = f"{self.api_url}/projects/{project_path}"
+        url = f"{self.api_url}/projects/{self.project_path(project_id)}"
         
-        response = requests.delete(url, headers=self.headers, verify=False)
+        response = self.request('DELETE', url)
         
         if response.status_code in [202, 204]:
             print(f"成功删除GitLab项目: cicd/{project_id}")
+            self.project_cache.invalidate(project_id)
+            self.manifest_cache.invalidate(project_id)
             return True
         else:
             raise Exception(f"删除GitLab项目 cicd/{project_id} 失败: {response.text}")
@@ -258,57 +962,53 @@ class GitLabClient:
         Returns:
             bool: 删除是否成功
         """
-        project_path = f"{self.namespace}%2F{project_id}"
-        url = f"{self.api_url}/projects/{project_path}/repository/files/{requests.utils.quote(file_path, safe='')}"
+        url = f"{self.api_url}/projects/{self.project_path(project_id)}/repository/files/{requests.utils.quote(file_path, safe='')}"
         data = {
             "branch": branch,
             "commit_message": f"删除文件: {file_path}"
         }
         
-        response = requests.delete(url, headers=self.headers, params=data, verify=False)
+        response = self.request('DELETE', url, params=data)
         
         if response.status_code not in [200, 204]:
             print(f"删除GitLab文件失败: cicd/{project_id}/{file_path}, 状态码: {response.status_code}, 响应: {response.text}")
         else:
             print(f"成功删除GitLab文件: cicd/{project_id}/{file_path}")
+            self.manifest_cache.set_path(project_id, branch, file_path, None)
     
-    def delete_directory(self, project_id, directory_path):
+    def delete_directory(self, project_id, directory_path, branch="main", commit_message=None):
         """
         删除GitLab项目中的目录（递归删除所有文件）
         
+        分页获取目录下的全部文件后，通过Commits API在一次提交中删除（请求体过大时拆分）
+        
         Args:
             project_id: 项目ID
             directory_path: 目录路径
+            branch: 分支名
+            commit_message: 提交信息
             
         Returns:
             bool: 删除是否成功
         """
+        directory_path = directory_path.strip('/')
+        commit_message = commit_message or f"删除目录: {directory_path}"
         try:
-            project_path = f"{self.namespace}%2F{project_id}"
-            # 获取目录下的所有文件
-            url = f"{self.api_url}/projects/{project_path}/repository/tree"
-            params = {"path": directory_path, "recursive": True}
-            
-            response = requests.get(url, headers=self.headers, params=params, verify=False)
+            # 删除前总是重新获取目录下的文件列表，缓存的清单可能缺少其他途径新建的文件
+            paths = [entry['path'] for entry in self.list_tree(project_id, directory_path, branch)
+                     if entry.get('type') == 'blob']
             
-            if response.status_code == 200:
-                files = response.json()
-                deleted_count = 0
-                
-                # 删除目录下的所有文件
-                for file_info in files:
-                    if file_info["type"] == "blob":  # 只删除文件，不删除子目录
-                        try:
-                            self.delete_file(project_id, file_info["path"])
-                            deleted_count += 1
-                        except Exception as e:
-                            print(f"删除文件失败: {file_info['path']}, 错误: {e}")
-                
-                print(f"目录删除完成: cicd/{project_id}/{directory_path}, 共删除 {deleted_count} 个文件")
+            if not paths:
+                print(f"目录下没有文件: cicd/{project_id}/{directory_path}")
                 return True
-            else:
-                print(f"获取目录文件列表失败: cicd/{project_id}/{directory_path}, 响应: {response.text}")
-                return False
+            
+            actions = [self.build_file_action("delete", path) for path in paths]
+            commits = self.commit_actions(project_id, actions, branch, commit_message)
+            
+            self.manifest_cache.remove_prefix(project_id, branch, directory_path)
+            print(f"目录删除完成: cicd/{project_id}/{directory_path}, 共删除 {len(actions)} 个文件，"
+                  f"{len(commits)}次提交")
+            return True
                 
         except Exception as e:
             print(f"删除目录失败: cicd/{project_id}/{directory_path}, 错误: {e}")
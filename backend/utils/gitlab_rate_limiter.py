@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional
+
+from backend.config.settings import GITLAB_RATE_LIMIT_CONFIG
+
+
+class GitLabRateLimitError(Exception):
+    """等待GitLab请求配额的时间超过上限"""
+
+    def __init__(self, host, wait_seconds):
+        self.host = host
+        self.wait_seconds = wait_seconds
+        super().__init__(f"GitLab {host} 请求配额不足，需等待 {wait_seconds:.1f} 秒，超过等待上限")
+
+
+def _header_number(headers, name) -> Optional[float]:
+    value = headers.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """解析Retry-After响应头（秒数或HTTP日期），返回需等待的秒数"""
+    if value is None or value == '':
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class _HostBucket:
+    """单个GitLab主机的令牌桶及服务端返回的配额状态"""
+
+    __slots__ = ('tokens', 'updated_at', 'blocked_until', 'limit', 'remaining', 'reset_at',
+                 'requests', 'throttled', 'waited', 'rate_limited')
+
+    def __init__(self, capacity):
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0      # 在此时间（monotonic）之前不发送请求
+        self.limit = None             # RateLimit-Limit
+        self.remaining = None         # RateLimit-Remaining
+        self.reset_at = None          # RateLimit-Reset（unix时间）
+        self.requests = 0
+        self.throttled = 0            # 因配额不足而等待的请求数
+        self.waited = 0.0             # 累计等待时间（秒）
+        self.rate_limited = 0         # 收到的429响应数
+
+
+class RateLimitScheduler:
+    """
+    GitLab请求限速调度器
+
+    每个GitLab主机一个令牌桶，按requests_per_second补充令牌、最多积累burst个。
+    发送请求前acquire()取得令牌，令牌不足或服务端要求等待时阻塞当前线程，
+    等待时间超过max_wait时抛出GitLabRateLimitError。
+    收到响应后update()读取RateLimit-Remaining/RateLimit-Reset/Retry-After，
+    服务端配额耗尽或返回429时，在重置时间之前暂停该主机的所有请求。
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.enabled = config.get('enabled', True)
+        self.rate = float(config.get('requests_per_second', 10))
+        self.capacity = float(config.get('burst', 20))
+        self.max_wait = config.get('max_wait', 60)
+        self.default_retry_after = config.get('default_retry_after', 5)
+        self._buckets: Dict[str, _HostBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host) -> _HostBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = _HostBucket(self.capacity)
+        return bucket
+
+    def _refill(self, bucket, now):
+        bucket.tokens = min(self.capacity, bucket.tokens + (now - bucket.updated_at) * self.rate)
+        bucket.updated_at = now
+
+    def acquire(self, host, max_wait=None) -> float:
+        """
+        取得一个请求令牌，必要时等待
+
+        Args:
+            host: GitLab主机
+            max_wait: 最长等待时间（秒），默认使用配置中的max_wait
+
+        Returns:
+            float: 实际等待的秒数
+
+        Raises:
+            GitLabRateLimitError: 需要等待的时间超过max_wait
+        """
+        if not self.enabled:
+            return 0.0
+        max_wait = self.max_wait if max_wait is None else max_wait
+        waited = 0.0
+        while True:
+            with self._lock:
+                bucket = self._bucket(host)
+                now = time.monotonic()
+                self._refill(bucket, now)
+                if now < bucket.blocked_until:
+                    wait = bucket.blocked_until - now
+                elif bucket.tokens >= 1:
+                    bucket.tokens -= 1
+                    bucket.requests += 1
+                    if waited:
+                        bucket.throttled += 1
+                        bucket.waited += waited
+                    return waited
+                else:
+                    wait = (1 - bucket.tokens) / self.rate if self.rate > 0 else self.default_retry_after
+            if waited + wait > max_wait:
+                raise GitLabRateLimitError(host, waited + wait)
+            time.sleep(wait)
+            waited += wait
+
+    def update(self, host, response) -> Optional[float]:
+        """
+        根据响应头更新主机的配额状态
+
+        Returns:
+            float: 响应为429时建议的等待秒数，否则为None
+        """
+        if not self.enabled:
+            return None
+        headers = response.headers
+        limit = _header_number(headers, 'RateLimit-Limit')
+        remaining = _header_number(headers, 'RateLimit-Remaining')
+        reset_at = _header_number(headers, 'RateLimit-Reset')
+        retry_after = parse_retry_after(headers.get('Retry-After'))
+
+        with self._lock:
+            bucket = self._bucket(host)
+            now = time.monotonic()
+            if limit is not None:
+                bucket.limit = int(limit)
+            if reset_at is not None:
+                bucket.reset_at = reset_at
+            if remaining is not None:
+                bucket.remaining = int(remaining)
+                # 本地令牌不超过服务端剩余配额
+                self._refill(bucket, now)
+                bucket.tokens = min(bucket.tokens, remaining)
+                if remaining <= 0 and reset_at is not None:
+                    bucket.blocked_until = max(bucket.blocked_until, now + max(0.0, reset_at - time.time()))
+
+            if response.status_code != 429:
+                if retry_after:
+                    bucket.blocked_until = max(bucket.blocked_until, now + retry_after)
+                return None
+
+            bucket.rate_limited += 1
+            if retry_after is None:
+                retry_after = max(0.0, reset_at - time.time()) if reset_at is not None else self.default_retry_after
+            bucket.tokens = 0.0
+            bucket.blocked_until = max(bucket.blocked_until, now + retry_after)
+            return retry_after
+
+    def snapshot(self) -> Dict[str, Any]:
+        """各主机当前的请求配额"""
+        with self._lock:
+            now = time.monotonic()
+            hosts = {}
+            for host, bucket in self._buckets.items():
+                self._refill(bucket, now)
+                hosts[host] = {
+                    'tokens': round(bucket.tokens, 2),
+                    'blocked_for': round(max(0.0, bucket.blocked_until - now), 3),
+                    'limit': bucket.limit,
+                    'remaining': bucket.remaining,
+                    'reset_at': bucket.reset_at,
+                    'requests': bucket.requests,
+                    'throttled': bucket.throttled,
+                    'waited_seconds': round(bucket.waited, 3),
+                    'rate_limited_responses': bucket.rate_limited
+                }
+        return {
+            'enabled': self.enabled,
+            'requests_per_second': self.rate,
+            'burst': self.capacity,
+            'max_wait': self.max_wait,
+            'hosts': hosts
+        }
+
+
+# 全局限速调度器，所有GitLabClient实例共享各主机的配额
+rate_limit_scheduler = RateLimitScheduler(GITLAB_RATE_LIMIT_CONFIG)
@@ -5,16 +5,21 @@ import hashlib
 import time
 import json
 import threading
-from datetime import datetime, timedelta
+import uuid
+from datetime import datetime
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass, asdict
 from enum import Enum
-from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
 from pathlib import Path
 
-from .gitlab_client import GitLabClient, gitlab_client
+from .gitlab_client import GitLabClient, RemoteFileChangedError, git_blob_sha, gitlab_client
+from .gitlab_circuit_breaker import CircuitOpenError
+from .async_gitlab_client import gitlab_sync_facade
 from .database import db_manager
+from .sync_operation_queue import SyncOperationQueue, LeaseKeeper, default_worker_id
+from .operation_registry import OperationRegistry
+from backend.config.settings import SYNC_QUEUE_CONFIG, SYNC_REGISTRY_CONFIG
 from .yaml_config_parser import YamlConfigParser
 
 
@@ -26,6 +31,7 @@ class SyncStatus(Enum):
     FAILED = "failed"        # 同步失败
     CONFLICT = "conflict"    # 存在冲突
     RETRY = "retry"          # 重试中
+    COALESCED = "coalesced"  # 已合并到同一文件的后续操作中
 
 
 @dataclass
@@ -43,6 +49,12 @@ class SyncOperation:
     retry_count: int = 0
     error_message: Optional[str] = None
     conflict_details: Optional[Dict] = None
+    lease_owner: Optional[str] = None  # 持有队列租约的工作进程/线程
+    result: Optional[Dict] = None      # 同步结果详情（提交ID等）
+    commit_message: Optional[str] = None       # 提交信息，为空时使用默认格式
+    resolution_strategy: Optional[str] = None  # 检测到冲突时自动采用的解决策略，为空时保持冲突状态
+    coalesced_into: Optional[str] = None       # 合并到的后续操作ID
+    folded_operation_ids: Optional[List[str]] = None  # 合并到本操作中的操作ID
 
 
 @dataclass
@@ -61,15 +73,30 @@ class GitLabSyncManager:
     def __init__(self):
         self.gitlab_client = gitlab_client
         self.yaml_parser = YamlConfigParser()
-        self.sync_operations: Dict[str, SyncOperation] = {}
+        # 本进程最近使用的操作（有上限、过期自动清理，已结束的操作不保留文件内容）
+        self.sync_operations = OperationRegistry(
+            max_entries=SYNC_REGISTRY_CONFIG.get('max_entries', 1000),
+            ttl=SYNC_REGISTRY_CONFIG.get('ttl', 3600),
+            sweep_interval=SYNC_REGISTRY_CONFIG.get('sweep_interval', 60)
+        )
         self.sync_lock = threading.RLock()
         self.max_retry_count = 3
         self.retry_delay_base = 2  # 基础重试延迟（秒）
-        self.batch_size = 5  # 批量操作并发数
+        # 同步操作持久化到gitlab_sync_operations表，任意进程都可查询状态和领取执行
+        self.queue = SyncOperationQueue(db_manager, lease_seconds=SYNC_QUEUE_CONFIG.get('lease_seconds', 120))
+        self.worker_id = default_worker_id()
+        # 执行期间定期续租，耗时超过lease_seconds的操作不会被其他工作进程重复领取
+        self.leases = LeaseKeeper(self.queue)
+        self.retention_days = SYNC_QUEUE_CONFIG.get('retention_days', 7)
+        # 同一文件在合并窗口内的多次修改只上传最新内容
+        self.coalesce_window = SYNC_QUEUE_CONFIG.get('coalesce_window', 0)
+        self.coalesce_max_delay = SYNC_QUEUE_CONFIG.get('coalesce_max_delay', 10)
+        # 有新操作入队时唤醒后台工作线程
+        self.wakeup = threading.Event()
         
     def generate_operation_id(self, project_id: str, branch: str, task_name: str) -> str:
         """生成同步操作ID"""
-        unique_str = f"{project_id}_{branch}_{task_name}_{int(time.time())}"
+        unique_str = f"{project_id}_{branch}_{task_name}_{time.time_ns()}_{uuid.uuid4().hex}"
         return hashlib.md5(unique_str.encode()).hexdigest()[:16]
         
     def calculate_content_hash(self, content: str) -> str:
@@ -77,8 +104,16 @@ class GitLabSyncManager:
         return hashlib.sha256(content.encode()).hexdigest()
         
     def create_sync_operation(self, project_id: str, branch: str, task_name: str, 
-                            file_path: str, content: str) -> SyncOperation:
-        """创建同步操作"""
+                            file_path: str, content: str, enqueue: bool = False,
+                            commit_message: Optional[str] = None,
+                            resolution_strategy: Optional[str] = None) -> SyncOperation:
+        """
+        创建同步操作并写入队列表
+        
+        enqueue为False时由当前进程持有租约并立即执行（进程崩溃后租约过期，由工作进程接手）；
+        为True时进入pending状态，等待后台工作线程领取。配置了合并窗口时，同一文件尚未领取的
+        操作合并到新操作中（folded_operation_ids），新操作在窗口结束后执行
+        """
         operation_id = self.generate_operation_id(project_id, branch, task_name)
         content_hash = self.calculate_content_hash(content)
         
@@ -91,113 +126,267 @@ class GitLabSyncManager:
             content=content,
             content_hash=content_hash,
             timestamp=datetime.now(),
-            status=SyncStatus.PENDING
+            status=SyncStatus.PENDING,
+            lease_owner=None if enqueue else self.worker_id,
+            commit_message=commit_message,
+            resolution_strategy=resolution_strategy
         )
         
-        with self.sync_lock:
-            self.sync_operations[operation_id] = operation
+        record = {
+            'operation_id': operation.operation_id,
+            'project_id': operation.project_id,
+            'branch': operation.branch,
+            'task_name': operation.task_name,
+            'file_path': operation.file_path,
+            'content': operation.content,
+            'content_hash': operation.content_hash,
+            'commit_message': operation.commit_message,
+            'resolution_strategy': operation.resolution_strategy,
+            'created_at': operation.timestamp
+        }
+        try:
+            if enqueue and self.coalesce_window > 0:
+                row = self.queue.enqueue_coalesced(record, self.coalesce_window, self.coalesce_max_delay)
+                operation.folded_operation_ids = row['folded_operation_ids'] or []
+            else:
+                self.queue.enqueue(record, owner=operation.lease_owner)
+        except Exception as e:
+            if enqueue:
+                raise Exception(f"写入同步队列失败: {str(e)}")
+            # 立即执行的操作不依赖队列，写入失败时只在当前进程内跟踪
+            print(f"写入同步队列失败，操作仅保存在当前进程: {str(e)}")
+        
+        self.sync_operations.put(operation)
+        for folded_id in operation.folded_operation_ids or []:
+            self.sync_operations.mark_coalesced(folded_id, operation_id)
+        
+        if enqueue:
+            self.wakeup.set()
             
         return operation
+    
+    def _operation_from_row(self, row: Dict[str, Any]) -> SyncOperation:
+        """将队列表中的记录转换为SyncOperation"""
+        return SyncOperation(
+            operation_id=row['operation_id'],
+            project_id=row['project_id'],
+            branch=row['branch'],
+            task_name=row['task_name'],
+            file_path=row['file_path'],
+            content=row['content'] or '',
+            content_hash=row['content_hash'],
+            timestamp=row['created_at'],
+            status=SyncStatus(row['status']),
+            retry_count=row['retry_count'],
+            error_message=row['error_message'],
+            conflict_details=row['conflict_details'],
+            lease_owner=row['lease_owner'],
+            result=row['result'],
+            commit_message=row['commit_message'],
+            resolution_strategy=row['resolution_strategy'],
+            coalesced_into=row['coalesced_into'],
+            folded_operation_ids=row['folded_operation_ids']
+        )
+    
+    def get_operation(self, operation_id: str) -> Optional[SyncOperation]:
+        """获取同步操作，优先读取队列表（其他进程创建或执行的操作也能查到）"""
+        try:
+            row = self.queue.get(operation_id)
+            if row:
+                return self._operation_from_row(row)
+        except Exception as e:
+            print(f"读取同步队列失败: {str(e)}")
+        
+        return self.sync_operations.get(operation_id, self._operation_from_fields)
+    
+    def _operation_from_fields(self, fields: Dict[str, Any]) -> SyncOperation:
+        """将进程内记录的字段转换为SyncOperation"""
+        return SyncOperation(**dict(fields, status=SyncStatus(fields['status'])))
+    
+    def save_operation(self, operation: SyncOperation) -> bool:
+        """保存操作状态到队列表并释放租约"""
+        try:
+            saved = self.queue.finish({
+                'operation_id': operation.operation_id,
+                'status': operation.status.value,
+                'content': operation.content,
+                'content_hash': operation.content_hash,
+                'retry_count': operation.retry_count,
+                'error_message': operation.error_message,
+                'conflict_details': operation.conflict_details,
+                'result': operation.result
+            }, owner=operation.lease_owner)
+            if saved:
+                self.sync_operations.put(operation)
+            else:
+                print(f"同步操作 {operation.operation_id} 的租约已被其他工作进程领取，未保存状态")
+            operation.lease_owner = None
+            return saved
+        except Exception as e:
+            print(f"保存同步操作状态失败: {str(e)}")
+            # 数据库不可用时仍可从进程内记录查询状态
+            self.sync_operations.put(operation)
+            return False
+    
+    def claim_operations(self, limit: int = 1, owner: Optional[str] = None) -> List[SyncOperation]:
+        """从队列领取待执行的操作（FOR UPDATE SKIP LOCKED，多进程同时领取互不重复）"""
+        rows = self.queue.claim(owner or self.worker_id, limit)
+        operations = [self._operation_from_row(row) for row in rows]
+        for operation in operations:
+            self.sync_operations.put(operation)
+        return operations
+    
+    def process_queued_operations(self, limit: int = 1, owner: Optional[str] = None) -> List[SyncResult]:
+        """
+        领取并执行队列中的操作
+        
+        失败且未达到重试上限的操作按指数退避重新放回队列，由任意工作进程稍后重试；
+        GitLab熔断中未发送请求的操作不计入重试次数，熔断恢复后再执行
+        """
+        owner = owner or self.worker_id
+        results = []
+        for operation in self.claim_operations(limit, owner):
+            with self.leases.hold(operation.operation_id, operation.lease_owner):
+                result = self._execute_with_resolution(operation, operation.resolution_strategy)
+            if result.status == SyncStatus.RETRY:
+                self._defer_operation(operation, result)
+            elif result.status == SyncStatus.FAILED and operation.retry_count < self.max_retry_count:
+                delay = self.retry_delay_base ** operation.retry_count
+                try:
+                    self.queue.retry_later(operation.operation_id, owner, delay, operation.error_message)
+                    operation.status = SyncStatus.RETRY
+                    operation.retry_count += 1
+                    operation.lease_owner = None
+                    self.sync_operations.put(operation)
+                    result.status = SyncStatus.RETRY
+                    result.message = f"{result.message}，{delay}秒后重试"
+                except Exception as e:
+                    print(f"同步操作 {operation.operation_id} 放回队列失败: {str(e)}")
+                    self.save_operation(operation)
+            else:
+                self.save_operation(operation)
+            results.append(result)
+        return results
+        
+    def _defer_operation(self, operation: SyncOperation, result: SyncResult) -> bool:
+        """GitLab熔断中：将操作放回队列，熔断器预计恢复时再领取，不计入重试次数"""
+        delay = max(1.0, (result.details or {}).get('retry_in', 0.0))
+        try:
+            deferred = self.queue.retry_later(operation.operation_id, operation.lease_owner, delay,
+                                              operation.error_message, count_retry=False)
+        except Exception as e:
+            print(f"同步操作 {operation.operation_id} 放回队列失败: {str(e)}")
+            return self.save_operation(operation)
+        if not deferred:
+            print(f"同步操作 {operation.operation_id} 的租约已被其他工作进程领取，未放回队列")
+        operation.lease_owner = None
+        self.sync_operations.put(operation)
+        result.message = f"{result.message}，已放回同步队列"
+        return deferred
         
     def get_remote_file_info(self, project_id: str, file_path: str, branch: str = "main") -> Optional[Dict]:
         """获取远程文件信息"""
         try:
-            url = f"{self.gitlab_client.api_url}/projects/{self.gitlab_client.namespace}%2F{project_id}/repository/files/{requests.utils.quote(file_path, safe='')}"
-            params = {"ref": branch}
-            
-            response = requests.get(url, headers=self.gitlab_client.headers, params=params, verify=False)
-            
-            if response.status_code == 200:
-                file_info = response.json()
-                # 解码内容并计算哈希
-                import base64
-                content = base64.b64decode(file_info.get('content', '')).decode('utf-8')
-                content_hash = self.calculate_content_hash(content)
-                
-                return {
-                    'content': content,
-                    'content_hash': content_hash,
-                    'last_commit_id': file_info.get('last_commit_id'),
-                    'file_name': file_info.get('file_name'),
-                    'file_path': file_info.get('file_path'),
-                    'size': file_info.get('size'),
-                    'encoding': file_info.get('encoding')
-                }
-            elif response.status_code == 404:
+            file_info = self.gitlab_client.get_remote_file_info(project_id, file_path, branch)
+            if file_info is None:
                 return None  # 文件不存在
-            else:
-                raise Exception(f"获取远程文件信息失败: {response.text}")
+            
+            # 计算内容哈希
+            content = file_info['content']
+            if isinstance(content, bytes):
+                content = content.decode('utf-8')
+            file_info['content'] = content
+            file_info['content_hash'] = self.calculate_content_hash(content)
+            return file_info
                 
+        except CircuitOpenError:
+            # 熔断中无法确认文件是否存在，不能当作文件不存在处理
+            raise
         except Exception as e:
             print(f"获取远程文件信息时发生错误: {str(e)}")
             return None
             
+    def get_known_version(self, operation: SyncOperation) -> Optional[Dict[str, str]]:
+        """
+        该文件最近一次同步成功后的提交ID和blob SHA，从队列表读取（其他进程的同步结果也能用上）
+        
+        读取失败时返回None，按未知版本处理（下载远程文件检测冲突后再写入）
+        """
+        try:
+            return self.queue.last_synced_version(operation.project_id, operation.branch, operation.file_path)
+        except Exception as e:
+            print(f"读取文件同步版本失败: {str(e)}")
+            return None
+    
     def detect_conflict(self, operation: SyncOperation) -> Tuple[bool, Optional[Dict]]:
         """检测配置冲突"""
         try:
             remote_info = self.get_remote_file_info(operation.project_id, operation.file_path, operation.branch)
+            return self._compare_with_remote(operation, remote_info)
+        except Exception as e:
+            print(f"冲突检测失败: {str(e)}")
+            # 检测失败时，为了安全起见，假设存在冲突
+            return True, {
+                'type': 'detection_error',
+                'error': str(e)
+            }
+    
+    def _compare_with_remote(self, operation: SyncOperation,
+                             remote_info: Optional[Dict]) -> Tuple[bool, Optional[Dict]]:
+        """比较本地内容与远程文件，判断是否存在配置冲突"""
+        if not remote_info:
+            # 远程文件不存在，无冲突
+            return False, None
             
-            if not remote_info:
-                # 远程文件不存在，无冲突
-                return False, None
-                
-            local_hash = operation.content_hash
-            remote_hash = remote_info['content_hash']
+        local_hash = operation.content_hash
+        remote_hash = remote_info['content_hash']
+        
+        if local_hash == remote_hash:
+            # 内容相同，无冲突
+            return False, None
             
-            if local_hash == remote_hash:
-                # 内容相同，无冲突
-                return False, None
-                
-            # 检测是否为YAML配置冲突
-            try:
-                import yaml
-                local_config = yaml.safe_load(operation.content) or {}
-                remote_config = yaml.safe_load(remote_info['content']) or {}
-                
-                # 比较variables部分
-                local_vars = local_config.get('variables', {})
-                remote_vars = remote_config.get('variables', {})
-                
-                conflicted_vars = {}
-                for key in set(local_vars.keys()) | set(remote_vars.keys()):
-                    local_val = local_vars.get(key)
-                    remote_val = remote_vars.get(key)
-                    if local_val != remote_val:
-                        conflicted_vars[key] = {
-                            'local': local_val,
-                            'remote': remote_val
-                        }
-                
-                if conflicted_vars:
-                    conflict_details = {
-                        'type': 'variable_conflict',
-                        'conflicted_variables': conflicted_vars,
-                        'local_hash': local_hash,
-                        'remote_hash': remote_hash,
-                        'remote_commit': remote_info.get('last_commit_id')
+        # 检测是否为YAML配置冲突
+        try:
+            import yaml
+            local_config = yaml.safe_load(operation.content) or {}
+            remote_config = yaml.safe_load(remote_info['content']) or {}
+            
+            # 比较variables部分
+            local_vars = local_config.get('variables', {})
+            remote_vars = remote_config.get('variables', {})
+            
+            conflicted_vars = {}
+            for key in set(local_vars.keys()) | set(remote_vars.keys()):
+                local_val = local_vars.get(key)
+                remote_val = remote_vars.get(key)
+                if local_val != remote_val:
+                    conflicted_vars[key] = {
+                        'local': local_val,
+                        'remote': remote_val
                     }
-                    return True, conflict_details
-                    
-            except Exception as e:
-                # YAML解析失败，视为内容冲突
+            
+            if conflicted_vars:
                 conflict_details = {
-                    'type': 'content_conflict',
+                    'type': 'variable_conflict',
+                    'conflicted_variables': conflicted_vars,
                     'local_hash': local_hash,
                     'remote_hash': remote_hash,
-                    'remote_commit': remote_info.get('last_commit_id'),
-                    'parse_error': str(e)
+                    'remote_commit': remote_info.get('last_commit_id')
                 }
                 return True, conflict_details
                 
-            return False, None
-            
         except Exception as e:
-            print(f"冲突检测失败: {str(e)}")
-            # 检测失败时，为了安全起见，假设存在冲突
-            return True, {
-                'type': 'detection_error',
-                'error': str(e)
+            # YAML解析失败，视为内容冲突
+            conflict_details = {
+                'type': 'content_conflict',
+                'local_hash': local_hash,
+                'remote_hash': remote_hash,
+                'remote_commit': remote_info.get('last_commit_id'),
+                'parse_error': str(e)
             }
+            return True, conflict_details
+            
+        return False, None
             
     def resolve_conflict(self, operation: SyncOperation, resolution_strategy: str = "local_wins") -> SyncOperation:
         """解决配置冲突"""
@@ -255,63 +444,145 @@ class GitLabSyncManager:
         return operation
         
     def atomic_sync_operation(self, operation: SyncOperation) -> SyncResult:
-        """原子性同步操作"""
+        """原子性同步操作，执行完成后将状态保存到队列表；GitLab熔断中时放回队列由工作线程稍后执行"""
+        with self.leases.hold(operation.operation_id, operation.lease_owner):
+            result = self._execute_sync_operation(operation)
+        self._save_result(operation, result)
+        return result
+        
+    def _save_result(self, operation: SyncOperation, result: SyncResult):
+        """保存执行结果；GitLab熔断中未执行的操作放回队列"""
+        if result.status == SyncStatus.RETRY:
+            self._defer_operation(operation, result)
+        else:
+            self.save_operation(operation)
+        
+    def _execute_with_resolution(self, operation: SyncOperation,
+                                 resolution_strategy: Optional[str]) -> SyncResult:
+        """执行同步操作，检测到冲突时按resolution_strategy解决后再次执行"""
+        result = self._execute_sync_operation(operation)
+        if result.status != SyncStatus.CONFLICT or not resolution_strategy:
+            return result
+        
+        operation = self.resolve_conflict(operation, resolution_strategy)
+        if operation.status == SyncStatus.PENDING:
+            # 冲突已按策略解决，不再重复检测
+            return self._execute_sync_operation(operation, check_conflict=False)
+        if operation.status == SyncStatus.SUCCESS:
+            return SyncResult(
+                success=True,
+                operation_id=operation.operation_id,
+                status=SyncStatus.SUCCESS,
+                message="远程配置优先，无需同步"
+            )
+        return result
+        
+    def _execute_sync_operation(self, operation: SyncOperation, check_conflict: bool = True) -> SyncResult:
+        """
+        执行同步操作（冲突检测、写入），只更新内存中的操作状态
+        
+        已知该文件上次同步后的提交ID时，以该提交ID为条件直接写入（一次请求，不下载远程文件）；
+        GitLab拒绝写入说明文件在此之后被其他途径修改，此时才下载远程文件检测冲突。
+        写入成功即以返回的提交ID和本地计算的blob SHA作为结果，不再重新下载校验。
+        """
         operation_id = operation.operation_id
         
         try:
             # 更新操作状态为进行中
             with self.sync_lock:
                 operation.status = SyncStatus.IN_PROGRESS
-                
-            # 冲突检测
-            has_conflict, conflict_details = self.detect_conflict(operation)
             
-            if has_conflict:
-                with self.sync_lock:
-                    operation.status = SyncStatus.CONFLICT
-                    operation.conflict_details = conflict_details
-                    
-                return SyncResult(
-                    success=False,
-                    operation_id=operation_id,
-                    status=SyncStatus.CONFLICT,
-                    message="检测到配置冲突，需要手动解决",
-                    details=conflict_details
-                )
-                
-            # 执行GitLab文件上传
-            commit_message = f"更新配置: {operation.task_name} ({operation.operation_id})"
-            result = self.gitlab_client.upload_file(
-                project_id=operation.project_id,
-                file_path=operation.file_path,
-                content=operation.content,
-                branch=operation.branch,
-                commit_message=commit_message
-            )
+            commit_message = operation.commit_message or f"更新配置: {operation.task_name} ({operation.operation_id})"
+            written = None
             
-            # 验证上传结果
-            if result:
-                # 再次验证远程文件内容
+            known = self.get_known_version(operation) if check_conflict else None
+            if known:
+                if known['blob_id'] == git_blob_sha(operation.content):
+                    # 内容与上次同步的相同，只需确认远程文件未被修改（HEAD请求，不下载内容）
+                    if self.gitlab_client.get_file_blob_id(operation.project_id, operation.file_path,
+                                                           operation.branch) == known['blob_id']:
+                        written = dict(known, skipped=True)
+                else:
+                    try:
+                        written = self.gitlab_client.write_file(
+                            operation.project_id, operation.file_path, operation.content,
+                            branch=operation.branch,
+                            commit_message=commit_message,
+                            action="update",
+                            last_commit_id=known['commit_id']
+                        )
+                    except RemoteFileChangedError as e:
+                        print(f"{str(e)}，重新检测冲突")
+            
+            if written is None:
+                # 没有已知版本或远程文件已被修改：下载远程文件检测冲突，再以其提交ID为条件写入
                 remote_info = self.get_remote_file_info(operation.project_id, operation.file_path, operation.branch)
-                if remote_info and remote_info['content_hash'] == operation.content_hash:
+                has_conflict, conflict_details = (self._compare_with_remote(operation, remote_info)
+                                                  if check_conflict else (False, None))
+                
+                if has_conflict:
                     with self.sync_lock:
-                        operation.status = SyncStatus.SUCCESS
+                        operation.status = SyncStatus.CONFLICT
+                        operation.conflict_details = conflict_details
                         
-                    # 记录同步成功到数据库
-                    self.record_sync_success(operation)
-                    
                     return SyncResult(
-                        success=True,
+                        success=False,
                         operation_id=operation_id,
-                        status=SyncStatus.SUCCESS,
-                        message="同步成功",
-                        details={'commit_id': result.get('id')}
+                        status=SyncStatus.CONFLICT,
+                        message="检测到配置冲突，需要手动解决",
+                        details=conflict_details
                     )
+                
+                if remote_info and remote_info['content_hash'] == operation.content_hash:
+                    written = {'commit_id': remote_info.get('last_commit_id'),
+                               'blob_id': remote_info.get('blob_id'), 'skipped': True}
                 else:
-                    raise Exception("上传后验证失败，远程内容与本地不匹配")
-            else:
-                raise Exception("GitLab文件上传失败")
+                    written = self.gitlab_client.write_file(
+                        operation.project_id, operation.file_path, operation.content,
+                        branch=operation.branch,
+                        commit_message=commit_message,
+                        action="update" if remote_info else "create",
+                        last_commit_id=remote_info.get('last_commit_id') if remote_info else None
+                    )
+            
+            if not written.get('commit_id'):
+                raise Exception("GitLab未返回提交ID，写入结果无法确认")
+            
+            with self.sync_lock:
+                operation.status = SyncStatus.SUCCESS
+                operation.error_message = None
+                operation.result = {
+                    'commit_id': written['commit_id'],
+                    'blob_id': written['blob_id'],
+                    'skipped': written.get('skipped', False)
+                }
+                if operation.folded_operation_ids:
+                    operation.result['folded_operation_ids'] = operation.folded_operation_ids
+                
+            # 记录同步成功到数据库
+            self.record_sync_success(operation)
+            
+            return SyncResult(
+                success=True,
+                operation_id=operation_id,
+                status=SyncStatus.SUCCESS,
+                message="同步成功",
+                details=operation.result
+            )
+                
+        except CircuitOpenError as e:
+            # 请求未发送，由调用方放回队列等熔断恢复后再执行
+            with self.sync_lock:
+                operation.status = SyncStatus.RETRY
+                operation.error_message = str(e)
                 
+            return SyncResult(
+                success=False,
+                operation_id=operation_id,
+                status=SyncStatus.RETRY,
+                message=str(e),
+                details={'retry_in': e.retry_in}
+            )
         except Exception as e:
             error_message = f"同步操作失败: {str(e)}"
             with self.sync_lock:
@@ -347,37 +618,25 @@ class GitLabSyncManager:
         return self.atomic_sync_operation(operation)
         
     def batch_sync_operations(self, operations: List[SyncOperation]) -> List[SyncResult]:
-        """批量同步操作"""
+        """批量同步操作，通过异步GitLab客户端并发执行，并发数受GITLAB_ASYNC_CONFIG['max_concurrency']限制"""
         results = []
         
-        # 使用线程池并发执行同步操作
-        with ThreadPoolExecutor(max_workers=self.batch_size) as executor:
-            # 提交所有同步任务
-            future_to_operation = {}
-            for operation in operations:
-                future = executor.submit(self.atomic_sync_operation, operation)
-                future_to_operation[future] = operation
-                
-            # 收集结果
-            for future in as_completed(future_to_operation):
-                operation = future_to_operation[future]
-                try:
-                    result = future.result()
-                    results.append(result)
-                    
-                    # 如果失败且可以重试，则加入重试队列
-                    if not result.success and result.status == SyncStatus.FAILED:
-                        if operation.retry_count < self.max_retry_count:
-                            print(f"操作 {operation.operation_id} 失败，将进行重试")
-                            
-                except Exception as e:
-                    error_result = SyncResult(
-                        success=False,
-                        operation_id=operation.operation_id,
-                        status=SyncStatus.FAILED,
-                        message=f"批量同步异常: {str(e)}"
-                    )
-                    results.append(error_result)
+        outcomes = gitlab_sync_facade.map_concurrent(self.atomic_sync_operation, operations)
+        for operation, outcome in zip(operations, outcomes):
+            if isinstance(outcome, Exception):
+                results.append(SyncResult(
+                    success=False,
+                    operation_id=operation.operation_id,
+                    status=SyncStatus.FAILED,
+                    message=f"批量同步异常: {str(outcome)}"
+                ))
+                continue
+            
+            results.append(outcome)
+            # 如果失败且可以重试，则加入重试队列
+            if not outcome.success and outcome.status == SyncStatus.FAILED:
+                if operation.retry_count < self.max_retry_count:
+                    print(f"操作 {operation.operation_id} 失败，将进行重试")
                     
         # 处理重试
         retry_operations = [op for op in operations if op.status == SyncStatus.FAILED and op.retry_count < self.max_retry_count]
@@ -423,12 +682,23 @@ class GitLabSyncManager:
             print(f"记录同步历史失败: {str(e)}")
             
     def get_sync_status(self, operation_id: str) -> Optional[SyncResult]:
-        """获取同步状态"""
-        with self.sync_lock:
-            operation = self.sync_operations.get(operation_id)
+        """获取同步状态，已合并的操作返回其合并到的操作的状态"""
+        operation = self.get_operation(operation_id)
             
         if not operation:
             return None
+        
+        if operation.status == SyncStatus.COALESCED and operation.coalesced_into:
+            target = self.get_sync_status(operation.coalesced_into)
+            if target:
+                target.details['coalesced_into'] = operation.coalesced_into
+                return SyncResult(
+                    success=target.success,
+                    operation_id=operation_id,
+                    status=target.status,
+                    message=f"已合并到同步操作 {operation.coalesced_into}，{target.message}",
+                    details=target.details
+                )
             
         return SyncResult(
             success=operation.status == SyncStatus.SUCCESS,
@@ -438,14 +708,21 @@ class GitLabSyncManager:
             details={
                 'retry_count': operation.retry_count,
                 'timestamp': operation.timestamp.isoformat(),
-                'conflict_details': operation.conflict_details
+                'conflict_details': operation.conflict_details,
+                'result': operation.result,
+                'folded_operation_ids': operation.folded_operation_ids or []
             }
         )
         
     def sync_task_config(self, project_id: str, branch: str, task_name: str, 
                         config_updates: Dict[str, Any], 
-                        resolution_strategy: str = "local_wins") -> SyncResult:
-        """同步任务配置（主要入口方法）"""
+                        resolution_strategy: str = "local_wins", wait: bool = True) -> SyncResult:
+        """
+        同步任务配置（主要入口方法）
+        
+        wait为False时只将操作写入队列并立即返回pending状态，由后台工作线程执行，
+        调用方通过get_sync_status查询结果
+        """
         try:
             # 构建文件路径
             file_path = f"{branch}/{task_name}/gitlab-ci.yml"
@@ -483,18 +760,18 @@ class GitLabSyncManager:
                 branch=branch,
                 task_name=task_name,
                 file_path=file_path,
-                content=yaml_content
+                content=yaml_content,
+                enqueue=not wait,
+                resolution_strategy=resolution_strategy
             )
             
-            # 执行同步
-            result = self.atomic_sync_operation(operation)
+            if not wait:
+                return self._queued_result(operation)
             
-            # 如果遇到冲突，尝试解决
-            if result.status == SyncStatus.CONFLICT:
-                operation = self.resolve_conflict(operation, resolution_strategy)
-                if operation.status == SyncStatus.PENDING:
-                    result = self.atomic_sync_operation(operation)
-                    
+            # 执行同步，遇到冲突时按策略解决
+            with self.leases.hold(operation.operation_id, operation.lease_owner):
+                result = self._execute_with_resolution(operation, resolution_strategy)
+            self._save_result(operation, result)
             return result
             
         except Exception as e:
@@ -505,8 +782,18 @@ class GitLabSyncManager:
                 message=f"同步任务配置失败: {str(e)}"
             )
             
-    def batch_sync_task_configs(self, sync_requests: List[Dict]) -> List[SyncResult]:
-        """批量同步任务配置"""
+    def _queued_result(self, operation: SyncOperation) -> SyncResult:
+        """已写入队列、等待后台执行的操作"""
+        return SyncResult(
+            success=True,
+            operation_id=operation.operation_id,
+            status=SyncStatus.PENDING,
+            message="已加入同步队列",
+            details={'queued': True, 'folded_operation_ids': operation.folded_operation_ids or []}
+        )
+        
+    def batch_sync_task_configs(self, sync_requests: List[Dict], wait: bool = True) -> List[SyncResult]:
+        """批量同步任务配置，wait为False时全部写入队列后立即返回"""
         operations = []
         
         for request in sync_requests:
@@ -541,7 +828,8 @@ class GitLabSyncManager:
                     branch=branch,
                     task_name=task_name,
                     file_path=file_path,
-                    content=yaml_content
+                    content=yaml_content,
+                    enqueue=not wait
                 )
                 
                 operations.append(operation)
@@ -562,23 +850,30 @@ class GitLabSyncManager:
                 )
                 operations.append(error_operation)
                 
+        if not wait:
+            return [
+                self._queued_result(operation) if operation.status == SyncStatus.PENDING else SyncResult(
+                    success=False,
+                    operation_id=operation.operation_id,
+                    status=operation.status,
+                    message=operation.error_message
+                ) for operation in operations
+            ]
+                
         # 执行批量同步
         return self.batch_sync_operations(operations)
         
     def cleanup_old_operations(self, days: int = 7):
-        """清理旧的同步操作记录"""
-        cutoff_time = datetime.now() - timedelta(days=days)
+        """清理旧的同步操作记录（进程内记录另由后台线程按ttl定期清理）"""
+        expired = self.sync_operations.expire(days * 86400)
         
-        with self.sync_lock:
-            old_operations = [
-                op_id for op_id, operation in self.sync_operations.items()
-                if operation.timestamp < cutoff_time
-            ]
-            
-            for op_id in old_operations:
-                del self.sync_operations[op_id]
+        try:
+            deleted = self.queue.delete_finished(days)
+        except Exception as e:
+            deleted = 0
+            print(f"清理同步队列失败: {str(e)}")
                 
-        print(f"已清理 {len(old_operations)} 个旧的同步操作记录")
+        print(f"已清理 {expired} 个旧的同步操作记录，队列表中删除 {deleted} 条已完成操作")
 
 
 # 全局GitLab同步管理器实例
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from flask import Response, current_app
+
+
+def stream_json_response(key, rows, extra=None, row_mapper=None, chunk_size=100, trailer=None):
+    """
+    以流式方式输出 {**extra, key: [row, ...], **trailer()} 形式的JSON响应
+
+    配合db_manager.stream_query()使用时，整个响应期间内存中只保留一批记录。
+    返回响应前会先取出第一行，使查询错误在响应头发送之前抛出，调用方仍可返回500。
+
+    Args:
+        key: 记录列表在JSON中的键名
+        rows: 记录的可迭代对象
+        extra: 放在记录列表之前的其他字段
+        row_mapper: 对每条记录进行转换的函数
+        chunk_size: 每次写出的记录条数
+        trailer: 记录全部写出后调用的函数，返回放在记录列表之后的字段（如总数、下一页游标）
+
+    Returns:
+        Response: application/json流式响应
+    """
+    dumps = current_app.json.dumps
+    iterator = iter(rows)
+    try:
+        first_row = next(iterator)
+        has_rows = True
+    except StopIteration:
+        first_row = None
+        has_rows = False
+
+    def generate():
+        head = ''.join(f'{dumps(name)}: {dumps(value)}, ' for name, value in (extra or {}).items())
+        yield '{' + head + dumps(key) + ': ['
+
+        if has_rows:
+            chunk = [dumps(row_mapper(first_row) if row_mapper else first_row)]
+            separator = ''
+            try:
+                for row in iterator:
+                    chunk.append(dumps(row_mapper(row) if row_mapper else row))
+                    if len(chunk) >= chunk_size:
+                        yield separator + ', '.join(chunk)
+                        separator = ', '
+                        chunk = []
+            finally:
+                close = getattr(iterator, 'close', None)
+                if close:
+                    close()
+            if chunk:
+                yield separator + ', '.join(chunk)
+
+        tail = ''.join(f', {dumps(name)}: {dumps(value)}' for name, value in (trailer() if trailer else {}).items())
+        yield ']' + tail + '}'
+
+    response = Response(generate(), mimetype='application/json')
+    # 响应未被完整读取（如客户端断开）时也要关闭迭代器，释放数据库连接
+    close = getattr(iterator, 'close', None)
+    if close:
+        response.call_on_close(close)
+    return response
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any
+
+# 已结束、不再需要文件内容的状态（冲突状态保留内容，解决冲突时还要使用）
+_CONTENT_RELEASED_STATUSES = ('success', 'failed', 'coalesced')
+
+
+class OperationRecord:
+    """同步操作在进程内的精简记录，操作结束后不再保留文件内容"""
+
+    __slots__ = ('operation_id', 'project_id', 'branch', 'task_name', 'file_path', 'content',
+                 'content_hash', 'timestamp', 'status', 'retry_count', 'error_message',
+                 'conflict_details', 'lease_owner', 'result', 'commit_message', 'resolution_strategy',
+                 'coalesced_into', 'folded_operation_ids', 'touched_at')
+
+    FIELDS = __slots__[:-1]
+
+    def __init__(self, operation):
+        self.update(operation)
+
+    def update(self, operation):
+        for field in self.FIELDS:
+            setattr(self, field, getattr(operation, field))
+        self.status = operation.status.value
+        if self.status in _CONTENT_RELEASED_STATUSES:
+            self.content = None
+        self.touched_at = time.monotonic()
+
+
+class OperationRegistry:
+    """
+    进程内的同步操作注册表
+
+    同步操作的状态以gitlab_sync_operations表为准，这里只保存本进程最近使用的操作，
+    供数据库不可用时查询。记录按最近使用顺序保存：
+    - 超过max_entries时淘汰最久未使用的记录
+    - 超过ttl秒未使用的记录由后台线程每sweep_interval秒清理一次，
+      从最久未使用的一端开始，遇到未过期的记录即停止，不遍历全部记录
+    """
+
+    def __init__(self, max_entries=1000, ttl=3600, sweep_interval=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._records: 'OrderedDict[str, OperationRecord]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._evicted = 0
+        self._expired = 0
+        self._sweeper = None
+        self._stop_event = threading.Event()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._records)
+
+    def __contains__(self, operation_id):
+        with self._lock:
+            return operation_id in self._records
+
+    def put(self, operation):
+        """保存或更新操作（SyncOperation），已结束的操作只保留状态不保留内容"""
+        with self._lock:
+            record = self._records.get(operation.operation_id)
+            if record is None:
+                self._records[operation.operation_id] = OperationRecord(operation)
+                while len(self._records) > self.max_entries:
+                    self._records.popitem(last=False)
+                    self._evicted += 1
+            else:
+                record.update(operation)
+                self._records.move_to_end(operation.operation_id)
+        self._ensure_sweeper()
+
+    def get(self, operation_id, factory):
+        """
+        获取操作
+
+        Args:
+            factory: 以记录的字段（dict）构造操作对象的函数，如SyncOperation(**fields)
+
+        Returns:
+            操作对象，没有记录时返回None；内容已释放的操作content为空字符串
+        """
+        with self._lock:
+            record = self._records.get(operation_id)
+            if record is None:
+                return None
+            record.touched_at = time.monotonic()
+            self._records.move_to_end(operation_id)
+            fields = {field: getattr(record, field) for field in OperationRecord.FIELDS}
+        if fields['content'] is None:
+            fields['content'] = ''
+        return factory(fields)
+
+    def mark_coalesced(self, operation_id, coalesced_into):
+        """将操作标记为已合并到coalesced_into，并释放其内容"""
+        with self._lock:
+            record = self._records.get(operation_id)
+            if record is not None:
+                record.status = 'coalesced'
+                record.coalesced_into = coalesced_into
+                record.content = None
+
+    def expire(self, max_age=None) -> int:
+        """删除超过max_age秒（默认ttl）未使用的记录，返回删除的条数"""
+        max_age = self.ttl if max_age is None else max_age
+        cutoff = time.monotonic() - max_age
+        removed = 0
+        with self._lock:
+            while self._records:
+                operation_id, record = next(iter(self._records.items()))
+                if record.touched_at > cutoff:
+                    break
+                del self._records[operation_id]
+                removed += 1
+            self._expired += removed
+        return removed
+
+    def _ensure_sweeper(self):
+        if self._sweeper is not None or not self.sweep_interval:
+            return
+        with self._lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._sweep, name='sync-operation-registry',
+                                                 daemon=True)
+                self._sweeper.start()
+
+    def _sweep(self):
+        while not self._stop_event.wait(self.sweep_interval):
+            try:
+                self.expire()
+            except Exception as e:
+                print(f"清理同步操作记录失败: {str(e)}")
+
+    def stop(self):
+        """停止后台清理线程"""
+        self._stop_event.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'size': len(self._records),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'evicted': self._evicted,
+                'expired': self._expired
+            }
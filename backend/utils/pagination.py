@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import base64
+import json
+from datetime import datetime
+from typing import Dict, Any
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and '$dt' in value:
+        return datetime.fromisoformat(value['$dt'])
+    return value
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """
+    将键集分页的位置编码为不透明的游标字符串
+
+    Args:
+        values: 排序键及其取值，如 {'updated_at': datetime(...), 'id': 12}
+
+    Returns:
+        str: URL安全的base64游标
+    """
+    payload = json.dumps({key: _encode_value(value) for key, value in values.items()},
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, keys) -> Dict[str, Any]:
+    """
+    解码游标字符串
+
+    Args:
+        cursor: encode_cursor生成的游标
+        keys: 游标中必须包含的排序键
+
+    Returns:
+        dict: 排序键及其取值
+
+    Raises:
+        ValueError: 游标格式无效
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        result = {key: _decode_value(values[key]) for key in keys}
+    except Exception:
+        raise ValueError(f"无效的分页游标: {cursor}")
+    return result
+
+
+def parse_limit(value, default=50, max_limit=500) -> int:
+    """解析分页大小参数，限制在1到max_limit之间"""
+    if value is None or value == '':
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"无效的limit参数: {value}")
+    return max(1, min(limit, max_limit))
+
+
+COUNT_MODES = ('exact', 'estimate', 'none')
+
+
+def parse_count_mode(value, default='none') -> str:
+    """解析总数统计方式：exact精确计数，estimate估算，none不统计"""
+    if value is None or value == '':
+        return default
+    mode = value.lower()
+    if mode not in COUNT_MODES:
+        raise ValueError(f"无效的count参数: {value}，可选值: {', '.join(COUNT_MODES)}")
+    return mode
+
+
+def estimate_row_count(db, table: str, where_clause: str = '', params=None) -> int:
+    """
+    估算满足条件的行数，避免对大表执行COUNT(*)
+
+    无过滤条件时读取pg_class.reltuples；有过滤条件或表从未ANALYZE时，
+    使用执行计划的估算行数。
+
+    Args:
+        db: 数据库管理器
+        table: 表名（由调用方给定，不能来自用户输入）
+        where_clause: 以" WHERE "开头的过滤条件，可为空
+        params: 过滤条件参数
+
+    Returns:
+        int: 估算行数
+    """
+    if not where_clause:
+        result = db.execute_query(
+            "SELECT reltuples::bigint AS estimate FROM pg_class WHERE oid = %s::regclass",
+            params=(table,),
+            fetch_one=True
+        )
+        # 从未ANALYZE的表reltuples为-1（PostgreSQL 14+）或0
+        if result and result['estimate'] > 0:
+            return int(result['estimate'])
+
+    plan = db.execute_query(
+        f"EXPLAIN (FORMAT JSON) SELECT 1 FROM {table}{where_clause}",
+        params=params,
+        fetch_one=True
+    )
+    return int(plan['QUERY PLAN'][0]['Plan']['Plan Rows']) if plan else 0
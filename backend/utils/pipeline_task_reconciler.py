@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+from typing import Dict, Any, List, Optional
+from backend.utils.database import db_manager
+
+INVALID_STAGE_TYPES = ('undefined', 'unknown')
+
+
+class PipelineTaskReconciler:
+    """
+    流水线任务/阶段差异同步器
+
+    将前端提交的任务JSON与pipeline_tasks、pipeline_task_stages中的现有记录比较，
+    只执行必要的INSERT/UPDATE/DELETE，内容未变化的流水线重复保存不会改动任何行。
+
+    任务以名称作为标识，阶段以(任务, 阶段类型)作为标识。
+    """
+
+    def _normalize_tasks(self, task_data) -> List[Dict[str, Any]]:
+        """解析任务JSON，得到期望的任务和阶段状态"""
+        if not task_data:
+            return []
+
+        tasks = json.loads(task_data) if isinstance(task_data, str) else task_data
+        if not isinstance(tasks, list):
+            return []
+
+        desired = []
+        seen_names = set()
+        for index, task in enumerate(tasks):
+            task_name = task.get('name')
+            if not task_name:
+                continue
+            if task_name in seen_names:
+                print(f"任务名称重复，忽略: {task_name}")
+                continue
+            seen_names.add(task_name)
+
+            stages = {}
+            for stage_index, stage in enumerate(task.get('stages', [])):
+                stage_type = stage.get('type')
+                stage_name = stage.get('name')
+
+                # 过滤无效的阶段类型，同一任务下每种阶段类型只保留第一个
+                if not stage_type or stage_type in INVALID_STAGE_TYPES or not stage_name:
+                    continue
+                if stage_type in stages:
+                    print(f"任务 {task_name} 的阶段类型重复，忽略: {stage_type}")
+                    continue
+
+                stages[stage_type] = {
+                    'name': stage_name,
+                    'order_index': stage_index,
+                    'config': stage.get('config', {})
+                }
+
+            desired.append({
+                'name': task_name,
+                'type': task.get('type', 'maven'),
+                'order_index': index,
+                'stages': stages
+            })
+
+        return desired
+
+    def _load_existing(self, pipeline_id: int) -> Dict[str, Dict[str, Any]]:
+        """用一次JOIN查询加载流水线现有的任务和阶段"""
+        rows = db_manager.execute_query(
+            """SELECT t.id AS task_id, t.name AS task_name, t.type AS task_type,
+                      t.order_index AS task_order,
+                      s.id AS stage_id, s.type AS stage_type, s.name AS stage_name,
+                      s.order_index AS stage_order, s.config AS stage_config
+               FROM pipeline_tasks t
+               LEFT JOIN pipeline_task_stages s ON s.task_id = t.id
+               WHERE t.pipeline_id = %s
+               ORDER BY t.id, s.id""",
+            params=(pipeline_id,),
+            fetch_all=True
+        ) or []
+
+        existing = {}
+        duplicate_task_ids = set()
+        for row in rows:
+            task = existing.get(row['task_name'])
+            if task is None:
+                task = {
+                    'id': row['task_id'],
+                    'type': row['task_type'],
+                    'order_index': row['task_order'],
+                    'stages': {},
+                    'duplicate_stage_ids': []
+                }
+                existing[row['task_name']] = task
+            elif task['id'] != row['task_id']:
+                # 历史数据中存在同名任务，多余的记录直接删除
+                duplicate_task_ids.add(row['task_id'])
+                continue
+
+            if row['stage_id'] is None:
+                continue
+            if row['stage_type'] in task['stages']:
+                task['duplicate_stage_ids'].append(row['stage_id'])
+                continue
+
+            task['stages'][row['stage_type']] = {
+                'id': row['stage_id'],
+                'name': row['stage_name'],
+                'order_index': row['stage_order'],
+                'config': self._parse_config(row['stage_config'])
+            }
+
+        return {'tasks': existing, 'duplicate_task_ids': sorted(duplicate_task_ids)}
+
+    def _parse_config(self, config) -> Any:
+        if config is None:
+            return {}
+        if isinstance(config, str):
+            try:
+                return json.loads(config)
+            except (json.JSONDecodeError, TypeError):
+                return config
+        return config
+
+    def reconcile(self, pipeline_id: int, task_data) -> Dict[str, Any]:
+        """
+        将流水线的任务和阶段同步为task_data描述的状态
+
+        应在db_manager.transaction()中调用，使所有写入在同一个事务中完成
+
+        Args:
+            pipeline_id: 流水线ID
+            task_data: 任务数据（JSON字符串或列表），为空时删除流水线下的所有任务
+
+        Returns:
+            dict: 变更报告
+        """
+        desired_tasks = self._normalize_tasks(task_data)
+        loaded = self._load_existing(pipeline_id)
+        existing_tasks = loaded['tasks']
+
+        report = {
+            'tasks': {'inserted': [], 'updated': [], 'deleted': [], 'unchanged': 0},
+            'stages': {'inserted': [], 'updated': [], 'deleted': [], 'unchanged': 0}
+        }
+
+        task_delete_ids = list(loaded['duplicate_task_ids'])
+        task_update_rows = []
+        new_tasks = []
+        stage_delete_ids = []
+        stage_update_rows = []
+        stage_insert_rows = []
+
+        desired_names = {task['name'] for task in desired_tasks}
+        for task_name, task in existing_tasks.items():
+            if task_name not in desired_names:
+                task_delete_ids.append(task['id'])
+                report['tasks']['deleted'].append(task_name)
+
+        for task in desired_tasks:
+            current = existing_tasks.get(task['name'])
+            if current is None:
+                new_tasks.append(task)
+                report['tasks']['inserted'].append(task['name'])
+                continue
+
+            if current['type'] != task['type'] or current['order_index'] != task['order_index']:
+                task_update_rows.append((current['id'], task['type'], task['order_index']))
+                report['tasks']['updated'].append(task['name'])
+            else:
+                report['tasks']['unchanged'] += 1
+
+            stage_delete_ids.extend(current['duplicate_stage_ids'])
+            for stage_type, stage in current['stages'].items():
+                if stage_type not in task['stages']:
+                    stage_delete_ids.append(stage['id'])
+                    report['stages']['deleted'].append(f"{task['name']}/{stage_type}")
+
+            for stage_type, stage in task['stages'].items():
+                stage_key = f"{task['name']}/{stage_type}"
+                current_stage = current['stages'].get(stage_type)
+                if current_stage is None:
+                    stage_insert_rows.append((current['id'], stage_type, stage['name'],
+                                              stage['order_index'], json.dumps(stage['config'])))
+                    report['stages']['inserted'].append(stage_key)
+                elif (current_stage['name'] != stage['name']
+                      or current_stage['order_index'] != stage['order_index']
+                      or current_stage['config'] != stage['config']):
+                    stage_update_rows.append((current_stage['id'], stage['name'],
+                                              stage['order_index'], json.dumps(stage['config'])))
+                    report['stages']['updated'].append(stage_key)
+                else:
+                    report['stages']['unchanged'] += 1
+
+        # 删除：任务删除会级联删除其阶段
+        if task_delete_ids:
+            db_manager.execute_delete(
+                "DELETE FROM pipeline_tasks WHERE id = ANY(%s)",
+                params=(task_delete_ids,)
+            )
+        if stage_delete_ids:
+            db_manager.execute_delete(
+                "DELETE FROM pipeline_task_stages WHERE id = ANY(%s)",
+                params=(stage_delete_ids,)
+            )
+
+        # 更新
+        db_manager.execute_bulk_update(
+            """UPDATE pipeline_tasks AS t
+               SET type = v.type, order_index = v.order_index
+               FROM (VALUES %s) AS v(id, type, order_index)
+               WHERE t.id = v.id""",
+            task_update_rows
+        )
+        db_manager.execute_bulk_update(
+            """UPDATE pipeline_task_stages AS s
+               SET name = v.name, order_index = v.order_index, config = v.config::jsonb
+               FROM (VALUES %s) AS v(id, name, order_index, config)
+               WHERE s.id = v.id""",
+            stage_update_rows
+        )
+
+        # 插入：新任务一条语句，所有新阶段一条语句
+        if new_tasks:
+            task_records = db_manager.execute_bulk_insert(
+                """INSERT INTO pipeline_tasks (pipeline_id, name, type, order_index)
+                   VALUES %s RETURNING id, name, order_index""",
+                [(pipeline_id, task['name'], task['type'], task['order_index']) for task in new_tasks],
+                returning=True
+            )
+            task_ids = {record['name']: record['id'] for record in task_records}
+
+            for task in new_tasks:
+                for stage_type, stage in task['stages'].items():
+                    stage_insert_rows.append((task_ids[task['name']], stage_type, stage['name'],
+                                              stage['order_index'], json.dumps(stage['config'])))
+                    report['stages']['inserted'].append(f"{task['name']}/{stage_type}")
+
+        db_manager.execute_bulk_insert(
+            """INSERT INTO pipeline_task_stages (task_id, type, name, order_index, config)
+               VALUES %s""",
+            stage_insert_rows
+        )
+
+        report['changed'] = any(
+            report[kind][action]
+            for kind in ('tasks', 'stages')
+            for action in ('inserted', 'updated', 'deleted')
+        ) or bool(task_delete_ids) or bool(stage_delete_ids)
+        return report
+
+
+# 全局任务差异同步器实例
+pipeline_task_reconciler = PipelineTaskReconciler()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import re
+import hashlib
+import threading
+from bisect import bisect_left
+from typing import Dict, Any, Optional, List
+
+# 默认直方图桶上界（毫秒）
+DEFAULT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# 超出max_fingerprints后新语句统一归入该指纹
+OVERFLOW_FINGERPRINT = '<other>'
+
+_COMMENT_RE = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'(?<![\w$.])\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%\(\w+\)s|%s|\$\d+')
+_IN_LIST_RE = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.I)
+_VALUES_LIST_RE = re.compile(r'\bVALUES\s*(\([^()]*\))(?:\s*,\s*\([^()]*\))*', re.I)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint_query(query) -> str:
+    """
+    将SQL语句归一化为指纹，参数和字面量不同但结构相同的语句得到相同指纹
+
+    - 去掉注释，折叠空白
+    - 字符串、数字字面量和%s/$n占位符统一替换为?
+    - IN (?, ?, ...) 折叠为 IN (?)，多行VALUES只保留第一行
+    """
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', errors='replace')
+    text = _COMMENT_RE.sub(' ', str(query))
+    text = _STRING_RE.sub('?', text)
+    text = _PLACEHOLDER_RE.sub('?', text)
+    text = _NUMBER_RE.sub('?', text)
+    text = _WHITESPACE_RE.sub(' ', text).strip()
+    text = _IN_LIST_RE.sub('IN (?)', text)
+    text = _VALUES_LIST_RE.sub(lambda m: 'VALUES ' + m.group(1), text)
+    return text.rstrip(';').strip()
+
+
+def fingerprint_id(fingerprint: str) -> str:
+    """指纹的短标识，用作监控标签"""
+    return hashlib.md5(fingerprint.encode('utf-8')).hexdigest()[:12]
+
+
+class _Histogram:
+    """固定桶直方图，bucket_counts[i]为落在第i个桶（非累计）的次数，最后一个为+Inf"""
+
+    __slots__ = ('bounds', 'bucket_counts', 'count', 'total', 'max')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.bucket_counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.bucket_counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """根据桶上界估算分位数"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.bucket_counts):
+            seen += bucket_count
+            if seen >= target:
+                return float(self.bounds[index]) if index < len(self.bounds) else self.max
+        return self.max
+
+    def cumulative(self):
+        counts = []
+        running = 0
+        for bucket_count in self.bucket_counts:
+            running += bucket_count
+            counts.append(running)
+        return counts
+
+
+class _StatementStats:
+    """单个指纹的统计"""
+
+    __slots__ = ('fingerprint', 'sample', 'calls', 'errors', 'rows', 'duration', 'acquire')
+
+    def __init__(self, fingerprint, sample, bounds):
+        self.fingerprint = fingerprint
+        self.sample = sample
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.duration = _Histogram(bounds)
+        self.acquire = _Histogram(bounds)
+
+
+class QueryMetrics:
+    """
+    SQL执行统计
+
+    按语句指纹聚合执行次数、错误数、返回/影响行数、执行耗时和获取连接耗时直方图，
+    执行时间超过slow_query_ms的语句打印慢查询日志。统计数据保存在进程内存中，
+    可通过snapshot()以JSON形式读取，或通过to_prometheus()以Prometheus文本格式抓取。
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.enabled = config.get('enabled', True)
+        self.slow_query_ms = config.get('slow_query_ms', 500)
+        self.max_fingerprints = config.get('max_fingerprints', 500)
+        self.log_params = config.get('log_params', False)
+        self.buckets_ms = tuple(sorted(config.get('buckets_ms') or DEFAULT_BUCKETS_MS))
+
+        self._lock = threading.Lock()
+        self._statements: Dict[str, _StatementStats] = {}
+        # 指纹计算结果缓存，同一条SQL文本只做一次正则归一化
+        self._fingerprint_cache: Dict[str, str] = {}
+        self._slow_queries = 0
+
+    def _fingerprint(self, query) -> str:
+        key = query if isinstance(query, str) else str(query)
+        fingerprint = self._fingerprint_cache.get(key)
+        if fingerprint is None:
+            fingerprint = fingerprint_query(query)
+            if len(self._fingerprint_cache) < self.max_fingerprints * 4:
+                self._fingerprint_cache[key] = fingerprint
+        return fingerprint
+
+    def record(self, query, duration_ms: float, acquire_ms: float = 0.0,
+               rows: Optional[int] = None, error: Optional[BaseException] = None, params=None):
+        """
+        记录一次语句执行
+
+        Args:
+            query: SQL语句
+            duration_ms: 语句执行耗时（毫秒，不含获取连接）
+            acquire_ms: 获取连接耗时（毫秒）
+            rows: 返回或影响的行数，未知时为None
+            error: 执行失败时的异常
+            params: 语句参数，仅在log_params开启时写入慢查询日志
+        """
+        if not self.enabled:
+            return
+
+        fingerprint = self._fingerprint(query)
+        with self._lock:
+            stats = self._statements.get(fingerprint)
+            if stats is None:
+                if len(self._statements) >= self.max_fingerprints:
+                    fingerprint = OVERFLOW_FINGERPRINT
+                    stats = self._statements.get(fingerprint)
+                if stats is None:
+                    stats = _StatementStats(fingerprint, ' '.join(str(query).split())[:1000],
+                                            self.buckets_ms)
+                    self._statements[fingerprint] = stats
+
+            stats.calls += 1
+            if error is not None:
+                stats.errors += 1
+            if rows is not None and rows > 0:
+                stats.rows += rows
+            stats.duration.observe(duration_ms)
+            stats.acquire.observe(acquire_ms)
+
+            slow = self.slow_query_ms is not None and duration_ms >= self.slow_query_ms
+            if slow:
+                self._slow_queries += 1
+
+        if slow:
+            message = (f"慢查询 [{fingerprint_id(fingerprint)}] 耗时 {duration_ms:.1f}ms，"
+                       f"获取连接 {acquire_ms:.1f}ms，行数 {rows if rows is not None else '-'}: "
+                       f"{fingerprint[:500]}")
+            if self.log_params and params is not None:
+                message += f" 参数: {str(params)[:500]}"
+            if error is not None:
+                message += f" 错误: {error}"
+            print(message)
+
+    def _format_stats(self, stats: _StatementStats) -> Dict[str, Any]:
+        duration = stats.duration
+        return {
+            'id': fingerprint_id(stats.fingerprint),
+            'fingerprint': stats.fingerprint,
+            'sample': stats.sample,
+            'calls': stats.calls,
+            'errors': stats.errors,
+            'rows': stats.rows,
+            'total_ms': round(duration.total, 3),
+            'mean_ms': round(duration.total / duration.count, 3) if duration.count else 0.0,
+            'max_ms': round(duration.max, 3),
+            'p50_ms': duration.quantile(0.5),
+            'p95_ms': duration.quantile(0.95),
+            'p99_ms': duration.quantile(0.99),
+            'acquire_total_ms': round(stats.acquire.total, 3),
+            'acquire_max_ms': round(stats.acquire.max, 3),
+            'buckets': dict(zip([str(bound) for bound in self.buckets_ms] + ['+Inf'],
+                                duration.cumulative()))
+        }
+
+    def snapshot(self, top: Optional[int] = None, sort_by: str = 'total_ms') -> Dict[str, Any]:
+        """
+        获取统计快照
+
+        Args:
+            top: 只返回排序后的前N条语句
+            sort_by: 排序字段（total_ms/calls/mean_ms/max_ms/p95_ms/errors/rows）
+        """
+        with self._lock:
+            statements = [self._format_stats(stats) for stats in self._statements.values()]
+            slow_queries = self._slow_queries
+
+        if statements and sort_by not in statements[0]:
+            raise ValueError(f"无效的排序字段: {sort_by}")
+        statements.sort(key=lambda item: item.get(sort_by, 0), reverse=True)
+        if top:
+            statements = statements[:top]
+
+        return {
+            'enabled': self.enabled,
+            'slow_query_ms': self.slow_query_ms,
+            'slow_queries': slow_queries,
+            'fingerprints': len(self._statements),
+            'statements': statements
+        }
+
+    def to_prometheus(self) -> str:
+        """以Prometheus文本格式输出各指纹的耗时直方图和计数"""
+        lines: List[str] = [
+            '# HELP devops_db_query_duration_ms SQL statement execution time in milliseconds',
+            '# TYPE devops_db_query_duration_ms histogram'
+        ]
+        errors: List[str] = []
+        rows: List[str] = []
+        acquire: List[str] = []
+
+        with self._lock:
+            statements = list(self._statements.values())
+            for stats in statements:
+                label = f'fingerprint="{fingerprint_id(stats.fingerprint)}"'
+                for bound, count in zip([str(bound) for bound in self.buckets_ms] + ['+Inf'],
+                                        stats.duration.cumulative()):
+                    lines.append(f'devops_db_query_duration_ms_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'devops_db_query_duration_ms_sum{{{label}}} {stats.duration.total:.3f}')
+                lines.append(f'devops_db_query_duration_ms_count{{{label}}} {stats.duration.count}')
+                errors.append(f'devops_db_query_errors_total{{{label}}} {stats.errors}')
+                rows.append(f'devops_db_query_rows_total{{{label}}} {stats.rows}')
+                acquire.append(f'devops_db_connection_acquire_ms_total{{{label}}} {stats.acquire.total:.3f}')
+            slow_queries = self._slow_queries
+
+        lines.append('# TYPE devops_db_query_errors_total counter')
+        lines.extend(errors)
+        lines.append('# TYPE devops_db_query_rows_total counter')
+        lines.extend(rows)
+        lines.append('# TYPE devops_db_connection_acquire_ms_total counter')
+        lines.extend(acquire)
+        lines.append('# TYPE devops_db_slow_queries_total counter')
+        lines.append(f'devops_db_slow_queries_total {slow_queries}')
+        # 指纹文本作为info指标单独输出，避免在每个样本上携带长标签
+        lines.append('# TYPE devops_db_query_info gauge')
+        for stats in statements:
+            text = stats.fingerprint[:200].replace('\\', '\\\\').replace('"', '\\"')
+            lines.append(f'devops_db_query_info{{fingerprint="{fingerprint_id(stats.fingerprint)}",'
+                         f'query="{text}"}} 1')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """清空统计数据"""
+        with self._lock:
+            self._statements.clear()
+            self._slow_queries = 0
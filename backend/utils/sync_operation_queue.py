@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+# 可被工作线程领取的状态
+CLAIMABLE_STATUSES = ('pending', 'retry')
+# 已结束的状态（coalesced: 已合并到同一文件更新的操作中，不单独执行）
+FINISHED_STATUSES = ('success', 'failed', 'conflict', 'coalesced')
+
+
+def default_worker_id() -> str:
+    """当前进程的租约持有者标识: 主机名:进程号"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class SyncOperationQueue:
+    """
+    GitLab同步操作队列（gitlab_sync_operations表）
+
+    同步操作写入数据库后，任意进程都可以查询其状态，进程重启也不会丢失。
+    工作进程通过 SELECT ... FOR UPDATE SKIP LOCKED 领取待处理的操作并持有租约，
+    多个进程/节点同时领取时互不阻塞、不会重复领取；持有者崩溃导致租约过期后，
+    操作会被其他工作进程重新领取。
+    """
+
+    COLUMNS = """operation_id, project_id, branch, task_name, file_path, content, content_hash,
+                 commit_message, resolution_strategy, status, retry_count, attempts,
+                 error_message, conflict_details, result, coalesced_into, folded_operation_ids,
+                 available_at, lease_owner, lease_expires_at, created_at, updated_at, completed_at"""
+
+    def __init__(self, db, lease_seconds=120):
+        self.db = db
+        self.lease_seconds = lease_seconds
+
+    def enqueue(self, operation: Dict[str, Any], owner: Optional[str] = None,
+                delay_seconds: float = 0) -> Dict[str, Any]:
+        """
+        写入同步操作
+
+        Args:
+            operation: 包含operation_id、project_id、branch、task_name、file_path、content、
+                       content_hash、created_at的字典，可选commit_message、resolution_strategy、
+                       folded_operation_ids
+            owner: 指定时操作直接由owner持有租约（调用方立即执行），否则进入待处理状态等待领取
+            delay_seconds: 延迟多少秒后才能被领取
+        """
+        status = 'in_progress' if owner else 'pending'
+        return self.db.execute_insert(f"""
+            INSERT INTO gitlab_sync_operations
+                (operation_id, project_id, branch, task_name, file_path, content, content_hash,
+                 commit_message, resolution_strategy, folded_operation_ids,
+                 status, attempts, available_at, lease_owner, lease_expires_at, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
+                    CURRENT_TIMESTAMP + make_interval(secs => %s),
+                    %s, CASE WHEN %s IS NULL THEN NULL
+                             ELSE CURRENT_TIMESTAMP + make_interval(secs => %s) END,
+                    %s)
+            RETURNING {self.COLUMNS}
+        """, params=(
+            operation['operation_id'], operation['project_id'], operation['branch'],
+            operation['task_name'], operation['file_path'], operation['content'],
+            operation['content_hash'], operation.get('commit_message'),
+            operation.get('resolution_strategy'),
+            json.dumps(operation['folded_operation_ids']) if operation.get('folded_operation_ids') else None,
+            status, 1 if owner else 0, delay_seconds,
+            owner, owner, self.lease_seconds, operation['created_at']
+        ))
+
+    def enqueue_coalesced(self, operation: Dict[str, Any], window: float,
+                          max_delay: float) -> Dict[str, Any]:
+        """
+        写入待处理操作，并合并同一(project_id, branch, file_path)尚未领取的操作
+
+        每个操作都携带文件的完整内容，只需上传最新的一份：尚未领取的旧操作标记为coalesced
+        并指向新操作（coalesced_into），新操作的folded_operation_ids记录被合并的操作ID。
+        新操作延迟window秒后才能被领取，窗口内的后续修改继续合并；
+        从最早被合并的操作入队起最多延迟max_delay秒，避免持续修改时一直不上传。
+
+        Returns:
+            dict: 新操作的记录，folded_operation_ids为被合并的操作ID（按入队顺序）
+        """
+        key = f"{operation['project_id']}:{operation['branch']}:{operation['file_path']}"
+        with self.db.transaction():
+            # 同一文件的入队依次进行，保证任意时刻最多只有一个待处理操作
+            self.db.execute_query("SELECT pg_advisory_xact_lock(hashtext(%s))", params=(key,), fetch_one=True)
+            folded = self.db.execute_query("""
+                UPDATE gitlab_sync_operations
+                SET status = 'coalesced',
+                    coalesced_into = %s,
+                    content = NULL,
+                    completed_at = CURRENT_TIMESTAMP
+                WHERE project_id = %s AND branch = %s AND file_path = %s
+                  AND status IN %s
+                RETURNING operation_id, folded_operation_ids, created_at
+            """, params=(
+                operation['operation_id'], operation['project_id'], operation['branch'],
+                operation['file_path'], CLAIMABLE_STATUSES
+            ), fetch_all=True) or []
+
+            delay = window
+            folded_ids = []
+            if folded:
+                folded.sort(key=lambda row: row['created_at'])
+                for row in folded:
+                    folded_ids.extend(row['folded_operation_ids'] or [])
+                    folded_ids.append(row['operation_id'])
+                # 更早合并到这些操作中的操作改为指向新操作
+                self.db.execute_update("""
+                    UPDATE gitlab_sync_operations SET coalesced_into = %s
+                    WHERE coalesced_into IN %s
+                """, params=(operation['operation_id'], tuple(row['operation_id'] for row in folded)))
+                waited = (operation['created_at'] - folded[0]['created_at']).total_seconds()
+                delay = max(0.0, min(window, max_delay - waited))
+
+            return self.enqueue(dict(operation, folded_operation_ids=folded_ids), delay_seconds=delay)
+
+    def get(self, operation_id) -> Optional[Dict[str, Any]]:
+        return self.db.execute_query(
+            f"SELECT {self.COLUMNS} FROM gitlab_sync_operations WHERE operation_id = %s",
+            params=(operation_id,),
+            fetch_one=True
+        )
+
+    def last_synced_version(self, project_id, branch, file_path) -> Optional[Dict[str, Any]]:
+        """
+        该文件最近一次同步成功后的版本
+
+        Returns:
+            dict: {'commit_id', 'blob_id'}，没有记录时返回None
+        """
+        row = self.db.execute_query("""
+            SELECT result->>'commit_id' AS commit_id, result->>'blob_id' AS blob_id
+            FROM gitlab_sync_operations
+            WHERE project_id = %s AND branch = %s AND file_path = %s
+              AND status = 'success' AND result->>'blob_id' IS NOT NULL
+            ORDER BY completed_at DESC
+            LIMIT 1
+        """, params=(project_id, branch, file_path), fetch_one=True)
+        return dict(row) if row else None
+
+    def claim(self, owner: str, limit: int = 1) -> List[Dict[str, Any]]:
+        """
+        领取可执行的操作并持有租约
+
+        可领取的操作包括已到执行时间的pending/retry操作，以及租约已过期的in_progress操作。
+        同一文件正在被其他工作线程同步时跳过该文件的新操作，避免旧内容晚于新内容写入。
+        """
+        return self.db.execute_query(f"""
+            WITH next_operations AS (
+                SELECT id FROM gitlab_sync_operations p
+                WHERE ((status IN %s AND available_at <= CURRENT_TIMESTAMP)
+                       OR (status = 'in_progress' AND lease_expires_at < CURRENT_TIMESTAMP))
+                  AND NOT EXISTS (
+                      SELECT 1 FROM gitlab_sync_operations busy
+                      WHERE busy.project_id = p.project_id
+                        AND busy.branch = p.branch
+                        AND busy.file_path = p.file_path
+                        AND busy.status = 'in_progress'
+                        AND busy.lease_expires_at >= CURRENT_TIMESTAMP
+                        AND busy.id <> p.id
+                  )
+                ORDER BY available_at, id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE gitlab_sync_operations o
+            SET status = 'in_progress',
+                lease_owner = %s,
+                lease_expires_at = CURRENT_TIMESTAMP + make_interval(secs => %s),
+                attempts = o.attempts + 1
+            FROM next_operations
+            WHERE o.id = next_operations.id
+            RETURNING {', '.join('o.' + column.strip() for column in self.COLUMNS.split(','))}
+        """, params=(CLAIMABLE_STATUSES, limit, owner, self.lease_seconds), fetch_all=True) or []
+
+    def renew_lease(self, operation_id, owner: str) -> bool:
+        """延长租约，租约已被他人领取时返回False"""
+        return self.db.execute_update("""
+            UPDATE gitlab_sync_operations
+            SET lease_expires_at = CURRENT_TIMESTAMP + make_interval(secs => %s)
+            WHERE operation_id = %s AND status = 'in_progress' AND lease_owner = %s
+        """, params=(self.lease_seconds, operation_id, owner)) > 0
+
+    def finish(self, operation: Dict[str, Any], owner: Optional[str]) -> bool:
+        """
+        保存操作的执行结果并释放租约
+
+        Args:
+            operation: 包含operation_id、status、content、content_hash、retry_count、
+                       error_message、conflict_details、result的字典
+            owner: 调用方持有的租约；租约已过期并被他人重新领取时不覆盖其状态。
+                   为None时只能保存未被任何人持有的操作（如手动解决冲突）
+
+        Returns:
+            bool: 是否保存成功
+        """
+        finished = operation['status'] in FINISHED_STATUSES
+        return self.db.execute_update("""
+            UPDATE gitlab_sync_operations
+            SET status = %s,
+                content = %s,
+                content_hash = %s,
+                retry_count = %s,
+                error_message = %s,
+                conflict_details = %s,
+                result = %s,
+                lease_owner = NULL,
+                lease_expires_at = NULL,
+                completed_at = CASE WHEN %s THEN CURRENT_TIMESTAMP ELSE NULL END
+            WHERE operation_id = %s
+              AND lease_owner IS NOT DISTINCT FROM %s
+        """, params=(
+            operation['status'], operation['content'], operation['content_hash'],
+            operation['retry_count'], operation.get('error_message'),
+            json.dumps(operation['conflict_details']) if operation.get('conflict_details') else None,
+            json.dumps(operation['result'], default=str) if operation.get('result') else None,
+            finished, operation['operation_id'], owner
+        )) > 0
+
+    def retry_later(self, operation_id, owner: Optional[str], delay_seconds: float,
+                    error_message: Optional[str] = None, count_retry: bool = True) -> bool:
+        """
+        释放租约，delay_seconds秒后重新进入可领取状态
+
+        Args:
+            count_retry: 是否计入重试次数；请求未发送（如GitLab熔断中）时不计入
+        """
+        return self.db.execute_update("""
+            UPDATE gitlab_sync_operations
+            SET status = 'retry',
+                retry_count = retry_count + %s,
+                error_message = %s,
+                available_at = CURRENT_TIMESTAMP + make_interval(secs => %s),
+                lease_owner = NULL,
+                lease_expires_at = NULL
+            WHERE operation_id = %s
+              AND lease_owner IS NOT DISTINCT FROM %s
+        """, params=(1 if count_retry else 0, error_message, delay_seconds, operation_id, owner)) > 0
+
+    def delete_finished(self, days: int) -> int:
+        """删除完成超过days天的操作"""
+        return self.db.execute_delete("""
+            DELETE FROM gitlab_sync_operations
+            WHERE status IN %s AND completed_at < CURRENT_TIMESTAMP - make_interval(days => %s)
+        """, params=(FINISHED_STATUSES, days))
+
+    def counts(self) -> Dict[str, int]:
+        """各状态的操作数"""
+        rows = self.db.execute_query("""
+            SELECT status, COUNT(*) AS count FROM gitlab_sync_operations GROUP BY status
+        """, fetch_all=True) or []
+        return {row['status']: row['count'] for row in rows}
+
+
+class LeaseKeeper:
+    """
+    为正在执行的操作定期续租
+
+    一个操作可能包含多次GitLab请求（等待限速配额、429重试、提交的读取超时），总耗时可能超过
+    lease_seconds；执行期间由后台线程每interval秒续租一次，避免租约过期后操作被其他工作进程
+    重复领取。持有者进程崩溃后不再续租，租约照常过期。
+    """
+
+    def __init__(self, queue: SyncOperationQueue, interval: Optional[float] = None):
+        self.queue = queue
+        self.interval = interval or max(1.0, queue.lease_seconds / 3)
+        self._held: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @contextmanager
+    def hold(self, operation_id, owner: Optional[str]):
+        """在with块执行期间为owner持有的操作续租，owner为None（未持有租约）时不续租"""
+        if not owner:
+            yield
+            return
+        with self._lock:
+            self._held[operation_id] = owner
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='sync-lease-keeper', daemon=True)
+                self._thread.start()
+        try:
+            yield
+        finally:
+            with self._lock:
+                if self._held.get(operation_id) == owner:
+                    del self._held[operation_id]
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                held = list(self._held.items())
+            for operation_id, owner in held:
+                try:
+                    if not self.queue.renew_lease(operation_id, owner):
+                        print(f"同步操作 {operation_id} 的租约已被其他工作进程领取，停止续租")
+                        with self._lock:
+                            if self._held.get(operation_id) == owner:
+                                del self._held[operation_id]
+                except Exception as e:
+                    print(f"同步操作 {operation_id} 续租失败: {str(e)}")
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+后台同步工作线程
+
+接口只负责将同步操作写入gitlab_sync_operations队列并立即返回操作ID，
+由SyncWorkerPool的工作线程领取并执行GitLab上传，调用方通过
+/api/gitlab_sync/status/<operation_id> 查询结果。
+
+单独启动工作进程（不提供HTTP接口）:
+    python -m backend.utils.sync_worker [线程数]
+"""
+
+import signal
+import sys
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from backend.config.settings import SYNC_WORKER_CONFIG
+from backend.utils.gitlab_sync_manager import GitLabSyncManager, gitlab_sync_manager
+
+
+class SyncWorkerPool:
+    """
+    同步工作线程池
+
+    每个线程循环调用GitLabSyncManager.process_queued_operations领取并执行队列中的操作，
+    队列为空时等待poll_interval秒，有新操作入队时立即唤醒。
+    stop()通知所有线程在当前操作执行完成后退出；超时仍未完成的操作租约过期后由其他工作进程接手。
+    """
+
+    def __init__(self, manager: Optional[GitLabSyncManager] = None, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.manager = manager or gitlab_sync_manager
+        self.thread_count = max(1, int(config.get('threads', 2)))
+        self.poll_interval = config.get('poll_interval', 1.0)
+        self.claim_batch_size = config.get('claim_batch_size', 5)
+        self.shutdown_timeout = config.get('shutdown_timeout', 30)
+        self._threads = []
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {'processed': 0, 'success': 0, 'failed': 0, 'conflict': 0, 'retry': 0, 'errors': 0}
+        self._last_error = None
+        self._started_at = None
+
+    @property
+    def is_running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads) and not self._stop_event.is_set()
+
+    def start(self) -> bool:
+        """启动工作线程，已在运行时返回False"""
+        with self._lock:
+            if self.is_running:
+                return False
+            self._stop_event.clear()
+            self._threads = [
+                threading.Thread(target=self._run, args=(f"{self.manager.worker_id}:sync-worker-{index}",),
+                                 name=f"sync-worker-{index}", daemon=True)
+                for index in range(self.thread_count)
+            ]
+            for thread in self._threads:
+                thread.start()
+            self._started_at = time.time()
+        print(f"后台同步工作线程已启动: {self.thread_count}个线程")
+        return True
+
+    def stop(self, timeout: Optional[float] = None) -> bool:
+        """
+        停止工作线程，等待正在执行的操作完成
+
+        Args:
+            timeout: 最长等待时间（秒），默认使用配置中的shutdown_timeout
+
+        Returns:
+            bool: 所有线程是否都已退出
+        """
+        with self._lock:
+            threads = self._threads
+            if not threads:
+                return True
+            self._stop_event.set()
+        # 唤醒正在等待新操作的线程
+        self.manager.wakeup.set()
+        deadline = time.monotonic() + (self.shutdown_timeout if timeout is None else timeout)
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        alive = [thread.name for thread in threads if thread.is_alive()]
+        with self._lock:
+            self._threads = [thread for thread in threads if thread.is_alive()]
+        if alive:
+            print(f"后台同步工作线程未在超时时间内退出: {', '.join(alive)}，未完成的操作将在租约过期后重新执行")
+            return False
+        print("后台同步工作线程已停止")
+        return True
+
+    def _run(self, owner):
+        while not self._stop_event.is_set():
+            try:
+                results = self.manager.process_queued_operations(self.claim_batch_size, owner=owner)
+            except Exception as e:
+                results = []
+                with self._lock:
+                    self._stats['errors'] += 1
+                    self._last_error = str(e)
+                print(f"同步工作线程 {owner} 领取操作失败: {str(e)}")
+
+            if results:
+                with self._lock:
+                    for result in results:
+                        self._stats['processed'] += 1
+                        if result.status.value in self._stats:
+                            self._stats[result.status.value] += 1
+                continue
+
+            # 队列为空（或数据库暂时不可用），等待新操作入队
+            self.manager.wakeup.wait(self.poll_interval)
+            self.manager.wakeup.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            last_error = self._last_error
+        return {
+            'running': self.is_running,
+            'threads': self.thread_count,
+            'alive_threads': sum(1 for thread in self._threads if thread.is_alive()),
+            'poll_interval': self.poll_interval,
+            'claim_batch_size': self.claim_batch_size,
+            'started_at': self._started_at,
+            'stats': stats,
+            'last_error': last_error
+        }
+
+
+# 全局工作线程池，由main.py在服务启动时启动
+sync_worker_pool = SyncWorkerPool(gitlab_sync_manager, SYNC_WORKER_CONFIG)
+
+
+def main():
+    """以独立进程运行工作线程，收到SIGINT/SIGTERM后等待当前操作完成再退出"""
+    config = dict(SYNC_WORKER_CONFIG)
+    if len(sys.argv) > 1:
+        config['threads'] = int(sys.argv[1])
+    pool = SyncWorkerPool(gitlab_sync_manager, config)
+    stopping = threading.Event()
+
+    def handle_signal(signum, frame):
+        stopping.set()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+    pool.start()
+    while not stopping.wait(1):
+        pass
+    pool.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+from typing import Dict, Any, List, Optional
+
+# 阶段类型的默认排序
+STAGE_ORDER = {'compile': 0, 'build': 1, 'deploy': 2}
+
+# task_config接口中几乎每次都会执行的查找语句，注册为命名预处理语句，避免每次重复解析和规划
+PREPARED_LOOKUPS = {
+    'pipeline_by_project_branch': "SELECT id FROM pipelines WHERE project_id = %s AND branch = %s",
+    'task_by_pipeline_name': "SELECT id FROM pipeline_tasks WHERE pipeline_id = %s AND name = %s",
+    'stage_by_task_type': "SELECT id, config FROM pipeline_task_stages WHERE task_id = %s AND type = %s"
+}
+
+
+class TaskStageResolver:
+    """
+    任务阶段解析器
+
+    用一次JOIN查询解析 流水线(project_id, branch) -> 任务(name) -> 全部阶段，
+    并通过 INSERT ... ON CONFLICT (task_id, type) 一条语句写入多个阶段配置，
+    替代接口中逐级查找、逐个阶段查询再更新/插入的多次往返。
+    """
+
+    RESOLVE_STATEMENT = 'task_stages_by_project_branch_name'
+
+    RESOLVE_QUERY = """
+        SELECT p.id AS pipeline_id, t.id AS task_id,
+               s.id AS stage_id, s.type AS stage_type, s.name AS stage_name,
+               s.order_index AS stage_order, s.config AS stage_config, s.enabled AS stage_enabled,
+               s.created_at AS stage_created_at, s.updated_at AS stage_updated_at
+        FROM pipelines p
+        LEFT JOIN pipeline_tasks t ON t.pipeline_id = p.id AND t.name = %s
+        LEFT JOIN pipeline_task_stages s ON s.task_id = t.id
+        WHERE p.project_id = %s AND p.branch = %s
+        ORDER BY t.id, s.order_index, s.updated_at DESC
+    """
+
+    # 替换模式：直接用新配置覆盖
+    UPSERT_REPLACE_QUERY = """
+        INSERT INTO pipeline_task_stages (task_id, type, name, order_index, config)
+        VALUES %s
+        ON CONFLICT (task_id, type) DO UPDATE
+        SET config = EXCLUDED.config, updated_at = CURRENT_TIMESTAMP
+        RETURNING id, type, (xmax = 0) AS inserted
+    """
+
+    # 合并模式：新配置中的键覆盖现有配置的同名键，其余键保留
+    UPSERT_MERGE_QUERY = """
+        INSERT INTO pipeline_task_stages (task_id, type, name, order_index, config)
+        VALUES %s
+        ON CONFLICT (task_id, type) DO UPDATE
+        SET config = CASE WHEN jsonb_typeof(pipeline_task_stages.config) = 'object'
+                          THEN pipeline_task_stages.config ELSE '{}'::jsonb END || EXCLUDED.config,
+            updated_at = CURRENT_TIMESTAMP
+        RETURNING id, type, (xmax = 0) AS inserted
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.db.register_prepared(self.RESOLVE_STATEMENT, self.RESOLVE_QUERY)
+        for name, query in PREPARED_LOOKUPS.items():
+            self.db.register_prepared(name, query)
+
+    def _parse_config(self, config) -> Dict[str, Any]:
+        if not config:
+            return {}
+        if isinstance(config, str):
+            try:
+                config = json.loads(config)
+            except (json.JSONDecodeError, TypeError):
+                print(f"解析阶段配置失败，使用空配置: {config}")
+                return {}
+        return config if isinstance(config, dict) else {}
+
+    def resolve(self, project_id, branch, task_name) -> Optional[Dict[str, Any]]:
+        """
+        解析流水线、任务及其全部阶段
+
+        Args:
+            project_id: 项目ID
+            branch: 分支名
+            task_name: 任务名称
+
+        Returns:
+            dict: {'pipeline_id', 'task_id', 'stages': {阶段类型: 阶段信息}}，
+                  任务不存在时task_id为None；流水线不存在时返回None
+        """
+        rows = self.db.execute_prepared(
+            self.RESOLVE_STATEMENT,
+            params=(task_name, str(project_id), branch),
+            fetch_all=True
+        )
+        if not rows:
+            return None
+
+        first = rows[0]
+        resolved = {
+            'pipeline_id': first['pipeline_id'],
+            'task_id': first['task_id'],
+            'stages': {}
+        }
+        for row in rows:
+            # 历史数据中可能存在同名任务，只取第一个
+            if row['task_id'] != resolved['task_id'] or row['stage_id'] is None:
+                continue
+            if row['stage_type'] in resolved['stages']:
+                continue
+            resolved['stages'][row['stage_type']] = {
+                'id': row['stage_id'],
+                'type': row['stage_type'],
+                'name': row['stage_name'],
+                'order_index': row['stage_order'],
+                'config': self._parse_config(row['stage_config']),
+                'enabled': row['stage_enabled'],
+                'created_at': row['stage_created_at'],
+                'updated_at': row['stage_updated_at']
+            }
+        return resolved
+
+    def upsert_stage_configs(self, task_id, stage_configs: Dict[str, Dict[str, Any]],
+                             merge: bool = False) -> List[Dict[str, Any]]:
+        """
+        一条语句写入多个阶段配置，阶段不存在时插入，存在时更新
+
+        Args:
+            task_id: 任务ID
+            stage_configs: {阶段类型: 配置}
+            merge: 为True时与现有配置合并，否则覆盖现有配置
+
+        Returns:
+            list: 每个阶段的 {'id', 'type', 'inserted'}
+        """
+        rows = [
+            (task_id, stage_type, stage_type, STAGE_ORDER.get(stage_type, len(STAGE_ORDER)),
+             json.dumps(config))
+            for stage_type, config in stage_configs.items()
+        ]
+        return self.db.execute_bulk_insert(
+            self.UPSERT_MERGE_QUERY if merge else self.UPSERT_REPLACE_QUERY,
+            rows,
+            template="(%s, %s, %s, %s, %s::jsonb)",
+            returning=True
+        )
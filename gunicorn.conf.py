@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+gunicorn部署配置
+
+使用方法：
+gunicorn -c gunicorn.conf.py backend.main:app
+
+后台同步工作线程在每个worker进程fork之后启动，master进程不领取队列中的操作。
+"""
+
+bind = '0.0.0.0:5000'
+workers = 2
+
+
+def post_fork(server, worker):
+    """worker进程启动后启动后台同步工作线程"""
+    from backend.main import start_background_workers
+    start_background_workers()
+
+
+def worker_exit(server, worker):
+    """worker进程退出时等待正在执行的同步操作完成"""
+    from backend.main import stop_background_workers
+    stop_background_workers()
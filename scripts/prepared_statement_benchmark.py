@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+预处理语句基准测试
+
+生成测试数据后，交替通过 db_manager.execute_query 和 db_manager.execute_prepared 执行
+task_config接口使用的 pipeline -> task -> stage 查找链，比较每次调用的平均耗时
+（包含从连接池借出连接的耗时）。结束时删除测试数据。
+
+execute_prepared只在启用连接池（DB_CONFIG['pool']['enabled']）时使用PREPARE/EXECUTE，
+未启用时两种方式相同。
+
+使用方法：
+python scripts/prepared_statement_benchmark.py --iterations 2000 --pipelines 200
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.utils.database import db_manager
+from backend.utils.task_stage_resolver import PREPARED_LOOKUPS, TaskStageResolver
+
+BENCHMARK_PREFIX = 'ps_bench_'
+
+
+def _seed(pipeline_count, tasks_per_pipeline=5):
+    """生成测试数据，返回 [(project_id, branch, task_name, stage_type), ...]"""
+    keys = []
+    with db_manager.transaction():
+        for index in range(pipeline_count):
+            project_id = f'{BENCHMARK_PREFIX}{index}'
+            pipeline_id = db_manager.execute_insert(
+                "INSERT INTO pipelines (project_id, branch) VALUES (%s, %s)",
+                params=(project_id, 'develop'),
+                return_id=True
+            )['id']
+            task_ids = db_manager.execute_bulk_insert(
+                "INSERT INTO pipeline_tasks (pipeline_id, name, order_index) VALUES %s RETURNING id",
+                [(pipeline_id, f'task_{task_index}', task_index) for task_index in range(tasks_per_pipeline)],
+                returning=True
+            )
+            db_manager.execute_bulk_insert(
+                "INSERT INTO pipeline_task_stages (task_id, name, type, order_index, config) VALUES %s",
+                [(task['id'], stage_type, stage_type, stage_index, '{"enabled": true}')
+                 for task in task_ids
+                 for stage_index, stage_type in enumerate(('compile', 'build', 'deploy'))]
+            )
+            keys.extend((project_id, 'develop', f'task_{task_index}', 'build')
+                        for task_index in range(tasks_per_pipeline))
+    for table in ('pipelines', 'pipeline_tasks', 'pipeline_task_stages'):
+        db_manager.execute_query(f"ANALYZE {table}")
+    return keys
+
+
+def _cleanup():
+    """删除测试数据（任务和阶段随流水线级联删除）"""
+    db_manager.execute_delete(
+        "DELETE FROM pipelines WHERE project_id LIKE %s",
+        params=(f'{BENCHMARK_PREFIX}%',)
+    )
+
+
+def _run_plain(name, params):
+    return db_manager.execute_query(PREPARED_LOOKUPS[name], params=params, fetch_one=True)['id']
+
+
+def _run_prepared(name, params):
+    return db_manager.execute_prepared(name, params=params, fetch_one=True)['id']
+
+
+def _lookup_chain(key, run):
+    """按接口中的顺序依次执行 pipeline -> task -> stage 三次查找"""
+    project_id, branch, task_name, stage_type = key
+    pipeline_id = run('pipeline_by_project_branch', (project_id, branch))
+    task_id = run('task_by_pipeline_name', (pipeline_id, task_name))
+    run('stage_by_task_type', (task_id, stage_type))
+
+
+def run_benchmark(iterations=2000, pipeline_count=200, seed=42):
+    """
+    运行基准测试
+
+    Returns:
+        dict: 两种方式的平均耗时（微秒）和加速比
+    """
+    random.seed(seed)
+    # 与接口相同，通过TaskStageResolver注册查找语句
+    TaskStageResolver(db_manager)
+    _cleanup()
+    try:
+        keys = _seed(pipeline_count)
+
+        # 预热：连接池建立连接，预处理语句在各连接上完成PREPARE
+        for key in keys[:20]:
+            _lookup_chain(key, _run_plain)
+            _lookup_chain(key, _run_prepared)
+
+        timings = {'plain': 0.0, 'prepared': 0.0}
+        for _ in range(iterations):
+            key = random.choice(keys)
+            # 交替执行两种方式，避免缓存和负载波动只影响其中一种
+            order = [('plain', _run_plain), ('prepared', _run_prepared)]
+            random.shuffle(order)
+            for mode, run in order:
+                start = time.perf_counter()
+                _lookup_chain(key, run)
+                timings[mode] += time.perf_counter() - start
+    finally:
+        _cleanup()
+
+    per_call = {mode: total / (iterations * len(PREPARED_LOOKUPS)) * 1_000_000
+                for mode, total in timings.items()}
+    return {
+        'iterations': iterations,
+        'pipelines': pipeline_count,
+        'pool_enabled': bool(db_manager.pool_config.get('enabled', False)),
+        'prepared_enabled': db_manager.prepared_enabled,
+        'statements_per_mode': iterations * len(PREPARED_LOOKUPS),
+        'plain_us_per_call': round(per_call['plain'], 2),
+        'prepared_us_per_call': round(per_call['prepared'], 2),
+        'speedup': round(per_call['plain'] / per_call['prepared'], 3) if per_call['prepared'] else None,
+        'saved_pct': round((1 - per_call['prepared'] / per_call['plain']) * 100, 1) if per_call['plain'] else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='task_config热点查找语句的预处理语句基准测试')
+    parser.add_argument('--iterations', type=int, default=2000, help='每种方式执行查找链的次数')
+    parser.add_argument('--pipelines', type=int, default=200, help='生成的测试流水线数量')
+    args = parser.parse_args()
+
+    result = run_benchmark(iterations=args.iterations, pipeline_count=args.pipelines)
+    print("=" * 60)
+    print(f"连接池: {'启用' if result['pool_enabled'] else '未启用（execute_prepared按普通语句执行）'}")
+    print(f"查找语句数（每种方式）: {result['statements_per_mode']}")
+    print(f"execute_query:    {result['plain_us_per_call']} 微秒/次")
+    print(f"execute_prepared: {result['prepared_us_per_call']} 微秒/次")
+    print(f"加速比:           {result['speedup']}x（节省 {result['saved_pct']}%）")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
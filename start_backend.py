@@ -18,7 +18,7 @@ sys.path.insert(0, str(project_root))
 if __name__ == '__main__':
     try:
         # 导入并启动后端应用
-        from backend.main import app
+        from backend.main import app, start_background_workers
         
         print("=" * 50)
         print("CICD流水线管理系统 - Backend API服务")
@@ -29,7 +29,8 @@ if __name__ == '__main__':
         print("API文档: 参见 doc/YAML配置API接口文档.md")
         print("=" * 50)
         
-        # 启动Flask应用
+        # 启动后台同步工作线程和Flask应用
+        start_background_workers(debug=True)
         app.run(host='0.0.0.0', port=5000, debug=True)
         
     except ImportError as e: